@@ -1,7 +1,43 @@
-from .module import GetFinData
-from .preproc_data import PreprocessData
-# from .yahoo_news import GetYahooNewsData
-from .yahoo_news_meth2 import GetYahooNewsData2
-from .get_et_news_articles import GetETNewsArticles
+import importlib
 
-__all__ = ['GetFinData', 'PreprocessData', 'GetYahooNewsData2']
\ No newline at end of file
+# Public names and the submodule that defines them. Nothing is imported until a name is first used,
+# so preprocessing workers never load nselib, bs4 or selenium
+_LAZY = {
+    'GetFinData': 'module',
+    'PreprocessData': 'preproc_data',
+    'StreamPreprocessData': 'stream_preproc',
+    'ParallelPreprocessData': 'parallel_preproc',
+    'FeatureEngine': 'features',
+    'IncrementalScaler': 'scaler_state',
+    'NearDuplicateIndex': 'near_dup',
+    'SentimentIndex': 'sentiment_join',
+    'PromptDatasetBuilder': 'prompt_builder',
+    'PredictionCache': 'prediction_cache',
+    'LabelScorer': 'label_scoring',
+    'OptionSnapshotStore': 'option_snapshots',
+    'OptionChainPoller': 'option_snapshots',
+    'enable_metrics': 'metrics',
+    'get_metrics': 'metrics',
+    # 'GetYahooNewsData': 'yahoo_news',
+    'GetYahooNewsData2': 'yahoo_news_meth2',
+    'GetETNewsArticles': 'get_et_news_articles',
+    'HTTPCache': 'http_cache',
+    'HTTPClient': 'http_client',
+    'DatasetStore': 'dataset_store',
+    'SeriesStore': 'series_store',
+}
+
+__all__ = ['GetFinData', 'PreprocessData', 'StreamPreprocessData', 'ParallelPreprocessData', 'FeatureEngine', 'IncrementalScaler', 'NearDuplicateIndex', 'SentimentIndex', 'PromptDatasetBuilder', 'PredictionCache', 'LabelScorer', 'OptionSnapshotStore', 'OptionChainPoller', 'enable_metrics', 'get_metrics', 'GetYahooNewsData2', 'HTTPCache', 'HTTPClient', 'DatasetStore', 'SeriesStore']
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_LAZY[name]}', __name__), name)
+    # Cache on the package so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
\ No newline at end of file
@@ -0,0 +1,64 @@
+import os
+from datetime import datetime, timedelta
+import pandas as pd
+
+# Windows are cut from consecutive blocks of days counted from this date, whatever range is asked for
+GRID_ORIGIN = datetime(2000, 1, 1)
+
+
+def date_windows(start, end, days):
+    """Split start..end (both inclusive) into windows of at most days days. Windows lie on a fixed grid of
+    days-day blocks from GRID_ORIGIN, so a backfill over another range lands on the same windows, and reuses
+    their checkpoints, everywhere but at its ends. NSE rejects one-day ranges, so a one-day window at either
+    end is widened by a day into its neighbour"""
+    windows = []
+    block_start = GRID_ORIGIN + timedelta(days=(start - GRID_ORIGIN).days // days * days)
+    while block_start <= end:
+        windows.append((max(block_start, start), min(block_start + timedelta(days=days - 1), end)))
+        block_start += timedelta(days=days)
+    if windows and windows[-1][0] == windows[-1][1]:
+        windows[-1] = (windows[-1][0] - timedelta(days=1), windows[-1][1])
+    if len(windows) > 1 and windows[0][0] == windows[0][1]:
+        windows[0] = (windows[0][0], windows[0][1] + timedelta(days=1))
+    return windows
+
+
+def merge_windows(frames, key_columns):
+    """Concatenate the windows in date order and drop the rows fetched twice where windows overlap"""
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    keys = [col for col in key_columns if col in df.columns]
+    return df.drop_duplicates(subset=keys or None, keep='first').reset_index(drop=True)
+
+
+class BackfillCheckpoint:
+    """Completed backfill windows on disk, one pickle per asset type, ticker and window, so a crashed
+    multi-year backfill resumes with the windows it had not finished"""
+    def __init__(self, root='backfill_checkpoints'):
+        self.root = root
+
+    def path(self, asset_type, ticker, start, end):
+        return os.path.join(self.root, asset_type, ticker, f"{start:%Y%m%d}_{end:%Y%m%d}.pkl")
+
+    def load(self, asset_type, ticker, start, end):
+        path = self.path(asset_type, ticker, start, end)
+        return pd.read_pickle(path) if os.path.exists(path) else None
+
+    def save(self, asset_type, ticker, start, end, df):
+        path = self.path(asset_type, ticker, start, end)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written under a temporary name and renamed, a crash mid-write never leaves a truncated window behind
+        df.to_pickle(path + '.tmp')
+        os.replace(path + '.tmp', path)
+
+    def completed(self, asset_type, ticker):
+        directory = os.path.join(self.root, asset_type, ticker)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len('.pkl')] for name in os.listdir(directory) if name.endswith('.pkl'))
+
+    def clear(self, asset_type, ticker):
+        for name in self.completed(asset_type, ticker):
+            os.remove(os.path.join(self.root, asset_type, ticker, name + '.pkl'))
@@ -0,0 +1,186 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from .features import parse_bar_dates
+from .news_dates import normalize_news_dates
+
+
+class DatasetStore:
+    """Parquet store for hist_dat, options_dat and news, partitioned by asset type, ticker and year"""
+    KINDS = ['hist', 'options', 'news']
+    DATE_COLUMNS = ['Date', 'TIMESTAMP', 'date']
+    TICKER_COLUMNS = ['Ticker', 'ticker']
+    # Each asset type is its own dataset so NSE layouts with different columns never share a schema
+    PARTITION_COLUMNS = ['ticker_key', 'year']
+    # Row-level date used for predicate pushdown inside a year partition
+    DATE_KEY = 'date_key'
+    # Columns identifying a row per kind, those a layout has are used. A write replaces stored rows with the same key
+    KEY_COLUMNS = {
+        'hist': ['ticker_key', 'date_key', 'Series', 'INSTRUMENT', 'EXPIRY_DT', 'STRIKE_PRICE', 'OPTION_TYPE'],
+        'options': ['ticker_key', 'date_key', 'Option Type', 'Strike Price', 'Expiry Date'],
+        'news': ['ticker_key', 'url'],
+    }
+    # Schema every partition of a dataset is written and read with, kept next to the partitions
+    SCHEMA_FILE = '_common_metadata'
+    INDIAN_NUMBER = r'-?[\d,]*\.?\d+'
+
+    def __init__(self, root='dataset_store'):
+        self.root = root
+
+    def dataset_path(self, kind, asset_type):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown dataset kind {kind}, expected one of {self.KINDS}")
+        return os.path.join(self.root, kind, f'asset_type={asset_type}')
+
+    def asset_types(self, kind):
+        path = os.path.join(self.root, kind)
+        if not os.path.exists(path):
+            return []
+        return sorted(name.split('=', 1)[1] for name in os.listdir(path) if name.startswith('asset_type='))
+
+    def schema(self, path):
+        """Pinned schema of the dataset at path, None before its first write"""
+        schema_path = os.path.join(path, self.SCHEMA_FILE)
+        if os.path.exists(schema_path):
+            return pq.read_schema(schema_path)
+        if os.path.exists(path):
+            # Datasets written before the schema was pinned
+            return ds.dataset(path, partitioning='hive').schema
+        return None
+
+    def conform(self, table, schema):
+        """table with the fields of schema in its order and types, fields it lacks are null"""
+        columns = [table.column(field.name).cast(field.type) if field.name in table.column_names else pa.nulls(len(table), field.type)
+                   for field in schema]
+        return pa.Table.from_arrays(columns, schema=schema)
+
+    def parse_dates(self, kind, dates):
+        """Row dates of a dataset, unknown values become NaT. News dates in the ET and Yahoo layouts are kept as
+        IST wall-clock times, market dates are NSE bar dates"""
+        if kind == 'news':
+            return normalize_news_dates(dates)[0].dt.tz_localize(None)
+        try:
+            return parse_bar_dates(dates)
+        except (ValueError, TypeError):
+            # One value no layout matches fails the whole column, only that row should go without a date
+            return pd.to_datetime(dates, format='mixed', dayfirst=True, errors='coerce')
+
+    def convert_numbers(self, df):
+        """Turn Indian-grouped number strings such as '20,25,167' into numeric columns"""
+        for col in df.columns:
+            if df[col].dtype != object and not pd.api.types.is_string_dtype(df[col]):
+                continue
+            values = df[col].dropna().astype(str)
+            if values.empty or not values.str.fullmatch(self.INDIAN_NUMBER).all():
+                continue
+            df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '', regex=False), errors='coerce')
+        return df
+
+    def write(self, kind, df, asset_type):
+        """Upsert df into the kind dataset, one parquet file per asset type/ticker/year partition. The partitions df
+        touches are rewritten with their stored rows and df's, rows of df replacing stored rows with the same key,
+        so overlapping or repeated writes keep one copy of every row"""
+        if df.empty:
+            return 0
+        df = df.drop(columns=[col for col in df.columns if col.startswith('Unnamed:')])
+        df = self.convert_numbers(df.copy())
+
+        ticker_col = next(col for col in self.TICKER_COLUMNS if col in df.columns)
+        date_col = next(col for col in self.DATE_COLUMNS if col in df.columns)
+        df['ticker_key'] = df[ticker_col].astype(str)
+        df[self.DATE_KEY] = self.parse_dates(kind, df[date_col])
+        # A year of daily bars per ticker keeps partition files reasonably sized
+        df['year'] = df[self.DATE_KEY].dt.year.fillna(0).astype(int)
+
+        rows = len(df)
+        path = self.dataset_path(kind, asset_type)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        stored_schema = self.schema(path)
+        # Types only widen (int to float, null to anything), every partition keeps reading with the same schema
+        schema = table.schema if stored_schema is None else pa.unify_schemas([stored_schema, table.schema], promote_options='permissive')
+        schema = schema.remove_metadata()
+
+        if stored_schema is not None:
+            partitions = df[self.PARTITION_COLUMNS].drop_duplicates()
+            stored = pd.read_parquet(path, schema=schema, filters=[('ticker_key', 'in', partitions['ticker_key'].unique().tolist()),
+                                                                   ('year', 'in', partitions['year'].unique().tolist())])
+            stored = stored.merge(partitions, on=self.PARTITION_COLUMNS)
+            if not stored.empty:
+                keys = [col for col in self.KEY_COLUMNS[kind] if col in df.columns]
+                combined = pd.concat([stored, df], ignore_index=True)
+                df = combined.drop_duplicates(subset=keys or None, keep='last')
+                table = pa.Table.from_pandas(df, preserve_index=False)
+
+        os.makedirs(path, exist_ok=True)
+        partitioning = ds.partitioning(pa.schema([schema.field(col) for col in self.PARTITION_COLUMNS]), flavor='hive')
+        ds.write_dataset(self.conform(table, schema), path, format='parquet', partitioning=partitioning,
+                         existing_data_behavior='delete_matching', basename_template='part-{i}.parquet')
+        pq.write_metadata(schema, os.path.join(path, self.SCHEMA_FILE))
+        return rows
+
+    def read(self, kind, columns=None, tickers=None, asset_types=None, start_date=None, end_date=None):
+        """Read a dataset, only touching the partitions and columns that are asked for"""
+        filters = []
+        if tickers is not None:
+            filters.append(('ticker_key', 'in', list(tickers)))
+        # Year partitions are pruned first, then rows are filtered on the exact date
+        if start_date is not None:
+            start_date = pd.Timestamp(start_date)
+            filters.append(('year', '>=', start_date.year))
+            filters.append((self.DATE_KEY, '>=', start_date))
+        if end_date is not None:
+            end_date = pd.Timestamp(end_date)
+            filters.append(('year', '<=', end_date.year))
+            filters.append((self.DATE_KEY, '<=', end_date))
+
+        read_columns = None
+        if columns is not None:
+            read_columns = list(dict.fromkeys(list(columns) + ['ticker_key', self.DATE_KEY]))
+
+        frames = []
+        for asset_type in asset_types if asset_types is not None else self.asset_types(kind):
+            path = self.dataset_path(kind, asset_type)
+            if not os.path.exists(path):
+                continue
+            schema = self.schema(path)
+            dataset_columns = read_columns
+            if read_columns is not None:
+                # Asset types have different layouts, project only the columns this one has
+                dataset_columns = [col for col in read_columns if col in schema.names]
+            df = pd.read_parquet(path, columns=dataset_columns, filters=filters or None, schema=schema)
+            # Row order follows the partitions, so restore a chronological order per ticker
+            df['ticker_key'] = df['ticker_key'].astype(str)
+            frames.append(df.sort_values(['ticker_key', self.DATE_KEY], kind='stable'))
+        if not frames:
+            return pd.DataFrame()
+
+        df = pd.concat(frames, ignore_index=True)
+        internal = [col for col in self.PARTITION_COLUMNS + [self.DATE_KEY] if col in df.columns and (columns is None or col not in columns)]
+        return df.drop(columns=internal)
+
+    def write_fin_data(self, fin_data):
+        """Store the hist_dat, options_dat and news_data of a GetFinData run"""
+        rows = 0
+        for asset_type, df in fin_data.hist_dat.items():
+            rows += self.write('hist', df, asset_type)
+        for asset_type, df in fin_data.options_dat.items():
+            rows += self.write('options', df, asset_type)
+        if not fin_data.news_data.empty:
+            rows += self.write('news', fin_data.news_data, 'News')
+        return rows
+
+    def convert_datasets(self, datasets_dir='Datasets'):
+        """One-shot conversion of the CSVs in Datasets/ into the store"""
+        layout = {
+            'index_options_data.csv': ('hist', 'Index'),
+            'etf_data.csv': ('hist', 'ETF'),
+            'et_news_data.csv': ('news', 'News'),
+        }
+        rows = {}
+        for file_name, (kind, asset_type) in layout.items():
+            path = os.path.join(datasets_dir, file_name)
+            if os.path.exists(path):
+                rows[file_name] = self.write(kind, pd.read_csv(path, dtype=str), asset_type)
+        return rows
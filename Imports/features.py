@@ -0,0 +1,246 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+from .nse_loader import parse_indian_numbers
+
+
+def parse_bar_dates(dates):
+    """Dates of daily bars; NSE '09-Aug-2023' strings are parsed in bulk, other layouts are inferred"""
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    try:
+        return pd.to_datetime(dates, format='%d-%b-%Y')
+    except (ValueError, TypeError):
+        return pd.to_datetime(dates, format='mixed', dayfirst=True)
+
+
+class TickerState:
+    """Rolling state of one ticker, enough to compute the features of its next bar"""
+    def __init__(self, window):
+        self.closes = deque(maxlen=window)
+        self.gains = deque()
+        self.losses = deque()
+        self.sentiments = deque()
+        self.ema_fast = None
+        self.ema_slow = None
+        self.signal = None
+        # Weight of each average against the next value, decayed over missing closes as ewm() does
+        self.ema_weights = {'fast': 1.0, 'slow': 1.0, 'signal': 1.0}
+        # Per SMA or volatility window, the sum of the finite closes in it and the number of NaN closes
+        self.sums = {}
+        self.nans = {}
+        # Mean and sum of squared deviations (Welford) of the finite closes in the volatility window
+        self.mean = 0.0
+        self.m2 = 0.0
+
+
+class FeatureEngine:
+    """Per-ticker technical indicators used in the model prompts, in batch or one bar at a time"""
+    FEATURE_COLUMNS = ['Lag1_ClosePrice', 'Lag3_ClosePrice', 'SMA_7', 'SMA_30', 'Volatility', 'RSI', 'MACD', 'MACD_Signal', 'Sentiment_Rolling']
+    CLOSE_COLUMNS = ['ClosePrice', 'CLOSING_PRICE']
+    DATE_COLUMNS = ['Date', 'TIMESTAMP']
+
+    def __init__(self, group_cols=None, sma_windows=(7, 30), volatility_window=30, rsi_window=14, macd_spans=(12, 26, 9), sentiment_window=7, sentiment_col='Sentiment'):
+        # Index frames hold several contracts per day, pass e.g. ['Ticker', 'EXPIRY_DT'] for them
+        self.group_cols = group_cols or ['Ticker']
+        self.sma_windows = sma_windows
+        self.volatility_window = volatility_window
+        self.rsi_window = rsi_window
+        self.macd_spans = macd_spans
+        self.sentiment_window = sentiment_window
+        self.sentiment_col = sentiment_col
+        self.states = {}
+
+    @property
+    def window(self):
+        """Closes kept per ticker, enough for the longest window and the 3-bar lag"""
+        return max(max(self.sma_windows), self.volatility_window, 4)
+
+    @property
+    def running_windows(self):
+        return sorted(set(self.sma_windows) | {self.volatility_window})
+
+    def column_for(self, df, candidates):
+        return next(col for col in candidates if col in df.columns)
+
+    def sort_frame(self, df):
+        """Order rows by ticker and date so each ticker's bars are contiguous and chronological"""
+        date_col = self.column_for(df, self.DATE_COLUMNS)
+        dates = parse_bar_dates(df[date_col])
+        order = df.assign(_date=dates).reset_index(drop=True).sort_values(self.group_cols + ['_date'], kind='stable').index
+        return df.iloc[order].reset_index(drop=True)
+
+    def compute(self, df):
+        """Add the feature columns for every ticker in one grouped pass and keep the rolling state"""
+        df = self.sort_frame(df)
+        close = parse_indian_numbers(df[self.column_for(df, self.CLOSE_COLUMNS)]).astype(float)
+        keys = [df[col] for col in self.group_cols]
+        groups = close.groupby(keys, sort=False, dropna=False, observed=True)
+
+        def realign(result):
+            # groupby().rolling()/ewm() prefix the group keys to the index, drop them to line up with the rows
+            return result.reset_index(level=list(range(len(keys))), drop=True).sort_index()
+
+        fast_span, slow_span, signal_span = self.macd_spans
+        short_window, long_window = self.sma_windows
+
+        df['Lag1_ClosePrice'] = groups.shift(1)
+        df['Lag3_ClosePrice'] = groups.shift(3)
+        df['SMA_7'] = realign(groups.rolling(short_window).mean())
+        df['SMA_30'] = realign(groups.rolling(long_window).mean())
+        df['Volatility'] = realign(groups.rolling(self.volatility_window).std())
+
+        delta = groups.diff()
+        gain_groups = delta.clip(lower=0).groupby(keys, sort=False, dropna=False, observed=True)
+        loss_groups = (-delta.clip(upper=0)).groupby(keys, sort=False, dropna=False, observed=True)
+        avg_gain = realign(gain_groups.rolling(self.rsi_window).mean())
+        avg_loss = realign(loss_groups.rolling(self.rsi_window).mean())
+        with np.errstate(divide='ignore', invalid='ignore'):
+            df['RSI'] = 100 - 100 / (1 + avg_gain / avg_loss)
+
+        ema_fast = realign(groups.ewm(span=fast_span, adjust=False).mean())
+        ema_slow = realign(groups.ewm(span=slow_span, adjust=False).mean())
+        df['MACD'] = ema_fast - ema_slow
+        df['MACD_Signal'] = realign(df['MACD'].groupby(keys, sort=False, dropna=False, observed=True).ewm(span=signal_span, adjust=False).mean())
+
+        if self.sentiment_col in df.columns:
+            sentiment_groups = df[self.sentiment_col].astype(float).groupby(keys, sort=False, dropna=False, observed=True)
+            df['Sentiment_Rolling'] = realign(sentiment_groups.rolling(self.sentiment_window, min_periods=1).mean())
+        else:
+            df['Sentiment_Rolling'] = np.nan
+
+        self.fit_state(df, close, delta, ema_fast, ema_slow)
+        return df
+
+    def fit_state(self, df, close, delta, ema_fast, ema_slow):
+        """Seed the incremental state of every ticker from the tail of a batch computation"""
+        window = self.window
+        self.states = {}
+        positions = df.groupby(self.group_cols, sort=False, dropna=False, observed=True).indices
+        for key, rows in positions.items():
+            state = TickerState(window)
+            state.closes.extend(close.to_numpy()[rows][-window:])
+            self.seed_running(state)
+            deltas = delta.to_numpy()[rows][1:][-self.rsi_window:]
+            state.gains.extend(np.clip(deltas, 0, None))
+            state.losses.extend(-np.clip(deltas, None, 0))
+            if self.sentiment_col in df.columns:
+                state.sentiments.extend(df[self.sentiment_col].astype(float).to_numpy()[rows][-self.sentiment_window:])
+            state.ema_fast = ema_fast.to_numpy()[rows][-1]
+            state.ema_slow = ema_slow.to_numpy()[rows][-1]
+            state.signal = df['MACD_Signal'].to_numpy()[rows][-1]
+            # Closes missing since the last observed one have already decayed the averages' weights
+            observed = np.flatnonzero(~np.isnan(close.to_numpy()[rows]))
+            missing = len(rows) - 1 - observed[-1] if len(observed) else 0
+            fast_span, slow_span, _ = self.macd_spans
+            state.ema_weights['fast'] = (1 - 2 / (fast_span + 1)) ** missing
+            state.ema_weights['slow'] = (1 - 2 / (slow_span + 1)) ** missing
+            self.states[key] = state
+
+    def seed_running(self, state):
+        """Running sums and volatility moments of the closes a state holds"""
+        closes = np.fromiter(state.closes, dtype=float)
+        for window in self.running_windows:
+            tail = closes[-window:]
+            finite = tail[~np.isnan(tail)]
+            state.sums[window] = float(finite.sum())
+            state.nans[window] = len(tail) - len(finite)
+        finite = closes[-self.volatility_window:]
+        finite = finite[~np.isnan(finite)]
+        state.mean = float(finite.mean()) if len(finite) else 0.0
+        state.m2 = float(((finite - state.mean) ** 2).sum())
+
+    def ema_step(self, state, name, average, value, span):
+        """One bar of ewm(span, adjust=False): a missing value keeps the average and decays its weight"""
+        alpha = 2 / (span + 1)
+        if average is None or np.isnan(average):
+            state.ema_weights[name] = 1.0
+            return value
+        state.ema_weights[name] *= 1 - alpha
+        if np.isnan(value):
+            return average
+        weight = state.ema_weights[name]
+        state.ema_weights[name] = 1.0
+        return (weight * average + alpha * value) / (weight + alpha)
+
+    def roll(self, state, close):
+        """Move every running window of a state forward by one close, before it is appended"""
+        closes = state.closes
+        # Welford's update, removing the close that leaves the volatility window and adding the new one
+        window = self.volatility_window
+        count = min(len(closes), window) - state.nans.get(window, 0)
+        if len(closes) >= window and not np.isnan(closes[-window]):
+            leaving = closes[-window]
+            count -= 1
+            if count:
+                delta = leaving - state.mean
+                state.mean -= delta / count
+                state.m2 -= delta * (leaving - state.mean)
+            else:
+                state.mean = state.m2 = 0.0
+        if not np.isnan(close):
+            count += 1
+            delta = close - state.mean
+            state.mean += delta / count
+            state.m2 += delta * (close - state.mean)
+
+        for window in self.running_windows:
+            state.sums.setdefault(window, 0.0)
+            state.nans.setdefault(window, 0)
+            moves = [(closes[-window], -1), (close, 1)] if len(closes) >= window else [(close, 1)]
+            for value, sign in moves:
+                if np.isnan(value):
+                    state.nans[window] += sign
+                else:
+                    state.sums[window] += sign * value
+
+    def update(self, key, close, sentiment=np.nan):
+        """Features of one new daily bar for a ticker, updating its rolling state in O(1)"""
+        state = self.states.setdefault(key, TickerState(self.window))
+        closes = state.closes
+        close = float(close)
+        features = {
+            'Lag1_ClosePrice': closes[-1] if len(closes) >= 1 else np.nan,
+            'Lag3_ClosePrice': closes[-3] if len(closes) >= 3 else np.nan,
+        }
+
+        if closes:
+            delta = close - closes[-1]
+            state.gains.append(max(delta, 0.0))
+            state.losses.append(max(-delta, 0.0))
+            if len(state.gains) > self.rsi_window:
+                state.gains.popleft()
+                state.losses.popleft()
+        self.roll(state, close)
+        closes.append(close)
+
+        # A window is only complete with as many closes as its length and no NaN among them, as in rolling()
+        short_window, long_window = self.sma_windows
+        full = {window: len(closes) >= window and not state.nans[window] for window in self.running_windows}
+        features['SMA_7'] = state.sums[short_window] / short_window if full[short_window] else np.nan
+        features['SMA_30'] = state.sums[long_window] / long_window if full[long_window] else np.nan
+        window = self.volatility_window
+        features['Volatility'] = np.sqrt(max(state.m2, 0.0) / (window - 1)) if full[window] else np.nan
+
+        if len(state.gains) == self.rsi_window:
+            avg_gain = np.float64(sum(state.gains)) / self.rsi_window
+            avg_loss = np.float64(sum(state.losses)) / self.rsi_window
+            with np.errstate(divide='ignore', invalid='ignore'):
+                features['RSI'] = 100 - 100 / (1 + avg_gain / avg_loss)
+        else:
+            features['RSI'] = np.nan
+
+        fast_span, slow_span, signal_span = self.macd_spans
+        state.ema_fast = self.ema_step(state, 'fast', state.ema_fast, close, fast_span)
+        state.ema_slow = self.ema_step(state, 'slow', state.ema_slow, close, slow_span)
+        macd = state.ema_fast - state.ema_slow
+        state.signal = self.ema_step(state, 'signal', state.signal, macd, signal_span)
+        features['MACD'] = macd
+        features['MACD_Signal'] = state.signal
+
+        state.sentiments.append(float(sentiment))
+        if len(state.sentiments) > self.sentiment_window:
+            state.sentiments.popleft()
+        observed = [value for value in state.sentiments if not np.isnan(value)]
+        features['Sentiment_Rolling'] = sum(observed) / len(observed) if observed else np.nan
+        return features
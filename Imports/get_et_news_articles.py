@@ -1,21 +1,16 @@
-import requests
-from bs4 import BeautifulSoup
-from tqdm.notebook import tqdm
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from time import sleep
 import xml.etree.ElementTree as ET
+from .http_cache import cached_get
+from .html_extract import extract_et_article, extract_et_listing_links
+from .metrics import METRICS, timed
 
 
 class GetETNewsArticles:
-    def __init__(self, ticker):
+    def __init__(self, ticker, cache=None):
         self.ticker = ticker
         self.news = None
+        self.cache = cache
     
     # Function to parse XML and extract company details
     def parse_xml(self, xml_file, ticker):
@@ -36,31 +31,23 @@ class GetETNewsArticles:
         base_url = "https://economictimes.indiatimes.com"
         url = f"{base_url}{uri}"
         """Extract content from a news article"""
-        response = requests.get(url, headers=headers)
+        response = cached_get(url, headers=headers, cache=self.cache)
         if not response.ok:
             print(f'Failed to fetch article: {url}')
+            METRICS.error('extract_article_content', f'HTTP {response.status_code}')
             return None
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract title
-        title_tag = soup.find('h1', class_='artTitle')
-        title = title_tag.get_text() if title_tag else 'No title available'
-        
-        # Extract date
-        date_tag = soup.find('time', class_='jsdtTime')
-        date = date_tag.get_text() if date_tag else 'No date available'
-        
-        # Extract article content
-        article_body = soup.find('h2', class_='summary')
-        if article_body:
-            article_content = article_body.get_text()
-            # paragraphs = article_body.find_all('p')
-            # article_content = ' '.join([p.text for p in paragraphs])
-            return {'url': url, 'title': title, 'date': date, 'content': article_content, 'ticker': ticker}
-        else:
-            return None
+        # Title, date and summary are parsed without building the rest of the page
+        return extract_et_article(response.text, url, ticker)
         
+    @timed('get_et_news', export=True)
     def get_et_news(self):
+        # selenium is only needed for this headless-browser path, so importing the class stays cheap
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
         options = Options()
         options.add_argument('--ignore-certificate-errors')
         options.add_argument('--start-maximized')
@@ -99,22 +86,17 @@ class GetETNewsArticles:
             try:
                 wait.until(EC.element_to_be_clickable((By.XPATH, '//span[@class="tab"][1]'))).click()
                 break
-            except:
+            except Exception as e:
                 print("Error")
+                METRICS.error('et_news_tab', e)
                 sleep(2)
 
         # Keep this increase if response empty or slow network
         sleep(5)
         html_content = wait.until(EC.element_to_be_clickable((By.XPATH, '//div[@class="news"]'))).get_attribute("innerHTML")
-        soup = BeautifulSoup(html_content, "html.parser")
         driver.quit()
         
-        each_stories = soup.find_all('div', class_='eachStory')
-        for story in each_stories:
-            # Find the <a> tag within each "eachStory" element and extract the href attribute
-            a_tag = story.find('a')
-            if a_tag and 'href' in a_tag.attrs and a_tag['href'].endswith('.cms'):
-                article_links.append(a_tag['href'])
+        article_links.extend(extract_et_listing_links(html_content))
                 
         # Loop through each article link and extract details
         for link in article_links:
@@ -122,5 +104,6 @@ class GetETNewsArticles:
             if article_details:
                 all_articles_content.append(article_details)
                 
+        METRICS.rows('get_et_news', rows_in=len(article_links), rows_out=len(all_articles_content))
         if all_articles_content:
             self.news_data = pd.DataFrame(all_articles_content)
\ No newline at end of file
@@ -0,0 +1,100 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from bs4 import BeautifulSoup, SoupStrainer
+from .metrics import timed
+
+# html.parser gives the same trees as the original scrapers; 'lxml' is faster when installed
+DEFAULT_PARSER = 'html.parser'
+
+
+def has_class(*names):
+    """Match a raw class attribute that contains one of names, e.g. 'artTitle font_faus'"""
+    return re.compile(r'(^|\s)(' + '|'.join(names) + r')(\s|$)')
+
+
+# Only the elements each extractor reads are turned into Tag objects, the rest of the page is skipped
+ET_ARTICLE = SoupStrainer(['h1', 'time', 'h2'], class_=has_class('artTitle', 'jsdtTime', 'summary'))
+ET_LISTING = SoupStrainer('div', class_=has_class('eachStory'))
+ET_FULL_BTN = SoupStrainer('a', class_=has_class('full_btn'))
+YAHOO_ARTICLE = SoupStrainer(['h1', 'time', 'div'])
+
+
+@timed('extract_et_article', metric='parse_seconds')
+def extract_et_article(html, url, ticker, parser=DEFAULT_PARSER):
+    """Extract an Economic Times article, None when the page has no summary"""
+    soup = BeautifulSoup(html, parser, parse_only=ET_ARTICLE)
+
+    title_tag = soup.find('h1', class_='artTitle')
+    title = title_tag.get_text() if title_tag else 'No title available'
+
+    date_tag = soup.find('time', class_='jsdtTime')
+    date = date_tag.get_text() if date_tag else 'No date available'
+
+    article_body = soup.find('h2', class_='summary')
+    if article_body:
+        return {'url': url, 'title': title, 'date': date, 'content': article_body.get_text(), 'ticker': ticker}
+    return None
+
+
+@timed('extract_yahoo_article', metric='parse_seconds')
+def extract_yahoo_article(html, url, ticker, parser=DEFAULT_PARSER):
+    """Extract a Yahoo Finance article, None when the page has no caas-body"""
+    soup = BeautifulSoup(html, parser, parse_only=YAHOO_ARTICLE)
+
+    title_tag = soup.find('h1', {'data-test-locator': 'headline'})
+    title = title_tag.get_text() if title_tag else 'No title available'
+
+    date_tag = soup.find('time')
+    date = date_tag['datetime'] if date_tag else 'No date available'
+
+    article_body = soup.find('div', class_='caas-body')
+    if article_body:
+        paragraphs = article_body.find_all('p')
+        article_content = ' '.join([p.text for p in paragraphs])
+        return {'url': url, 'title': title, 'date': date, 'content': article_content, 'ticker': ticker}
+    return None
+
+
+@timed('extract_et_listing_links', metric='parse_seconds')
+def extract_et_listing_links(html, parser=DEFAULT_PARSER):
+    """Return the .cms article links of every eachStory block on an ET news listing"""
+    soup = BeautifulSoup(html, parser, parse_only=ET_LISTING)
+    links = []
+    for story in soup.find_all('div', class_='eachStory'):
+        a_tag = story.find('a')
+        if a_tag and 'href' in a_tag.attrs and a_tag['href'].endswith('.cms'):
+            links.append(a_tag['href'])
+    return links
+
+
+@timed('extract_et_full_btn', metric='parse_seconds')
+def extract_et_full_btn(html, parser=DEFAULT_PARSER):
+    """Return the 'view all news' link of an ET company page"""
+    soup = BeautifulSoup(html, parser, parse_only=ET_FULL_BTN)
+    a_tag = soup.find('a', class_='full_btn')
+    if a_tag and 'href' in a_tag.attrs:
+        return a_tag['href']
+    return None
+
+
+EXTRACTORS = {
+    'et': extract_et_article,
+    'yahoo': extract_yahoo_article,
+}
+
+
+def _extract_page(args):
+    source, html, url, ticker, parser = args
+    return EXTRACTORS[source](html, url, ticker, parser)
+
+
+def extract_articles(pages, source='et', processes=None, parser=DEFAULT_PARSER, chunksize=32):
+    """Extract (html, url, ticker) pages in a process pool for bulk backfills, keeping input order"""
+    tasks = ((source, html, url, ticker, parser) for html, url, ticker in pages)
+    if processes == 1:
+        records = map(_extract_page, tasks)
+        return [record for record in records if record]
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        records = executor.map(_extract_page, tasks, chunksize=chunksize)
+        return [record for record in records if record]
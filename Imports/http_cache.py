@@ -0,0 +1,190 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from email.utils import formatdate
+from urllib.parse import urlsplit
+from .http_client import get_client
+from .metrics import METRICS
+
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response built from a cached body"""
+    def __init__(self, url, status_code, content, headers=None, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def encoding(self):
+        match = re.search(r'charset=([\w-]+)', self.headers.get('Content-Type', ''))
+        return match.group(1) if match else 'utf-8'
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+
+class HTTPCache:
+    # Response headers kept with a cached body, by lower-case name, stored under their canonical names
+    STORED_HEADERS = {'content-type': 'Content-Type', 'etag': 'ETag', 'last-modified': 'Last-Modified'}
+    # (url pattern, ttl in seconds); None means the page never expires
+    DEFAULT_TTLS = [
+        (r'economictimes\.indiatimes\.com/.*/articleshow/', None),
+        (r'finance\.yahoo\.com/news/.*\.html', None),
+        (r'/stocks/companyid-|/stocksupdate/|/quote/', 15 * 60),
+    ]
+
+    def __init__(self, cache_dir='.http_cache', max_bytes=512 * 1024 * 1024, ttls=None, default_ttl=60 * 60, session=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in (ttls if ttls is not None else self.DEFAULT_TTLS)]
+        self.default_ttl = default_ttl
+        self.session = session
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0}
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self.load_index()
+
+    def load_index(self):
+        """Rebuild the in-memory index from the metadata files on disk"""
+        index = {}
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            key = name[:-len('.json')]
+            body_path = os.path.join(self.cache_dir, key + '.body')
+            if not os.path.exists(body_path):
+                continue
+            with open(os.path.join(self.cache_dir, name), 'r') as f:
+                meta = json.load(f)
+            meta['size'] = os.path.getsize(body_path)
+            # The body's mtime doubles as the last access time for LRU eviction
+            meta['last_access'] = os.path.getmtime(body_path)
+            index[meta['url']] = meta
+        return index
+
+    def key_for(self, url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def ttl_for(self, url):
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def is_fresh(self, url, meta):
+        ttl = self.ttl_for(url)
+        return ttl is None or time.time() - meta['fetched_at'] < ttl
+
+    def paths_for(self, url):
+        key = self.key_for(url)
+        return os.path.join(self.cache_dir, key + '.body'), os.path.join(self.cache_dir, key + '.json')
+
+    def read(self, url, meta):
+        body_path, _ = self.paths_for(url)
+        with open(body_path, 'rb') as f:
+            content = f.read()
+        now = time.time()
+        os.utime(body_path, (now, now))
+        meta['last_access'] = now
+        return CachedResponse(url, meta['status_code'], content, meta['headers'], from_cache=True)
+
+    def write_meta(self, url, meta):
+        _, meta_path = self.paths_for(url)
+        stored = {k: v for k, v in meta.items() if k not in ('size', 'last_access')}
+        with open(meta_path, 'w') as f:
+            json.dump(stored, f)
+
+    def store(self, url, response):
+        body_path, _ = self.paths_for(url)
+        with open(body_path, 'wb') as f:
+            f.write(response.content)
+        # Header names are case-insensitive, servers send 'etag' or 'Etag' as often as 'ETag'
+        headers = {self.STORED_HEADERS[k.lower()]: v for k, v in response.headers.items() if k.lower() in self.STORED_HEADERS}
+        meta = {
+            'url': url,
+            'status_code': response.status_code,
+            'headers': headers,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'size': len(response.content),
+            'last_access': time.time(),
+        }
+        self.write_meta(url, meta)
+        self.index[url] = meta
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = sum(meta['size'] for meta in self.index.values())
+        if total <= self.max_bytes:
+            return
+        for url, meta in sorted(self.index.items(), key=lambda item: item[1]['last_access']):
+            if total <= self.max_bytes:
+                break
+            for path in self.paths_for(url):
+                if os.path.exists(path):
+                    os.remove(path)
+            total -= meta['size']
+            del self.index[url]
+
+    def get(self, url, headers=None, session=None):
+        """Return the page at url, from disk when fresh or still valid upstream"""
+        with self.lock:
+            meta = self.index.get(url)
+            if meta is not None and self.is_fresh(url, meta):
+                self.stats['hits'] += 1
+                response = self.read(url, meta)
+                METRICS.http(urlsplit(url).netloc, response.status_code, len(response.content), source='cache')
+                return response
+
+        request_headers = dict(headers or {})
+        if meta is not None:
+            if meta.get('etag'):
+                request_headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                request_headers['If-Modified-Since'] = meta['last_modified']
+            elif not meta.get('etag'):
+                request_headers['If-Modified-Since'] = formatdate(meta['fetched_at'], usegmt=True)
+
+        response = (session or self.session or get_client()).get(url, headers=request_headers)
+
+        with self.lock:
+            if response.status_code == 304 and url in self.index:
+                self.stats['revalidated'] += 1
+                meta = self.index[url]
+                meta['fetched_at'] = time.time()
+                self.write_meta(url, meta)
+                response = self.read(url, meta)
+                METRICS.http(urlsplit(url).netloc, response.status_code, len(response.content), source='revalidated')
+                return response
+
+            self.stats['misses'] += 1
+            if response.ok and response.status_code != 304:
+                self.store(url, response)
+        return response
+
+    def clear(self):
+        with self.lock:
+            for url in list(self.index):
+                for path in self.paths_for(url):
+                    if os.path.exists(path):
+                        os.remove(path)
+            self.index = {}
+
+
+def cached_get(url, headers=None, cache=None, session=None):
+    """Fetch url through the cache when one is configured"""
+    if cache is not None:
+        return cache.get(url, headers=headers, session=session)
+    return (session or get_client()).get(url, headers=headers)
@@ -0,0 +1,115 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from .metrics import METRICS
+
+
+class TokenBucket:
+    """Allow `rate` requests per second on average with bursts of up to `capacity`"""
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HTTPClient:
+    # (requests per second, burst) per host; anything else uses default_rate
+    DEFAULT_RATE_LIMITS = {
+        'finance.yahoo.com': (0.5, 2),
+        'economictimes.indiatimes.com': (4, 8),
+        'www.google.com': (1, 2),
+    }
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, rate_limits=None, default_rate=(5, 10), max_retries=5, backoff_base=1.0, backoff_max=60.0, pool_size=20, timeout=30):
+        self.rate_limits = dict(self.DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits)
+        self.default_rate = default_rate
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.limiters = {}
+        self.lock = threading.Lock()
+
+        # One keep-alive session so connections are reused across requests and threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def limiter_for(self, host):
+        with self.lock:
+            if host not in self.limiters:
+                rate, capacity = self.rate_limits.get(host, self.default_rate)
+                self.limiters[host] = TokenBucket(rate, capacity)
+            return self.limiters[host]
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """Honour Retry-After when the host sends one, otherwise full-jitter exponential backoff"""
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                try:
+                    return min(self.backoff_max, max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()))
+                except (TypeError, ValueError):
+                    pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(self, url, headers=None, **kwargs):
+        host = urlsplit(url).netloc
+        limiter = self.limiter_for(host)
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire()
+            # Latency is measured after the rate limiter, so it is the host's and not our own throttling
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, headers=headers, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                METRICS.error('http_get', e)
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff_delay(attempt))
+                continue
+            METRICS.http(host, response.status_code, len(response.content), time.perf_counter() - start)
+
+            if response.status_code in self.RETRY_STATUSES and attempt < self.max_retries:
+                METRICS.inc('http_retries_total', host=host, status=str(response.status_code))
+                time.sleep(self.backoff_delay(attempt, response.headers.get('Retry-After')))
+                continue
+            return response
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the HTTPClient shared by all scrapers in the process"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HTTPClient()
+        return _default_client
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import numpy as np
+import torch
+from sklearn.metrics import accuracy_score, roc_auc_score
+
+
+ALPACA_PROMPT = """Below is an instruction that describes a task, paired with an input that provides further context. Write a response that appropriately completes the request.
+
+### Instruction:
+{}
+
+### Input:
+{}
+
+### Response:
+"""
+INSTRUCTION = ("Given the following market data. Return strictly a single word as prediction value which is "
+               "'bullish' if the market is absolutely 'bullish' or 'bearish' if the market is absolutely 'bearish'.")
+
+
+class LabelScorer:
+    """Scores the bullish/bearish continuations of evaluation prompts with one forward pass per
+    length bucket of any Hugging Face causal LM, instead of generating and parsing text"""
+    def __init__(self, model, tokenizer, labels=('bearish', 'bullish'), template=ALPACA_PROMPT, instruction=INSTRUCTION, max_batch_tokens=16384, max_length=2048,
+                 cache=None, model_id=None, revision=None, adapter_revision=None):
+        self.model = model.eval()
+        self.tokenizer = tokenizer
+        self.labels = list(labels)
+        self.template = template
+        self.instruction = instruction
+        # Batches are filled up to this many (rows x padded length) tokens
+        self.max_batch_tokens = max_batch_tokens
+        self.max_length = max_length
+        self.pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else (tokenizer.eos_token_id or 0)
+        self.label_ids = [tokenizer(label, add_special_tokens=False)['input_ids'] for label in self.labels]
+        # When every label is one distinct token the prompt alone is scored: one row per prompt
+        first_tokens = [ids[0] for ids in self.label_ids]
+        self.single_token = all(len(ids) == 1 for ids in self.label_ids) and len(set(first_tokens)) == len(first_tokens)
+        self.temperature = 1.0
+        self.padding_stats = {'tokens': 0, 'padded_tokens': 0}
+        # Optional PredictionCache, consulted before the model. Entries are tied to the model's name_or_path and
+        # revision, which must be given, the adapter revision and the tokenizer and truncation settings
+        self.cache = cache
+        self.model_id = model_id
+        self.revision = revision
+        self.adapter_revision = adapter_revision
+        if cache is not None:
+            if not model_id or not revision:
+                raise ValueError("A LabelScorer with a cache needs model_id (the model's name_or_path) and its revision")
+            self.cache_settings = self.tokenizer_settings()
+
+    def tokenizer_settings(self):
+        """What besides the model decides the scores of a prompt: the tokenizer's vocabulary and the truncation"""
+        vocab = json.dumps(sorted(self.tokenizer.get_vocab().items()))
+        return {'tokenizer': getattr(self.tokenizer, 'name_or_path', None) or type(self.tokenizer).__name__,
+                'vocab': hashlib.sha256(vocab.encode('utf-8')).hexdigest(), 'label_ids': self.label_ids,
+                'max_length': self.max_length, 'truncation': 'left'}
+
+    def format_prompts(self, inputs):
+        return [self.template.format(self.instruction, text) for text in inputs]
+
+    def length_buckets(self, lengths):
+        """Batches of row indices with similar lengths, sorted so padding stays small"""
+        order = np.argsort(lengths, kind='stable')
+        batch = []
+        for index in order:
+            # Rows are sorted by length, so the current row sets the padded width of the batch
+            if batch and (len(batch) + 1) * lengths[index] > self.max_batch_tokens:
+                yield batch
+                batch = []
+            batch.append(index)
+        if batch:
+            yield batch
+
+    def pad(self, sequences):
+        # Left padding puts the end of every sequence, where the labels are scored, in the same columns
+        width = max(len(seq) for seq in sequences)
+        input_ids = torch.full((len(sequences), width), self.pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(sequences), width), dtype=torch.long)
+        for row, seq in enumerate(sequences):
+            input_ids[row, width - len(seq):] = torch.tensor(seq, dtype=torch.long)
+            attention_mask[row, width - len(seq):] = 1
+        self.padding_stats['tokens'] += int(attention_mask.sum())
+        self.padding_stats['padded_tokens'] += input_ids.numel()
+        return input_ids.to(self.model.device), attention_mask.to(self.model.device)
+
+    def last_log_probs(self, sequences, keep):
+        """Log-probabilities of the next token at the last `keep` positions of every sequence"""
+        input_ids, attention_mask = self.pad(sequences)
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+        try:
+            # Models that support it only project the kept positions onto the vocabulary
+            logits = self.model(input_ids=input_ids, attention_mask=attention_mask, position_ids=position_ids, logits_to_keep=keep).logits
+        except TypeError:
+            logits = self.model(input_ids=input_ids, attention_mask=attention_mask, position_ids=position_ids).logits
+        return torch.log_softmax(logits[:, -keep:].float(), dim=-1)
+
+    def label_log_likelihoods(self, inputs):
+        """Log-likelihood of every label continuation after every prompt, shape (n_prompts, n_labels)"""
+        if self.cache is None:
+            return self.score_prompts(inputs)
+        template = '\x1f'.join([self.template, self.instruction] + self.labels)
+        keys = [self.cache.key(self.model_id, self.revision, self.adapter_revision, self.cache_settings, template, text) for text in inputs]
+        cached = self.cache.get_many(keys)
+        # Only prompts the model has not scored before are run, each distinct one once
+        missing = list(dict.fromkeys(key for key in keys if key not in cached))
+        if missing:
+            first_input = {}
+            for key, text in zip(keys, inputs):
+                first_input.setdefault(key, text)
+            scores = self.score_prompts([first_input[key] for key in missing])
+            computed = dict(zip(missing, scores.tolist()))
+            self.cache.put_many(computed.items())
+            cached.update(computed)
+        return np.array([cached[key] for key in keys], dtype=np.float64).reshape(len(keys), len(self.labels))
+
+    @torch.inference_mode()
+    def score_prompts(self, inputs):
+        prompt_ids = self.tokenizer(self.format_prompts(inputs), add_special_tokens=True)['input_ids']
+        longest_label = max(len(ids) for ids in self.label_ids)
+        # Truncate from the left so the response marker and the newest values are kept
+        prompt_ids = [ids[-(self.max_length - longest_label):] for ids in prompt_ids]
+        scores = np.zeros((len(prompt_ids), len(self.labels)), dtype=np.float64)
+
+        if self.single_token:
+            first_tokens = [ids[0] for ids in self.label_ids]
+            lengths = np.array([len(ids) for ids in prompt_ids])
+            for batch in self.length_buckets(lengths):
+                log_probs = self.last_log_probs([prompt_ids[i] for i in batch], 1)
+                scores[batch] = log_probs[:, -1, first_tokens].cpu().numpy()
+            return scores
+
+        # Multi-token labels: one row per (prompt, label), all scored in the same forward pass
+        rows = [(p, l) for p in range(len(prompt_ids)) for l in range(len(self.labels))]
+        sequences = [prompt_ids[p] + self.label_ids[l] for p, l in rows]
+        lengths = np.array([len(seq) for seq in sequences])
+        for batch in self.length_buckets(lengths):
+            # Position -k-1 predicts the k-th token from the end
+            log_probs = self.last_log_probs([sequences[i] for i in batch], longest_label + 1)
+            for row, index in enumerate(batch):
+                label = self.label_ids[rows[index][1]]
+                positions = torch.arange(longest_label - len(label), longest_label, device=log_probs.device)
+                targets = torch.as_tensor(label, device=log_probs.device)
+                scores[rows[index]] = float(log_probs[row, positions, targets].sum())
+        return scores
+
+    def probabilities(self, scores):
+        """Label probabilities from log-likelihoods, renormalised over the labels and temperature scaled"""
+        scaled = scores / self.temperature
+        scaled = scaled - scaled.max(axis=1, keepdims=True)
+        weights = np.exp(scaled)
+        return weights / weights.sum(axis=1, keepdims=True)
+
+    def fit_temperature(self, scores, targets):
+        """Temperature that minimises the log loss on held-out prompts with known labels"""
+        target_index = np.array([self.labels.index(target) for target in targets])
+        best, best_loss = 1.0, None
+        for temperature in np.exp(np.linspace(np.log(0.05), np.log(20), 200)):
+            scaled = scores / temperature
+            log_norm = np.logaddexp.reduce(scaled, axis=1)
+            loss = float(np.mean(log_norm - scaled[np.arange(len(scaled)), target_index]))
+            if best_loss is None or loss < best_loss:
+                best, best_loss = float(temperature), loss
+        self.temperature = best
+        return best
+
+    def predict_proba(self, inputs):
+        return self.probabilities(self.label_log_likelihoods(inputs))
+
+    def predict(self, inputs):
+        return [self.labels[i] for i in self.predict_proba(inputs).argmax(axis=1)]
+
+    def evaluate(self, df, input_col='Prompt', target_col='Target', positive='bullish'):
+        """Accuracy and ROC AUC on a Test_Xydataset-style frame, with a probability column added"""
+        probabilities = self.predict_proba(df[input_col].tolist())
+        df = df.copy()
+        df[f'P({positive})'] = probabilities[:, self.labels.index(positive)]
+        df['Prediction'] = [self.labels[i] for i in probabilities.argmax(axis=1)]
+        targets = (df[target_col] == positive).astype(int)
+        metrics = {'accuracy': accuracy_score(df[target_col], df['Prediction'])}
+        if targets.nunique() == 2:
+            metrics['roc_auc'] = roc_auc_score(targets, df[f'P({positive})'])
+        if self.cache is not None:
+            metrics['cache'] = self.cache.report()
+        return df, metrics
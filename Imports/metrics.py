@@ -0,0 +1,208 @@
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+
+class NullTimer:
+    """Shared do-nothing context manager handed out while metrics are disabled"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+class Timer:
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        if exc is not None:
+            self.metrics.error(self.labels.get('stage', self.name), exc)
+        return False
+
+
+class Metrics:
+    """Process-wide counters and latency histograms for the fetchers, scrapers and preprocessing,
+    exported as a JSON or Prometheus text snapshot. While disabled every call returns after one attribute check"""
+    # Upper bounds in seconds, the last bucket is +Inf
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, enabled=False, path=None, prefix='thesis'):
+        self.enabled = enabled
+        # Where export_run writes the snapshot, .prom for Prometheus text and anything else for JSON
+        self.path = path
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.histograms = {}
+            self.started = time.time()
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'buckets': [0] * (len(self.BUCKETS) + 1), 'count': 0, 'sum': 0.0}
+            histogram['buckets'][bisect_left(self.BUCKETS, value)] += 1
+            histogram['count'] += 1
+            histogram['sum'] += value
+
+    def timer(self, name='stage_seconds', **labels):
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self, name, labels)
+
+    def error(self, stage, error):
+        """Count an error of a stage by exception type, or by a short name when there is no exception.
+        An exception is counted once, under the first stage to report it, which is where it was raised;
+        the stages it passes through on the way out and the handlers that catch it do not count it again"""
+        if not self.enabled:
+            return
+        if not isinstance(error, str):
+            if getattr(error, '_metrics_counted', False):
+                return
+            try:
+                error._metrics_counted = True
+            except AttributeError:
+                pass
+        self.inc('errors_total', stage=stage, type=error if isinstance(error, str) else type(error).__name__)
+
+    def rows(self, stage, rows_in=None, rows_out=None):
+        if not self.enabled:
+            return
+        if rows_in is not None:
+            self.inc('rows_total', rows_in, stage=stage, direction='in')
+        if rows_out is not None:
+            self.inc('rows_total', rows_out, stage=stage, direction='out')
+
+    def http(self, host, status, size, seconds=None, source='network'):
+        """One HTTP response: count and bytes by host and source, latency of network requests by host"""
+        if not self.enabled:
+            return
+        self.inc('http_requests_total', host=host, status=str(status), source=source)
+        self.inc('http_bytes_total', size, host=host, source=source)
+        if seconds is not None:
+            self.observe('http_request_seconds', seconds, host=host)
+
+    def snapshot(self):
+        with self.lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value} for (name, labels), value in sorted(self.counters.items())]
+            histograms = []
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                cumulative, running = [], 0
+                for bound, count in zip(list(self.BUCKETS) + ['+Inf'], histogram['buckets']):
+                    running += count
+                    cumulative.append([bound, running])
+                histograms.append({'name': name, 'labels': dict(labels), 'count': histogram['count'],
+                                   'sum': histogram['sum'], 'buckets': cumulative})
+        return {'started': self.started, 'exported': time.time(), 'counters': counters, 'histograms': histograms}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        def label_text(labels, **extra):
+            labels = dict(labels, **extra)
+            if not labels:
+                return ''
+            escape = lambda value: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+        snapshot = self.snapshot()
+        lines, typed = [], set()
+        for counter in snapshot['counters']:
+            name = f"{self.prefix}_{counter['name']}"
+            if name not in typed:
+                lines.append(f'# TYPE {name} counter')
+                typed.add(name)
+            lines.append(f"{name}{label_text(counter['labels'])} {counter['value']}")
+        for histogram in snapshot['histograms']:
+            name = f"{self.prefix}_{histogram['name']}"
+            if name not in typed:
+                lines.append(f'# TYPE {name} histogram')
+                typed.add(name)
+            for bound, count in histogram['buckets']:
+                lines.append(f"{name}_bucket{label_text(histogram['labels'], le=bound)} {count}")
+            lines.append(f"{name}_sum{label_text(histogram['labels'])} {histogram['sum']}")
+            lines.append(f"{name}_count{label_text(histogram['labels'])} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(self.to_prometheus() if path.endswith('.prom') else self.to_json())
+        return path
+
+    def export_run(self):
+        """Write the snapshot to the configured path at the end of a run, if metrics are on"""
+        if self.enabled and self.path:
+            return self.export(self.path)
+        return None
+
+    def report(self, top=10):
+        """Print the stages that took the most time"""
+        stages = [(h['sum'], h['count'], h['labels'].get('stage')) for h in self.snapshot()['histograms'] if h['name'] == 'stage_seconds']
+        for total, count, stage in sorted(stages, reverse=True)[:top]:
+            print(f"{stage}: {total:.2f}s over {count} calls")
+
+
+# THESIS_METRICS=1 turns collection on for a whole batch, THESIS_METRICS_PATH=run.prom (or .json) exports it
+METRICS = Metrics(enabled=os.environ.get('THESIS_METRICS', '') not in ('', '0', 'false'), path=os.environ.get('THESIS_METRICS_PATH'))
+
+
+def get_metrics():
+    return METRICS
+
+
+def enable_metrics(path=None, enabled=True):
+    METRICS.enabled = enabled
+    if path is not None:
+        METRICS.path = path
+    return METRICS
+
+
+def timed(stage, metric='stage_seconds', export=False):
+    """Decorator recording the wall time of every call under stage; a plain call while metrics are off.
+    export=True marks the entry point of a run, the snapshot is written once the call has been recorded"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return func(*args, **kwargs)
+            try:
+                with Timer(METRICS, metric, {'stage': stage}):
+                    return func(*args, **kwargs)
+            finally:
+                if export:
+                    METRICS.export_run()
+        return wrapper
+    return decorate
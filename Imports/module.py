@@ -1,40 +1,133 @@
 import pandas as pd
 from nselib import derivatives, capital_market
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+import time
+import threading
 import warnings
-import requests
 from bs4 import BeautifulSoup
-from tqdm.notebook import tqdm
-from serpapi import GoogleSearch
 import xml.etree.ElementTree as ET
+from .http_cache import cached_get
+from .html_extract import extract_et_article, extract_et_listing_links, extract_et_full_btn
+from .option_pricing import price_option_chain
+from .backfill import BackfillCheckpoint, date_windows, merge_windows
+from .news_dates import normalize_news_dates, parse_news_date
+from .metrics import METRICS, timed
+from .progress import progress
 
 # Suppress the FutureWarning
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
 class GetFinData:
-    def __init__(self, tickers, start_date, end_date):
+    # Longest range (in days) NSE serves in one request, nselib splits longer ranges and fetches them one after another
+    WINDOW_DAYS = {'Stock': 365, 'ETF': 365, 'Index': 90}
+    # Columns identifying a row, used to drop the rows fetched twice where backfill windows overlap
+    KEY_COLUMNS = {
+        'Stock': ['Symbol', 'Series', 'Date'],
+        'ETF': ['Symbol', 'Series', 'Date'],
+        'Index': ['TIMESTAMP', 'INSTRUMENT', 'SYMBOL', 'EXPIRY_DT', 'STRIKE_PRICE', 'OPTION_TYPE'],
+    }
+
+    def __init__(self, tickers, start_date, end_date, max_workers=1, cache=None, risk_free_rate=0.065, checkpoint_dir=None, backfill_workers=4):
         self.tickers = tickers
         self.start_date = datetime.strptime(start_date, "%Y-%m-%d")
         self.end_date = datetime.strptime(end_date, "%Y-%m-%d")
+        # Number of concurrent nselib requests, 1 keeps the sequential path
+        self.max_workers = max_workers
+        # Optional HTTPCache shared by the news scrapers
+        self.cache = cache
+        # Annualised rate used to price option chains, roughly the 91-day T-bill yield
+        self.risk_free_rate = risk_free_rate
+        # Completed history windows are kept here so an interrupted backfill resumes instead of starting over
+        self.checkpoint = BackfillCheckpoint(checkpoint_dir) if checkpoint_dir else None
+        # Upper bound on concurrent history requests, shared by all tickers fetched at the same time
+        self.backfill_workers = max(1, backfill_workers)
+        self.backfill_slots = threading.BoundedSemaphore(self.backfill_workers)
         self.hist_dat = {}
         self.options_dat = {}
         self.news_data = pd.DataFrame()
+        self.new_news_data = pd.DataFrame()
+        # Incremental news state: article URLs already in the corpus and the newest article date per ticker
+        self.seen_urls = set()
+        self.news_watermarks = {}
+        # Windows that could not be fetched, per (asset type, ticker); their history is incomplete until a rerun
+        self.missing_windows = {}
+        self.run_time = None
         
-    def get_past_data(self, ticker, asset_type):
-        try:
+    def fetch_window(self, ticker, asset_type, start, end):
+        from_date, to_date = start.strftime('%d-%m-%Y'), end.strftime('%d-%m-%Y')
+        with self.backfill_slots:
             if asset_type == "Stock" or asset_type == "ETF":
-                historical_data = capital_market.price_volume_and_deliverable_position_data(symbol=ticker, period='1Y')
+                historical_data = capital_market.price_volume_and_deliverable_position_data(symbol=ticker, from_date=from_date, to_date=to_date)
             elif asset_type == "Index":
-                historical_data = derivatives.future_price_volume_data(symbol=ticker, instrument='FUTIDX', from_date=self.start_date.strftime('%d-%m-%Y'), to_date=self.end_date.strftime('%d-%m-%Y'))
-            df = pd.DataFrame(historical_data)
+                historical_data = derivatives.future_price_volume_data(symbol=ticker, instrument='FUTIDX', from_date=from_date, to_date=to_date)
+            else:
+                raise ValueError(f"Unknown asset type {asset_type}, expected one of {list(self.WINDOW_DAYS)}")
+        return pd.DataFrame(historical_data)
+
+    @timed('backfill')
+    def backfill(self, ticker, asset_type, start_date=None, end_date=None):
+        """History of ticker from start_date to end_date (the dates given to GetFinData by default), fetched in windows
+        NSE serves in one request, backfill_workers at a time. With a checkpoint_dir every finished window is saved,
+        so rerunning after a crash or failed windows only fetches what is missing. Windows that failed are listed
+        in the frame's attrs['missing_windows'] and in missing_windows"""
+        if asset_type not in self.WINDOW_DAYS:
+            raise ValueError(f"Unknown asset type {asset_type}, expected one of {list(self.WINDOW_DAYS)}")
+        start_date = start_date or self.start_date
+        end_date = end_date or self.end_date
+        windows = date_windows(start_date, end_date, self.WINDOW_DAYS[asset_type])
+        frames, pending = {}, []
+        for window in windows:
+            df = self.checkpoint.load(asset_type, ticker, *window) if self.checkpoint else None
+            if df is None:
+                pending.append(window)
+            else:
+                frames[window] = df
+        METRICS.inc('backfill_windows_total', len(frames), source='checkpoint')
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=self.backfill_workers) as executor:
+            futures = {executor.submit(self.fetch_window, ticker, asset_type, *window): window for window in pending}
+            for future in as_completed(futures):
+                start, end = window = futures[future]
+                try:
+                    df = future.result()
+                except Exception as e:
+                    print(f"Error fetching historical data for {ticker} from {start:%d-%m-%Y} to {end:%d-%m-%Y}: {e}")
+                    METRICS.error('backfill', e)
+                    failed.append(window)
+                    continue
+                METRICS.inc('backfill_windows_total', source='network')
+                # A window reaching today can still get rows, only closed windows are checkpointed
+                if self.checkpoint and end.date() < datetime.now().date():
+                    self.checkpoint.save(asset_type, ticker, start, end, df)
+                frames[window] = df
+        df = merge_windows([frames[window] for window in windows if window in frames], self.KEY_COLUMNS[asset_type])
+        failed = sorted(failed)
+        if failed:
+            print(f"{len(failed)} of {len(windows)} windows failed for {ticker}, its history is incomplete, run again to fetch them")
+            self.missing_windows[(asset_type, ticker)] = failed
+        else:
+            self.missing_windows.pop((asset_type, ticker), None)
+        df.attrs['missing_windows'] = failed
+        return df
+
+    @timed('get_past_data')
+    def get_past_data(self, ticker, asset_type):
+        try:
+            df = self.backfill(ticker, asset_type)
             if df.empty:
                 print(f"No historical data found for {ticker}")
             df['Ticker'] = ticker
+            METRICS.rows('get_past_data', rows_out=len(df))
             return df
         except Exception as e:
             print(f"Error fetching historical data for {ticker}: {e}")
+            METRICS.error('get_past_data', e)
             return pd.DataFrame()     
     
+    @timed('get_options_data')
     def get_options_data(self, ticker):
         try:
             options_data = derivatives.nse_live_option_chain(symbol=ticker)
@@ -42,87 +135,145 @@ class GetFinData:
                 print(f"No options data found for {ticker}")
                 return pd.DataFrame()
 
-            records = []
-            for i in range(len(options_data)):
-                record_call = {
-                    'Date': options_data.at[i, 'Fetch_Time'],
-                    'Ticker': options_data.at[i, 'Symbol'],
-                    'Option Type': 'call',
-                    'Strike Price': options_data.at[i, 'Strike_Price'],
-                    'Expiry Date': options_data.at[i, 'Expiry_Date'],
-                    'Option Close Price': options_data.at[i, 'CALLS_LTP'],
-                    'Implied Volatility': options_data.at[i, 'CALLS_IV'],
-                    'Open Interest': options_data.at[i, 'CALLS_OI'],
-                    'Volume': options_data.at[i, 'CALLS_Volume'],
-                    'Delta': options_data.at[i, 'CALLS_Delta'] if 'CALLS_Delta' in options_data.columns else None,
-                    'Gamma': options_data.at[i, 'CALLS_Gamma'] if 'CALLS_Gamma' in options_data.columns else None,
-                    'Theta': options_data.at[i, 'CALLS_Theta'] if 'CALLS_Theta' in options_data.columns else None,
-                    'Vega': options_data.at[i, 'CALLS_Vega'] if 'CALLS_Vega' in options_data.columns else None
-                }
-                records.append(record_call)
-                
-                record_put = {
-                    'Date': options_data.at[i, 'Fetch_Time'],
-                    'Ticker': options_data.at[i, 'Symbol'],
-                    'Option Type': 'put',
-                    'Strike Price': options_data.at[i, 'Strike_Price'],
-                    'Expiry Date': options_data.at[i, 'Expiry_Date'],
-                    'Option Close Price': options_data.at[i, 'PUTS_LTP'],
-                    'Implied Volatility': options_data.at[i, 'PUTS_IV'],
-                    'Open Interest': options_data.at[i, 'PUTS_OI'],
-                    'Volume': options_data.at[i, 'PUTS_Volume'],
-                    'Delta': options_data.at[i, 'PUTS_Delta'] if 'PUTS_Delta' in options_data.columns else None,
-                    'Gamma': options_data.at[i, 'PUTS_Gamma'] if 'PUTS_Gamma' in options_data.columns else None,
-                    'Theta': options_data.at[i, 'PUTS_Theta'] if 'PUTS_Theta' in options_data.columns else None,
-                    'Vega': options_data.at[i, 'PUTS_Vega'] if 'PUTS_Vega' in options_data.columns else None
-                }
-                records.append(record_put)
-            
-            df = pd.DataFrame(records)
+            df = self.reshape_options_data(options_data)
             if df.empty:
                 print(f"No options data records for {ticker}")
-            return df
+                return df
         except Exception as e:
             print(f"Error fetching options data for {ticker}: {e}")
+            METRICS.error('get_options_data', e)
             return pd.DataFrame()
+
+        # The live chain leaves the greeks empty, fill them from the option prices. A chain that cannot be
+        # priced is still returned as fetched, with the greeks nselib reported
+        try:
+            with METRICS.timer(stage='price_option_chain'):
+                df = price_option_chain(df, self.risk_free_rate)
+        except Exception as e:
+            # Counted in errors_total by the stage timer
+            print(f"Error pricing options data for {ticker}: {e}")
+        METRICS.rows('get_options_data', rows_in=len(options_data), rows_out=len(df))
+        return df
+
+    @timed('reshape_options_data')
+    def reshape_options_data(self, options_data):
+        """Split the CALLS_*/PUTS_* column families of a live option chain into one row per strike and option type"""
+        options_data = options_data.reset_index(drop=True)
+        columns = {
+            'Option Close Price': 'LTP',
+            'Implied Volatility': 'IV',
+            'Open Interest': 'OI',
+            'Volume': 'Volume'
+        }
+        greeks = ['Delta', 'Gamma', 'Theta', 'Vega']
+
+        frames = []
+        for prefix, option_type in (('CALLS', 'call'), ('PUTS', 'put')):
+            side = pd.DataFrame({
+                'Date': options_data['Fetch_Time'],
+                'Ticker': options_data['Symbol'],
+                'Option Type': option_type,
+                'Strike Price': options_data['Strike_Price'],
+                'Expiry Date': options_data['Expiry_Date']
+            })
+            for name, suffix in columns.items():
+                side[name] = options_data[f'{prefix}_{suffix}']
+            for greek in greeks:
+                # The greeks are missing from most nselib responses
+                col = f'{prefix}_{greek}'
+                side[greek] = options_data[col] if col in options_data.columns else None
+            frames.append(side)
+
+        # Interleave the call and put of each strike, as the record-by-record build did
+        df = pd.concat(frames).sort_index(kind='stable').reset_index(drop=True)
+        # A greek reported for only one side becomes numeric with NaN for the other
+        df[greeks] = df[greeks].infer_objects()
+        return df
         
-    def fetch_and_store_data(self, asset_type, tickers):
-        historical_data_frames = []
-        options_data_frames = []
+    def fetch_ticker_data(self, ticker, asset_type):
+        hist_df = self.get_past_data(ticker, asset_type)
+        if not hist_df.empty:
+            hist_df['Asset Type'] = asset_type
 
-        for ticker in tickers:
-            hist_df = self.get_past_data(ticker, asset_type)
-            if not hist_df.empty:
-                hist_df['Asset Type'] = asset_type
-                historical_data_frames.append(hist_df)
-            
+        opt_df = pd.DataFrame()
+        if asset_type == 'Stock':
+            opt_df = self.get_options_data(ticker)
+            if not opt_df.empty:
+                opt_df['Asset Type'] = asset_type
+        return hist_df, opt_df
+
+    def fetch_concurrently(self, asset_type, tickers):
+        """Run the historical and option-chain requests of all tickers on a bounded thread pool"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            hist_futures = [executor.submit(self.get_past_data, ticker, asset_type) for ticker in tickers]
             if asset_type == 'Stock':
-                opt_df = self.get_options_data(ticker)
+                opt_futures = [executor.submit(self.get_options_data, ticker) for ticker in tickers]
+            else:
+                opt_futures = [None] * len(tickers)
+
+            # Gather in ticker order so the row order matches the sequential path
+            results = []
+            for hist_future, opt_future in zip(hist_futures, opt_futures):
+                hist_df = hist_future.result()
+                if not hist_df.empty:
+                    hist_df['Asset Type'] = asset_type
+                opt_df = opt_future.result() if opt_future is not None else pd.DataFrame()
                 if not opt_df.empty:
                     opt_df['Asset Type'] = asset_type
-                    options_data_frames.append(opt_df)
+                results.append((hist_df, opt_df))
+        return results
+
+    def fetch_and_store_data(self, asset_type, tickers):
+        if self.max_workers and self.max_workers > 1:
+            results = self.fetch_concurrently(asset_type, tickers)
+        else:
+            results = [self.fetch_ticker_data(ticker, asset_type) for ticker in tickers]
+
+        historical_data_frames = [hist_df for hist_df, _ in results if not hist_df.empty]
+        options_data_frames = [opt_df for _, opt_df in results if not opt_df.empty]
 
         if historical_data_frames:
-            # Manually check for empty DataFrames before concatenation
-            non_empty_hist_data_frames = [df for df in historical_data_frames if not df.empty]
-            self.hist_dat[asset_type] = pd.concat(non_empty_hist_data_frames, ignore_index=True) if non_empty_hist_data_frames else pd.DataFrame()
+            self.hist_dat[asset_type] = pd.concat(historical_data_frames, ignore_index=True)
         
         if options_data_frames:
-            # Manually check for empty DataFrames before concatenation
-            non_empty_options_data_frames = [df for df in options_data_frames if not df.empty]
-            self.options_dat[asset_type] = pd.concat(non_empty_options_data_frames, ignore_index=True) if non_empty_options_data_frames else pd.DataFrame()
+            self.options_dat[asset_type] = pd.concat(options_data_frames, ignore_index=True)
 
+    @timed('run', export=True)
     def run(self):
+        start = time.perf_counter()
         for asset_type, ticker_list in self.tickers.items():
             self.fetch_and_store_data(asset_type, ticker_list)
+        self.run_time = time.perf_counter() - start
+        return self.run_time
+
+    def compare_fetch_modes(self, max_workers=8):
+        """Time a sequential run against a concurrent one and return the wall-clock speedup.
+        Both runs fetch into scratch state, hist_dat, options_dat and run_time are left as they were"""
+        configured = self.max_workers, self.hist_dat, self.options_dat, self.run_time
+        try:
+            self.max_workers, self.hist_dat, self.options_dat = 1, {}, {}
+            sequential_time = self.run()
+            self.max_workers, self.hist_dat, self.options_dat = max_workers, {}, {}
+            concurrent_time = self.run()
+        finally:
+            self.max_workers, self.hist_dat, self.options_dat, self.run_time = configured
+
+        speedup = sequential_time / concurrent_time if concurrent_time else float('inf')
+        print(f"Sequential: {sequential_time:.2f}s, concurrent ({max_workers} workers): {concurrent_time:.2f}s, speedup: {speedup:.2f}x")
+        return {'sequential': sequential_time, 'concurrent': concurrent_time, 'speedup': speedup}
+
+    def write_to_store(self, store):
+        """Save hist_dat, options_dat and news_data into a DatasetStore"""
+        return store.write_fin_data(self)
 
     def get_data(self, asset_type):
         return self.hist_dat.get(asset_type, pd.DataFrame()), self.options_dat.get(asset_type, pd.DataFrame())
 
+    @timed('get_news_data')
     def get_news_data(self, ticker):
         try:
             url = f"https://www.google.com/finance/quote/{ticker}:NSE?sa=X&ved=2ahUKEwiDhJPLw5LzAhUhyzgGHYzqBDQQ3ecFegQINBAH"
-            response = requests.get(url)
+            response = cached_get(url, cache=self.cache)
             soup = BeautifulSoup(response.content, 'html.parser')
             
             articles = soup.find_all('div', class_='yY3Lee')
@@ -144,6 +295,7 @@ class GetFinData:
             return pd.DataFrame(news_data)
         except Exception as e:
             print(f"Error fetching news data for {ticker} from Google Finance: {e}")
+            METRICS.error('get_news_data', e)
             return pd.DataFrame()
     
     # Function to parse XML and extract company details
@@ -168,14 +320,18 @@ class GetFinData:
         url = f"{base_url}/{ticker_name}/stocks/companyid-{cid}.cms"
         return url
     
-    def get_page(self, url, headers) :
-        """ Download a webpage and return a beautiful soup doc"""
-        response = requests.get(url, headers=headers)
+    def get_page_html(self, url, headers):
+        """ Download a webpage and return its html"""
+        response = cached_get(url, headers=headers, cache=self.cache)
         if not response.ok:
             print('Status code:', response.status_code)
+            METRICS.error('get_page_html', f'HTTP {response.status_code}')
             raise Exception('Failed to load page {}'.format(url))
-        
-        page_content = response.text
+        return response.text
+    
+    def get_page(self, url, headers) :
+        """ Download a webpage and return a beautiful soup doc"""
+        page_content = self.get_page_html(url, headers)
         doc = BeautifulSoup(page_content, 'html.parser')
         return doc
     
@@ -184,31 +340,33 @@ class GetFinData:
         base_url = "https://economictimes.indiatimes.com"
         url = f"{base_url}{uri}"
         """Extract content from a news article"""
-        response = requests.get(url, headers=headers)
+        response = cached_get(url, headers=headers, cache=self.cache)
         if not response.ok:
             print(f'Failed to fetch article: {url}')
+            METRICS.error('extract_article_content', f'HTTP {response.status_code}')
             return None
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract title
-        title_tag = soup.find('h1', class_='artTitle')
-        title = title_tag.get_text() if title_tag else 'No title available'
-        
-        # Extract date
-        date_tag = soup.find('time', class_='jsdtTime')
-        date = date_tag.get_text() if date_tag else 'No date available'
-        
-        # Extract article content
-        article_body = soup.find('h2', class_='summary')
-        if article_body:
-            article_content = article_body.get_text()
-            # paragraphs = article_body.find_all('p')
-            # article_content = ' '.join([p.text for p in paragraphs])
-            return {'url': url, 'title': title, 'date': date, 'content': article_content, 'ticker': ticker}
-        else:
-            return None
+        # Title, date and summary are parsed without building the rest of the page
+        return extract_et_article(response.text, url, ticker)
     
-    def gather_news(self, batch):
+    def load_news_corpus(self, path):
+        """Load an existing news corpus so gather_news(incremental=True) only fetches what is new"""
+        self.news_data = pd.read_csv(path)
+        self.new_news_data = pd.DataFrame()
+        self.seen_urls = set(self.news_data['url'])
+        dates, _ = normalize_news_dates(self.news_data['date'])
+        self.news_watermarks = dates.groupby(self.news_data['ticker']).max().dropna().to_dict()
+        return self.news_data
+
+    def save_news_corpus(self, path):
+        """Append the rows fetched by the last incremental gather_news to the corpus file"""
+        if self.new_news_data.empty:
+            return 0
+        write_header = not os.path.exists(path)
+        self.new_news_data.to_csv(path, mode='a', header=write_header, index=False)
+        return len(self.new_news_data)
+
+    @timed('gather_news', export=True)
+    def gather_news(self, batch, incremental=False):
         # all_news_data = []
         # for ticker in self.tickers["Stock"]:  # Assuming we're only gathering news for stocks
         #     news_df = self.get_news_data(ticker)
@@ -221,42 +379,55 @@ class GetFinData:
         #     print("No news data to gather.")
         
         # Initialize an empty list to store the articles' details
-        article_links = []
         all_articles_content = []
         
         # Parse the XML file
         xml_file = 'nifty50_companies.xml'
         
-        for ticker in tqdm(batch, desc="Fetching article content"):
+        tickers = progress(batch, desc="Fetching article content")
+        for ticker in tickers:
+            # The ticker being fetched is shown on the bar, when there is one
+            if hasattr(tickers, 'set_postfix_str'):
+                tickers.set_postfix_str(ticker)
             company_dets = self.parse_xml(xml_file, ticker)
-            print(ticker)
             url = self.construct_url(company_dets)
             headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
             
-            response = requests.get(url, headers=headers)
+            response = cached_get(url, headers=headers, cache=self.cache)
             # print("response.ok : {} , response.status_code : {}".format(response.ok , response.status_code))
-            soup = BeautifulSoup(response.content, 'html.parser')            
-            a_tag = soup.find('a', class_='full_btn')
-            if a_tag and 'href' in a_tag.attrs:
-                ticker_url = a_tag['href']   
-                document_dets = self.get_page(ticker_url, headers)
-                               
-                each_stories = document_dets.find_all('div', class_='eachStory')
-                for story in each_stories:
-                    # Find the <a> tag within each "eachStory" element and extract the href attribute
-                    a_tag = story.find('a')
-                    if a_tag and 'href' in a_tag.attrs and a_tag['href'].endswith('.cms'):
-                        article_links.append(a_tag['href'])
+            ticker_url = extract_et_full_btn(response.content)
+            if ticker_url:
+                document_html = self.get_page_html(ticker_url, headers)
+                
+                # Links are collected per ticker so earlier tickers' articles are not fetched again
+                article_links = extract_et_listing_links(document_html)
                         
                 # Loop through each article link and extract details
+                watermark = self.news_watermarks.get(ticker)
                 for link in article_links:
+                    if incremental and f"https://economictimes.indiatimes.com{link}" in self.seen_urls:
+                        continue
                     article_details = self.extract_article_content(link, headers, ticker)
                     if article_details:
                         all_articles_content.append(article_details)
+                        self.seen_urls.add(article_details['url'])
+                        # The listing is newest first, so everything after an article older
+                        # than the watermark is already in the corpus
+                        if incremental and watermark is not None and parse_news_date(article_details['date']) <= watermark:
+                            break
                 
-        if all_articles_content:
-            self.news_data = pd.DataFrame(all_articles_content)
-        breakpoint
+        new_news_data = pd.DataFrame(all_articles_content)
+        METRICS.rows('gather_news', rows_out=len(new_news_data))
+        if incremental:
+            self.new_news_data = new_news_data
+            if not new_news_data.empty:
+                self.news_data = pd.concat([self.news_data, new_news_data], ignore_index=True)
+                dates, _ = normalize_news_dates(new_news_data['date'])
+                for ticker, latest in dates.groupby(new_news_data['ticker']).max().dropna().items():
+                    self.news_watermarks[ticker] = max(latest, self.news_watermarks.get(ticker, latest))
+            print(f"Fetched {len(new_news_data)} new articles")
+        elif all_articles_content:
+            self.news_data = new_news_data
         
         # for ticker in tqdm(self.tickers["Stock"], desc="Fetching article content"):
         #     my_url = f'https://finance.yahoo.com/quote/{ticker}.NS/news?p={ticker}.NS'
@@ -0,0 +1,227 @@
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index of news articles, kept on disk, to find syndicated copies of a story
+    that differ in a few words, URL or ticker"""
+    WORD = re.compile(r'\w+')
+
+    def __init__(self, path=None, threshold=0.8, num_perm=128, shingle_size=3, seed=1):
+        # Estimated Jaccard similarity of word shingles above which two articles are duplicates
+        self.path = path
+        meta_path = os.path.join(path, 'meta.json') if path else None
+        if meta_path and os.path.exists(meta_path):
+            # Signatures are only comparable when built with the same permutations, so a saved index keeps its settings
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            threshold, num_perm, shingle_size, seed = meta['threshold'], meta['num_perm'], meta['shingle_size'], meta['seed']
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.bands, self.rows = self.optimal_bands(threshold, num_perm)
+
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hash family, one odd multiplier per permutation
+        self.multipliers = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.increments = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self.shingle_weights = rng.integers(1, 2 ** 63, size=shingle_size, dtype=np.uint64) | np.uint64(1)
+        self.band_weights = rng.integers(1, 2 ** 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+
+        self.keys = []
+        self.key_rows = {}
+        # Signatures of the archive in the first len(keys) rows of a buffer that doubles when full
+        self.signature_buffer = np.empty((0, num_perm), dtype=np.uint32)
+        # Sorted runs of (band hashes, rows), each of shape (bands, n) and sorted per band, so lookups are binary
+        # searches. A batch adds a run and runs of similar size are merged, so adding never rewrites the archive
+        self.runs = []
+        if meta_path and os.path.exists(meta_path):
+            self.load()
+
+    @staticmethod
+    def optimal_bands(threshold, num_perm):
+        """Bands x rows split of the signature that minimises false positives plus false negatives"""
+        similarities = np.linspace(0, 1, 1001)
+        best, best_error = None, None
+        for bands in range(1, num_perm + 1):
+            rows = num_perm // bands
+            candidate = 1 - (1 - similarities ** rows) ** bands
+            false_positive = np.trapezoid(np.where(similarities < threshold, candidate, 0), similarities)
+            false_negative = np.trapezoid(np.where(similarities >= threshold, 1 - candidate, 0), similarities)
+            if best_error is None or false_positive + false_negative < best_error:
+                best, best_error = (bands, rows), false_positive + false_negative
+        return best
+
+    @property
+    def signatures(self):
+        return self.signature_buffer[:len(self.keys)]
+
+    def shingle_hashes(self, texts):
+        """64-bit hashes of the word shingles of every text, and the text each shingle belongs to"""
+        words = [self.WORD.findall(str(text).lower()) or [''] for text in texts]
+        lengths = np.fromiter((len(w) for w in words), dtype=np.int64, count=len(words))
+        word_hashes = pd.util.hash_array(np.fromiter((word for w in words for word in w), dtype=object, count=lengths.sum()))
+
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+        # Texts shorter than a shingle still get one shingle made of all their words
+        counts = np.maximum(lengths - self.shingle_size + 1, 1)
+        owner = np.repeat(np.arange(len(texts)), counts)
+        positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + starts[owner]
+
+        hashes = np.zeros(len(positions), dtype=np.uint64)
+        for offset, weight in enumerate(self.shingle_weights):
+            index = positions + offset
+            inside = index < ends[owner]
+            hashes += np.where(inside, word_hashes[np.minimum(index, len(word_hashes) - 1)], 0) * weight
+        return hashes, counts
+
+    def signatures_for(self, texts):
+        """MinHash signatures, one row of num_perm 32-bit values per text"""
+        hashes, counts = self.shingle_hashes(texts)
+        offsets = np.cumsum(counts) - counts
+        signatures = np.empty((len(counts), self.num_perm), dtype=np.uint32)
+        for i in range(self.num_perm):
+            permuted = (hashes * self.multipliers[i] + self.increments[i]) >> np.uint64(32)
+            signatures[:, i] = np.minimum.reduceat(permuted, offsets)
+        return signatures
+
+    def band_hashes(self, signatures):
+        """One 64-bit hash per band of each signature, shape (bands, n)"""
+        bands = signatures[:, :self.bands * self.rows].astype(np.uint64).reshape(len(signatures), self.bands, self.rows)
+        return (bands * self.band_weights).sum(axis=2).T
+
+    def candidates(self, band_hashes, sorted_hashes, sorted_rows):
+        """Rows of an index sharing at least one band with each query, found by binary search"""
+        found = [set() for _ in range(band_hashes.shape[1])]
+        for band in range(self.bands):
+            lo = np.searchsorted(sorted_hashes[band], band_hashes[band], side='left')
+            hi = np.searchsorted(sorted_hashes[band], band_hashes[band], side='right')
+            for query in np.flatnonzero(hi > lo):
+                found[query].update(sorted_rows[band, lo[query]:hi[query]].tolist())
+        return found
+
+    def best_match(self, signature, rows, signatures):
+        """Most similar of the candidate rows if its estimated Jaccard reaches the threshold"""
+        if not rows:
+            return None, 0.0
+        rows = np.fromiter(rows, dtype=np.int64)
+        similarity = (signatures[rows] == signature).mean(axis=1)
+        best = int(similarity.argmax())
+        if similarity[best] >= self.threshold:
+            return int(rows[best]), float(similarity[best])
+        return None, float(similarity[best])
+
+    def find_duplicates(self, texts, keys=None):
+        """For every text, ('archive', key) or ('batch', position) of the text it duplicates, else None.
+        A text whose key is already archived is not matched against its own archived copy"""
+        signatures = self.signatures_for(texts)
+        band_hashes = self.band_hashes(signatures)
+        archived = [set() for _ in texts]
+        for sorted_hashes, sorted_rows in self.runs:
+            for found, rows in zip(archived, self.candidates(band_hashes, sorted_hashes, sorted_rows)):
+                found.update(rows)
+        if keys is not None:
+            for found, key in zip(archived, keys):
+                found.discard(self.key_rows.get(str(key)))
+        # Duplicates inside the batch are matched against earlier texts of the same batch
+        order = np.argsort(band_hashes, axis=1, kind='stable')
+        in_batch = self.candidates(band_hashes, np.take_along_axis(band_hashes, order, axis=1), order)
+
+        matches = []
+        for i, signature in enumerate(signatures):
+            row, _ = self.best_match(signature, archived[i], self.signatures)
+            if row is not None:
+                matches.append(('archive', self.keys[row]))
+                continue
+            earlier = {j for j in in_batch[i] if j < i and matches[j] is None}
+            row, _ = self.best_match(signature, earlier, signatures)
+            matches.append(('batch', row) if row is not None else None)
+        return matches, signatures
+
+    def add(self, keys, signatures):
+        """Insert signatures into the index as a new sorted run; keys already archived are skipped"""
+        fresh = []
+        for i, key in enumerate(keys):
+            key = str(key)
+            if key not in self.key_rows:
+                self.key_rows[key] = len(self.keys) + len(fresh)
+                fresh.append((i, key))
+        if not fresh:
+            return
+        first_row = len(self.keys)
+        signatures = signatures[[i for i, _ in fresh]]
+        if first_row + len(signatures) > len(self.signature_buffer):
+            buffer = np.empty((max(2 * len(self.signature_buffer), first_row + len(signatures)), self.num_perm), dtype=np.uint32)
+            buffer[:first_row] = self.signatures
+            self.signature_buffer = buffer
+        self.signature_buffer[first_row:first_row + len(signatures)] = signatures
+        self.keys.extend(key for _, key in fresh)
+
+        band_hashes = self.band_hashes(signatures)
+        order = np.argsort(band_hashes, axis=1, kind='stable')
+        self.runs.append((np.take_along_axis(band_hashes, order, axis=1), order + first_row))
+        # Merging while the previous run is at most twice the size of the last keeps O(log n) runs
+        while len(self.runs) > 1 and self.runs[-2][0].shape[1] <= 2 * self.runs[-1][0].shape[1]:
+            newer = self.runs.pop()
+            self.runs[-1] = self.merge_runs(self.runs[-1], newer)
+
+    def merge_runs(self, older, newer):
+        """One sorted run holding the band hashes of both"""
+        merged_hashes = np.empty((self.bands, older[0].shape[1] + newer[0].shape[1]), dtype=np.uint64)
+        merged_rows = np.empty_like(merged_hashes, dtype=np.int64)
+        for band in range(self.bands):
+            insert_at = np.searchsorted(older[0][band], newer[0][band], side='right')
+            merged_hashes[band] = np.insert(older[0][band], insert_at, newer[0][band])
+            merged_rows[band] = np.insert(older[1][band], insert_at, newer[1][band])
+        return merged_hashes, merged_rows
+
+    def compact(self):
+        """Merge the runs into one and return it"""
+        if not self.runs:
+            return np.empty((self.bands, 0), dtype=np.uint64), np.empty((self.bands, 0), dtype=np.int64)
+        while len(self.runs) > 1:
+            newer = self.runs.pop()
+            self.runs[-1] = self.merge_runs(self.runs[-1], newer)
+        return self.runs[0]
+
+    def drop_near_duplicates(self, df, key_col='url', text_cols=('title', 'content')):
+        """Rows of df that are not near duplicates of the archive or of earlier rows; the kept rows are indexed"""
+        if df.empty:
+            return df
+        texts = df[text_cols[0]].fillna('').astype(str)
+        for col in text_cols[1:]:
+            texts = texts + ' ' + df[col].fillna('').astype(str)
+        keys = df[key_col].to_numpy()
+        matches, signatures = self.find_duplicates(texts.tolist(), keys)
+        keep = np.array([match is None for match in matches])
+        self.add(keys[keep], signatures[keep])
+        return df[keep]
+
+    def save(self, path=None):
+        path = path or self.path
+        os.makedirs(path, exist_ok=True)
+        meta = {'threshold': self.threshold, 'num_perm': self.num_perm, 'shingle_size': self.shingle_size, 'seed': self.seed}
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        with open(os.path.join(path, 'keys.json'), 'w') as f:
+            json.dump(self.keys, f)
+        sorted_hashes, sorted_rows = self.compact()
+        np.save(os.path.join(path, 'signatures.npy'), self.signatures)
+        np.save(os.path.join(path, 'sorted_hashes.npy'), sorted_hashes)
+        np.save(os.path.join(path, 'sorted_rows.npy'), sorted_rows)
+
+    def load(self, path=None):
+        path = path or self.path
+        with open(os.path.join(path, 'keys.json'), 'r') as f:
+            self.keys = json.load(f)
+        self.key_rows = {key: row for row, key in enumerate(self.keys)}
+        # Memory-mapped, so a large archive is paged in only where lookups land
+        self.signature_buffer = np.load(os.path.join(path, 'signatures.npy'), mmap_mode='r')
+        sorted_hashes = np.load(os.path.join(path, 'sorted_hashes.npy'), mmap_mode='r')
+        sorted_rows = np.load(os.path.join(path, 'sorted_rows.npy'), mmap_mode='r')
+        self.runs = [(sorted_hashes, sorted_rows)] if sorted_hashes.shape[1] else []
@@ -0,0 +1,69 @@
+import re
+import pandas as pd
+
+# Date layouts found in the scraped news, each captured by its own named group
+#   et  - Economic Times 'Last Updated: Aug 02, 2024, 12:03:00 PM IST' (IST wall clock)
+#   iso - Yahoo '2024-08-02T06:33:00.000Z' (UTC)
+NEWS_DATE_PATTERN = (
+    r'^\s*(?:'
+    r'(?:Last Updated:\s*)?(?P<et>[A-Z][a-z]{2} \d{1,2}, \d{4}, \d{1,2}:\d{2}:\d{2} [AP]M)(?:\s*IST)?'
+    r'|(?P<iso>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?)Z'
+    r')\s*$'
+)
+NEWS_DATE_FORMATS = {
+    'et': ('%b %d, %Y, %I:%M:%S %p', 'Asia/Kolkata'),
+    'iso': ('ISO8601', 'UTC'),
+}
+NEWS_DATE_REGEX = re.compile(NEWS_DATE_PATTERN)
+
+
+def normalize_news_dates(dates, tz='Asia/Kolkata'):
+    """Parse a whole news date column into timezone-aware timestamps in tz.
+    Returns the parsed series and the row counts per format, with the missing, unrecognized
+    and unparseable rows counted instead of reported one by one.
+    Dates that are already parsed, as after a first pass or a DatasetStore round trip, are only converted
+    to tz, naive ones being taken as wall clock times in tz"""
+    dates = pd.Series(dates)
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        parsed = dates.dt.tz_localize(tz) if dates.dt.tz is None else dates.dt.tz_convert(tz)
+        missing = int(parsed.isna().sum())
+        counts = {'missing': missing, **{name: 0 for name in NEWS_DATE_FORMATS}, 'datetime': len(parsed) - missing,
+                  'unrecognized': 0, 'unparseable': 0}
+        return parsed, counts
+    # Articles share timestamps, so every distinct string is matched and parsed once
+    codes, uniques = pd.factorize(dates)
+    uniques = pd.Series(uniques, dtype=object).astype(str)
+    parsed_uniques = pd.Series(pd.NaT, index=uniques.index, dtype=f'datetime64[ns, {tz}]')
+    layout = pd.Series(None, index=uniques.index, dtype=object)
+
+    # One regex pass tells which layout every value is in, then each layout is parsed in bulk
+    groups = uniques.str.extract(NEWS_DATE_PATTERN)
+    for name, (date_format, source_tz) in NEWS_DATE_FORMATS.items():
+        values = groups[name].dropna()
+        layout[values.index] = name
+        if not values.empty:
+            converted = pd.to_datetime(values, format=date_format, errors='coerce')
+            parsed_uniques[values.index] = converted.dt.tz_localize(source_tz).dt.tz_convert(tz)
+
+    missing = codes == -1
+    parsed = pd.Series(parsed_uniques.array.take(codes, allow_fill=True), index=dates.index)
+    row_layout = layout.to_numpy().take(codes)
+    row_layout[missing] = 'missing'
+    counts = {'missing': int(missing.sum())}
+    for name in NEWS_DATE_FORMATS:
+        counts[name] = int((row_layout == name).sum())
+    counts['unrecognized'] = int(pd.isna(row_layout).sum())
+    counts['unparseable'] = int((parsed.isna() & ~missing).sum()) - counts['unrecognized']
+    return parsed, counts
+
+
+def parse_news_date(value, tz='Asia/Kolkata'):
+    """Parse a single date string the way normalize_news_dates parses a column, NaT when it is not in a known
+    layout. For checks made one article at a time, where building a column per article costs far more"""
+    match = NEWS_DATE_REGEX.match(value) if isinstance(value, str) else None
+    if match is None:
+        return pd.NaT
+    for name, (date_format, source_tz) in NEWS_DATE_FORMATS.items():
+        if match.group(name) is not None:
+            parsed = pd.to_datetime(match.group(name), format=date_format, errors='coerce')
+            return parsed.tz_localize(source_tz).tz_convert(tz)
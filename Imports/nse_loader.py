@@ -0,0 +1,133 @@
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+# Column layouts of the NSE frames used in the project:
+#   price_volume - capital_market.price_volume_and_deliverable_position_data (stocks, ETFs, etf_data.csv)
+#   futidx       - derivatives.future_price_volume_data (index futures/options, index_options_data.csv)
+#   option_chain - the frames built by GetFinData.get_options_data
+NSE_SCHEMAS = {
+    'price_volume': {
+        'dates': {'Date': '%d-%b-%Y'},
+        'categories': ['Symbol', 'Series', 'Ticker', 'Asset Type'],
+        'numbers': ['PrevClose', 'OpenPrice', 'HighPrice', 'LowPrice', 'LastPrice', 'ClosePrice', 'AveragePrice',
+                    'TotalTradedQuantity', 'TurnoverInRs', 'No.ofTrades', 'DeliverableQty', '%DlyQttoTradedQty'],
+    },
+    'futidx': {
+        'dates': {'TIMESTAMP': '%d-%b-%Y', 'EXPIRY_DT': '%d-%b-%Y'},
+        'categories': ['INSTRUMENT', 'SYMBOL', 'OPTION_TYPE', 'MARKET_TYPE', 'Ticker', 'Asset Type'],
+        'numbers': ['STRIKE_PRICE', 'OPENING_PRICE', 'TRADE_HIGH_PRICE', 'TRADE_LOW_PRICE', 'CLOSING_PRICE',
+                    'LAST_TRADED_PRICE', 'PREV_CLS', 'SETTLE_PRICE', 'TOT_TRADED_QTY', 'TOT_TRADED_VAL', 'OPEN_INT',
+                    'CHANGE_IN_OI', 'MARKET_LOT', 'UNDERLYING_VALUE'],
+    },
+    'option_chain': {
+        'dates': {'Expiry Date': '%d-%b-%Y'},
+        'categories': ['Ticker', 'Option Type', 'Asset Type'],
+        'numbers': ['Strike Price', 'Option Close Price', 'Implied Volatility', 'Open Interest', 'Volume',
+                    'Delta', 'Gamma', 'Theta', 'Vega'],
+    },
+}
+
+
+def parse_indian_numbers(values):
+    """Parse lakh/crore comma-grouped strings such as '43,61,92,790.66' in one vectorized pass"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values
+    return pd.to_numeric(values.astype(str).str.replace(',', '', regex=False), errors='coerce')
+
+
+def downcast_numbers(values):
+    """Use the smallest integer type; floats stay float64, float32 drops paise on crore-sized prices and turnovers"""
+    if pd.api.types.is_integer_dtype(values):
+        return pd.to_numeric(values, downcast='integer')
+    return values
+
+
+def apply_schema(df, layout):
+    """Convert an NSE frame of strings to numbers, categoricals and datetimes in place of object columns"""
+    schema = NSE_SCHEMAS[layout]
+    df = df.drop(columns=[col for col in df.columns if str(col).startswith('Unnamed:')])
+    for col in schema['numbers']:
+        if col in df.columns:
+            df[col] = downcast_numbers(parse_indian_numbers(df[col]))
+    for col in schema['categories']:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col, date_format in schema['dates'].items():
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], format=date_format, errors='coerce')
+    return df
+
+
+def arrow_numbers(column):
+    """Strip the lakh/crore commas from a string column and cast it to the smallest integer type, or float64;
+    None when some value is not a number, for parse_indian_numbers to coerce"""
+    if pa.types.is_null(column.type):
+        return column.cast(pa.float64())
+    if pa.types.is_string(column.type):
+        column = pc.replace_substring(column, ',', '')
+        try:
+            column = column.cast(pa.int64())
+        except pa.ArrowInvalid:
+            try:
+                column = column.cast(pa.float64())
+            except pa.ArrowInvalid:
+                return None
+    if pa.types.is_integer(column.type) and len(column) > column.null_count:
+        bounds = pc.min_max(column).as_py()
+        for int_type in (pa.int8(), pa.int16(), pa.int32()):
+            info = np.iinfo(int_type.to_pandas_dtype())
+            if info.min <= bounds['min'] and bounds['max'] <= info.max:
+                return column.cast(int_type)
+    return column
+
+
+def load_nse_csv(path, layout):
+    """Read an NSE CSV with the Arrow reader and type it before the one conversion to pandas. Categories and
+    dates come in dictionary encoded, so each distinct date string is parsed once"""
+    schema = NSE_SCHEMAS[layout]
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    column_types = {col: dictionary for col in [*schema['categories'], *schema['dates']]}
+    table = pa_csv.read_csv(path, convert_options=pa_csv.ConvertOptions(column_types=column_types))
+    # The unnamed index column pandas writes by default
+    table = table.drop_columns([col for col in table.column_names if col == '' or col.startswith('Unnamed:')])
+    for col, date_format in schema['dates'].items():
+        if col in table.column_names:
+            encoded = table[col].combine_chunks()
+            dates = pc.strptime(encoded.dictionary, format=date_format, unit='us', error_is_null=True)
+            table = table.set_column(table.column_names.index(col), col, dates.take(encoded.indices))
+    unparsed = []
+    for col in schema['numbers']:
+        if col in table.column_names:
+            numbers = arrow_numbers(table[col])
+            if numbers is None:
+                unparsed.append(col)
+            else:
+                table = table.set_column(table.column_names.index(col), col, numbers)
+    df = table.to_pandas()
+    for col in unparsed:
+        df[col] = parse_indian_numbers(df[col])
+    return df
+
+
+def memory_report(path, layout):
+    """Compare the plain pd.read_csv load with load_nse_csv: time, peak traced memory and frame size"""
+    report = {}
+    for name, load in (('read_csv', lambda: pd.read_csv(path)), ('typed', lambda: load_nse_csv(path, layout))):
+        tracemalloc.start()
+        start = time.perf_counter()
+        df = load()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report[name] = {
+            'seconds': elapsed,
+            'peak_mib': peak / 2 ** 20,
+            'frame_mib': df.memory_usage(deep=True).sum() / 2 ** 20,
+        }
+        print(f"{name:<8} {elapsed * 1000:.0f}ms, peak {report[name]['peak_mib']:.1f} MiB, frame {report[name]['frame_mib']:.2f} MiB")
+    return report
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+
+# NSE equity and index options expire at the close of the expiry day
+EXPIRY_TIME = pd.Timedelta(hours=15, minutes=30)
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / np.sqrt(2 * np.pi)
+
+
+def d1_d2(S, K, T, r, sigma, q=0.0):
+    sqrt_t = np.sqrt(T)
+    d1 = (np.log(S / K) + (r - q + 0.5 * sigma * sigma) * T) / (sigma * sqrt_t)
+    return d1, d1 - sigma * sqrt_t
+
+
+def bs_price(S, K, T, r, sigma, is_call, q=0.0):
+    """Black-Scholes price of European options, every argument may be an array"""
+    d1, d2 = d1_d2(S, K, T, r, sigma, q)
+    call = S * np.exp(-q * T) * ndtr(d1) - K * np.exp(-r * T) * ndtr(d2)
+    put = K * np.exp(-r * T) * ndtr(-d2) - S * np.exp(-q * T) * ndtr(-d1)
+    return np.where(is_call, call, put)
+
+
+def bs_greeks(S, K, T, r, sigma, is_call, q=0.0):
+    """Delta, gamma, theta per calendar day and vega per volatility point, as NSE quotes them"""
+    d1, d2 = d1_d2(S, K, T, r, sigma, q)
+    sqrt_t = np.sqrt(T)
+    pdf = norm_pdf(d1)
+    dividend_discount, discount = np.exp(-q * T), np.exp(-r * T)
+
+    delta = np.where(is_call, dividend_discount * ndtr(d1), -dividend_discount * ndtr(-d1))
+    gamma = dividend_discount * pdf / (S * sigma * sqrt_t)
+    decay = -S * dividend_discount * pdf * sigma / (2 * sqrt_t)
+    call_theta = decay - r * K * discount * ndtr(d2) + q * S * dividend_discount * ndtr(d1)
+    put_theta = decay + r * K * discount * ndtr(-d2) - q * S * dividend_discount * ndtr(-d1)
+    theta = np.where(is_call, call_theta, put_theta) / 365
+    vega = S * dividend_discount * pdf * sqrt_t / 100
+    return {'Delta': delta, 'Gamma': gamma, 'Theta': theta, 'Vega': vega}
+
+
+def implied_volatility(price, S, K, T, r, is_call, q=0.0, low=1e-4, high=5.0, tol=1e-8, max_iter=100, min_time_value=1e-6):
+    """Solve Black-Scholes volatility for every option at once.
+    Newton steps are kept inside a bracket that shrinks every iteration and replaced by bisection when
+    they leave it, so illiquid strikes cannot diverge. Prices outside the no-arbitrage bounds, or whose
+    time value is below min_time_value of the spot and so says nothing about volatility, give NaN"""
+    price, S, K, T, is_call = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (price, S, K, T, is_call)))
+    price, S, K, T, is_call = (x.ravel() for x in (price, S, K, T, is_call.astype(bool)))
+    result = np.full(price.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        intrinsic = np.where(is_call, S * np.exp(-q * T) - K * np.exp(-r * T), K * np.exp(-r * T) - S * np.exp(-q * T))
+        upper_bound = np.where(is_call, S * np.exp(-q * T), K * np.exp(-r * T))
+        valid = (T > 0) & (S > 0) & (K > 0) & (price - np.maximum(intrinsic, 0) > min_time_value * S) & (price < upper_bound)
+        valid &= bs_price(S, K, T, r, high, is_call, q) > price
+
+        # Only the options still being solved are carried through the iterations
+        index = np.flatnonzero(valid)
+        price, S, K, T, is_call = (x[index] for x in (price, S, K, T, is_call))
+        lo = np.full(index.shape, low)
+        hi = np.full(index.shape, high)
+        # Brenner-Subrahmanyam start, good near the money
+        sigma = np.clip(np.sqrt(2 * np.pi / T) * price / S, low, high)
+        for _ in range(max_iter):
+            if not index.size:
+                break
+            diff = bs_price(S, K, T, r, sigma, is_call, q) - price
+            # A price above the target means sigma is too high
+            hi = np.where(diff > 0, sigma, hi)
+            lo = np.where(diff < 0, sigma, lo)
+            done = (np.abs(diff) < tol) | (hi - lo < tol * 1e-2)
+            result[index[done]] = sigma[done]
+            keep = ~done
+            index, price, S, K, T, is_call, sigma, lo, hi, diff = (x[keep] for x in (index, price, S, K, T, is_call, sigma, lo, hi, diff))
+            d1, _ = d1_d2(S, K, T, r, sigma, q)
+            vega = S * np.exp(-q * T) * norm_pdf(d1) * np.sqrt(T)
+            step = sigma - diff / vega
+            sigma = np.where((step > lo) & (step < hi) & np.isfinite(step), step, 0.5 * (lo + hi))
+    return result
+
+
+def year_fractions(fetch_times, expiry_dates):
+    """Time to expiry in years, from the chain fetch time to the close of the expiry day"""
+    # A chain has a handful of distinct timestamps, parse each once
+    fetch_times, expiry_dates = pd.Series(fetch_times), pd.Series(expiry_dates)
+    unique_fetch = fetch_times.unique()
+    fetched = fetch_times.map(dict(zip(unique_fetch, pd.to_datetime(unique_fetch, format='mixed', dayfirst=True))))
+    unique_expiry = expiry_dates.unique()
+    expiry = expiry_dates.map(dict(zip(unique_expiry, pd.to_datetime(unique_expiry, format='%d-%b-%Y', errors='coerce')))) + EXPIRY_TIME
+    return ((expiry - fetched).dt.total_seconds() / SECONDS_PER_YEAR).to_numpy()
+
+
+def parity_underlying(df, T, r):
+    """Spot implied by put-call parity at the strike where call and put prices are closest, per expiry.
+    Only strikes where both legs traded count: nselib reports an untraded leg at 0, and a pair of zeros
+    would look like the most at-the-money strike of all"""
+    strikes = df['Strike Price'].to_numpy(dtype=float)
+    prices = pd.to_numeric(df['Option Close Price'], errors='coerce').to_numpy(dtype=float)
+    prices = np.where(prices > 0, prices, np.nan)
+    is_call = (df['Option Type'] == 'call').to_numpy()
+    frame = pd.DataFrame({'expiry': df['Expiry Date'].to_numpy(), 'strike': strikes, 'call': is_call, 'price': prices, 'T': T})
+    pairs = frame.pivot_table(index=['expiry', 'strike'], columns='call', values=['price', 'T'], aggfunc='first').dropna()
+    if pairs.empty:
+        return pd.Series(np.nan, index=df.index)
+    gap = (pairs[('price', True)] - pairs[('price', False)]).rename('gap').reset_index()
+    gap['T'] = pairs[('T', True)].to_numpy()
+    atm = gap.loc[gap['gap'].abs().groupby(gap['expiry']).idxmin()]
+    # C - P = S - K e^(-rT)
+    spot = atm['gap'] + atm['strike'] * np.exp(-r * atm['T'])
+    return df['Expiry Date'].map(dict(zip(atm['expiry'], spot)))
+
+
+def price_option_chain(df, r=0.065, underlying=None):
+    """Fill the greeks of a reshaped option chain and add the implied volatility solved from its prices.
+    The exchange IV is kept in 'Implied Volatility' and used for the greeks where no volatility can be solved"""
+    if df.empty:
+        return df
+    df = df.copy()
+    T = year_fractions(df['Date'], df['Expiry Date'])
+    if underlying is None:
+        underlying = parity_underlying(df, T, r)
+    S = np.broadcast_to(np.asarray(underlying, dtype=float), len(df)).copy()
+    K = df['Strike Price'].to_numpy(dtype=float)
+    prices = pd.to_numeric(df['Option Close Price'], errors='coerce').to_numpy(dtype=float)
+    is_call = (df['Option Type'] == 'call').to_numpy()
+
+    solved = implied_volatility(prices, S, K, T, r, is_call)
+    df['Model Implied Volatility'] = solved * 100
+    exchange = pd.to_numeric(df['Implied Volatility'], errors='coerce').to_numpy(dtype=float) / 100
+    sigma = np.where(np.isfinite(solved), solved, np.where(exchange > 0, exchange, np.nan))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        greeks = bs_greeks(S, K, T, r, sigma, is_call)
+    for greek, values in greeks.items():
+        # Greeks the exchange did report are kept as they are
+        reported = pd.to_numeric(df[greek], errors='coerce') if greek in df.columns else pd.Series(np.nan, index=df.index)
+        df[greek] = reported.fillna(pd.Series(values, index=df.index))
+    return df
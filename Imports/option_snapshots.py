@@ -0,0 +1,347 @@
+import json
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from nselib import derivatives
+from .module import GetFinData
+from .metrics import METRICS, timed
+from .nse_loader import parse_indian_numbers
+
+
+class OptionSnapshotStore:
+    """Append-only store of live option-chain snapshots, one log per symbol.
+    Every keyframe_every-th snapshot is written in full, the others only hold the cells that changed
+    since the previous snapshot of the symbol, so a snapshot is rebuilt from at most one keyframe and
+    keyframe_every - 1 deltas"""
+    KEY_COLUMNS = ['Strike Price', 'Expiry Date', 'Option Type']
+    VALUE_COLUMNS = ['Option Close Price', 'Implied Volatility', 'Open Interest', 'Volume', 'Delta', 'Gamma', 'Theta', 'Vega']
+
+    def __init__(self, root='option_snapshots', keyframe_every=60, compress_level=1):
+        self.root = root
+        self.keyframe_every = keyframe_every
+        self.compress_level = compress_level
+        # Per symbol: contract ids, last values and the index entries, loaded from disk on first use
+        self.states = {}
+        self.locks = {}
+        self.registry_lock = threading.Lock()
+        # Symbols are appended from several threads, their counts share one lock
+        self.stats_lock = threading.Lock()
+        self.stats = {'snapshots': 0, 'keyframes': 0, 'cells_written': 0, 'bytes_written': 0}
+
+    def symbol_dir(self, symbol):
+        return os.path.join(self.root, symbol)
+
+    def lock_for(self, symbol):
+        with self.registry_lock:
+            return self.locks.setdefault(symbol, threading.Lock())
+
+    def read_index(self, symbol):
+        """Index entries of symbol. A line cut short by a crash is truncated away, so the next entry starts
+        on a line of its own and takes the sequence number after the last complete one"""
+        path = os.path.join(self.symbol_dir(symbol), 'index.jsonl')
+        if not os.path.exists(path):
+            return []
+        entries, good_bytes = [], 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('unterminated line')
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break
+                good_bytes += len(line)
+        if good_bytes < os.path.getsize(path):
+            # The block of a cut entry is simply never referenced, the next one is written after it
+            with open(path, 'r+b') as f:
+                f.truncate(good_bytes)
+        return entries
+
+    def state(self, symbol):
+        if symbol not in self.states:
+            index = self.read_index(symbol)
+            state = {'ids': {}, 'keys': [], 'values': np.empty((0, len(self.VALUE_COLUMNS))), 'present': np.zeros(0, dtype=bool), 'index': index}
+            if index:
+                # Resume diffing from the last snapshot written before a restart
+                state.update(self.rebuild(symbol, len(index) - 1, index))
+            self.states[symbol] = state
+        return self.states[symbol]
+
+    def contract_values(self, chain):
+        """The contract keys and the value matrix of a reshaped chain"""
+        strikes = parse_indian_numbers(chain['Strike Price']).to_numpy(dtype=float)
+        keys = list(zip(strikes.tolist(), chain['Expiry Date'].astype(str).tolist(), chain['Option Type'].astype(str).tolist()))
+        values = np.full((len(chain), len(self.VALUE_COLUMNS)), np.nan)
+        for i, col in enumerate(self.VALUE_COLUMNS):
+            # The greeks are usually all None, skip the string parsing for them
+            if col in chain.columns and chain[col].notna().any():
+                values[:, i] = parse_indian_numbers(chain[col]).to_numpy(dtype=float)
+        return keys, values
+
+    def encode(self, header, arrays):
+        header['arrays'] = [[array.dtype.str, array.shape] for array in arrays]
+        data = json.dumps(header).encode('utf-8') + b'\n' + b''.join(array.tobytes() for array in arrays)
+        return zlib.compress(data, self.compress_level)
+
+    def decode(self, block):
+        header, payload = zlib.decompress(block).split(b'\n', 1)
+        header = json.loads(header)
+        arrays, offset = [], 0
+        for dtype, shape in header['arrays']:
+            dtype = np.dtype(dtype)
+            count = int(np.prod(shape))
+            arrays.append(np.frombuffer(payload, dtype=dtype, count=count, offset=offset).reshape(shape))
+            offset += count * dtype.itemsize
+        return header, arrays
+
+    def append(self, symbol, chain, fetch_time=None):
+        """Log a reshaped chain (GetFinData.reshape_options_data layout) and return the bytes written"""
+        with self.lock_for(symbol):
+            state = self.state(symbol)
+            keys, values = self.contract_values(chain)
+            if fetch_time is None:
+                fetch_time = str(chain['Date'].iloc[0]) if 'Date' in chain.columns and len(chain) else datetime.now().isoformat()
+
+            ids = state['ids']
+            new = []
+            rows = np.empty(len(keys), dtype=np.int32)
+            for row, key in enumerate(keys):
+                contract = ids.get(key)
+                if contract is None:
+                    contract = ids[key] = len(state['keys'])
+                    state['keys'].append(key)
+                    new.append([contract, *key])
+                rows[row] = contract
+            n_contracts = len(state['keys'])
+            if n_contracts > len(state['present']):
+                grow = n_contracts - len(state['present'])
+                state['values'] = np.vstack([state['values'], np.full((grow, len(self.VALUE_COLUMNS)), np.nan)])
+                state['present'] = np.concatenate([state['present'], np.zeros(grow, dtype=bool)])
+
+            present = np.zeros(n_contracts, dtype=bool)
+            present[rows] = True
+            current = state['values'].copy()
+            current[rows] = values
+
+            seq = len(state['index'])
+            # Deltas count from the last keyframe on disk, which a store opened with another keyframe_every
+            # may have placed elsewhere than this one would
+            base = state['index'][-1]['keyframe'] if state['index'] else 0
+            keyframe = not state['index'] or seq - base >= self.keyframe_every
+            base = seq if keyframe else base
+            if keyframe:
+                order = np.flatnonzero(present).astype(np.int32)
+                # Every known contract is listed, later deltas may bring back one that is absent now
+                header = {'seq': seq, 'time': fetch_time, 'keyframe': True,
+                          'contracts': [[contract, *key] for contract, key in enumerate(state['keys'])]}
+                block = self.encode(header, [order, current[order]])
+                cells = current[order].size
+            else:
+                previous = state['values'][rows]
+                # NaN to NaN is not a change
+                changed = (previous != values) & ~(np.isnan(previous) & np.isnan(values))
+                # A contract coming back is written in full, a reader may not hold its last values
+                changed |= ~state['present'][rows][:, None] & ~np.isnan(values)
+                row_index, field_index = np.nonzero(changed)
+                added = np.flatnonzero(present & ~state['present']).astype(np.int32)
+                removed = np.flatnonzero(state['present'] & ~present).astype(np.int32)
+                header = {'seq': seq, 'time': fetch_time, 'keyframe': False, 'contracts': new}
+                block = self.encode(header, [rows[row_index], field_index.astype(np.uint8), values[row_index, field_index], added, removed])
+                cells = len(row_index)
+
+            directory = self.symbol_dir(symbol)
+            os.makedirs(directory, exist_ok=True)
+            log_path = os.path.join(directory, 'log.bin')
+            offset = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+            with open(log_path, 'ab') as f:
+                f.write(block)
+            # The index line is written after the block, so it never points at a partial block
+            entry = {'seq': seq, 'time': fetch_time, 'offset': offset, 'length': len(block), 'keyframe': base}
+            line = json.dumps(entry) + '\n'
+            with open(os.path.join(directory, 'index.jsonl'), 'a') as f:
+                f.write(line)
+
+            state['values'], state['present'] = current, present
+            state['index'].append(entry)
+            with self.stats_lock:
+                self.stats['snapshots'] += 1
+                self.stats['keyframes'] += keyframe
+                self.stats['cells_written'] += cells
+                self.stats['bytes_written'] += len(block) + len(line)
+            return len(block) + len(line)
+
+    def apply(self, state, header, arrays):
+        """Apply one decoded block to a reconstruction state"""
+        for contract, strike, expiry, option_type in header['contracts']:
+            while len(state['keys']) <= contract:
+                state['keys'].append(None)
+            state['keys'][contract] = (strike, expiry, option_type)
+        n_contracts = len(state['keys'])
+        if n_contracts > len(state['present']):
+            grow = n_contracts - len(state['present'])
+            state['values'] = np.vstack([state['values'], np.full((grow, len(self.VALUE_COLUMNS)), np.nan)])
+            state['present'] = np.concatenate([state['present'], np.zeros(grow, dtype=bool)])
+        if header['keyframe']:
+            order, values = arrays
+            state['present'][:] = False
+            state['present'][order] = True
+            state['values'][order] = values
+        else:
+            contracts, fields, values, added, removed = arrays
+            state['values'][contracts, fields] = values
+            state['present'][added] = True
+            state['present'][removed] = False
+        state['time'] = header['time']
+
+    def rebuild(self, symbol, seq, index=None):
+        index = index if index is not None else self.state(symbol)['index']
+        entries = index[index[seq]['keyframe']:seq + 1]
+        state = {'keys': [], 'values': np.empty((0, len(self.VALUE_COLUMNS))), 'present': np.zeros(0, dtype=bool), 'time': None}
+        with open(os.path.join(self.symbol_dir(symbol), 'log.bin'), 'rb') as f:
+            # The blocks of one keyframe interval are contiguous, read them in one go
+            f.seek(entries[0]['offset'])
+            data = f.read(entries[-1]['offset'] + entries[-1]['length'] - entries[0]['offset'])
+        for entry in entries:
+            start = entry['offset'] - entries[0]['offset']
+            self.apply(state, *self.decode(data[start:start + entry['length']]))
+        # Contracts that dropped out of the chain keep their last values but are no longer present
+        state['ids'] = {key: contract for contract, key in enumerate(state['keys'])}
+        return state
+
+    def to_frame(self, symbol, state):
+        order = np.flatnonzero(state['present'])
+        keys = [state['keys'][contract] for contract in order]
+        df = pd.DataFrame({
+            'Date': state['time'],
+            'Ticker': symbol,
+            'Option Type': [key[2] for key in keys],
+            'Strike Price': [key[0] for key in keys],
+            'Expiry Date': [key[1] for key in keys],
+        })
+        for col, values in zip(self.VALUE_COLUMNS, state['values'][order].T):
+            df[col] = values
+        return df
+
+    def snapshots(self, symbol):
+        """Sequence number and fetch time of every stored snapshot of symbol"""
+        return pd.DataFrame(self.state(symbol)['index'], columns=['seq', 'time', 'offset', 'length', 'keyframe'])[['seq', 'time']]
+
+    def snapshot(self, symbol, seq=-1):
+        """The chain of symbol as it was at snapshot seq, rows in the order contracts first appeared"""
+        index = self.state(symbol)['index']
+        if not index:
+            return pd.DataFrame()
+        return self.to_frame(symbol, self.rebuild(symbol, seq % len(index)))
+
+    def history(self, symbol, columns=('Implied Volatility', 'Open Interest'), start=0, stop=None):
+        """Long frame of the given columns for every contract over snapshots start..stop, replayed in one pass"""
+        index = self.state(symbol)['index']
+        stop = len(index) if stop is None else min(stop, len(index))
+        if start >= stop:
+            return pd.DataFrame()
+        state = self.rebuild(symbol, start, index)
+        frames = [self.to_frame(symbol, state)]
+        with open(os.path.join(self.symbol_dir(symbol), 'log.bin'), 'rb') as f:
+            for entry in index[start + 1:stop]:
+                f.seek(entry['offset'])
+                self.apply(state, *self.decode(f.read(entry['length'])))
+                frames.append(self.to_frame(symbol, state))
+        df = pd.concat(frames, ignore_index=True)
+        return df[['Date', 'Ticker', 'Option Type', 'Strike Price', 'Expiry Date', *columns]]
+
+
+class ReplayFeed:
+    """Stand-in for nse_live_option_chain that returns recorded chains of each symbol in turn,
+    repeating the last one once a symbol runs out"""
+    def __init__(self, chains):
+        self.chains = {symbol: list(frames) for symbol, frames in chains.items()}
+        self.positions = {symbol: 0 for symbol in self.chains}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_directory(cls, directory):
+        """Recorded chains saved as <directory>/<symbol>/<n>.csv (or .parquet), replayed in file name order"""
+        chains = {}
+        for symbol in sorted(os.listdir(directory)):
+            path = os.path.join(directory, symbol)
+            if not os.path.isdir(path):
+                continue
+            frames = []
+            for name in sorted(os.listdir(path)):
+                if name.endswith('.csv'):
+                    frames.append(pd.read_csv(os.path.join(path, name)))
+                elif name.endswith('.parquet'):
+                    frames.append(pd.read_parquet(os.path.join(path, name)))
+            chains[symbol] = frames
+        return cls(chains)
+
+    def __call__(self, symbol):
+        with self.lock:
+            frames = self.chains[symbol]
+            position = self.positions[symbol]
+            self.positions[symbol] = min(position + 1, len(frames) - 1)
+        return frames[position]
+
+
+class OptionChainPoller(GetFinData):
+    """Polls the live option chain of many symbols concurrently on a fixed schedule and logs
+    every snapshot into an OptionSnapshotStore"""
+    def __init__(self, symbols, store=None, interval=5.0, max_workers=8, feed=None):
+        today = datetime.now().strftime("%Y-%m-%d")
+        super().__init__({'Stock': list(symbols)}, today, today, max_workers=max_workers)
+        self.symbols = list(symbols)
+        self.store = store or OptionSnapshotStore()
+        self.interval = interval
+        # Any callable symbol -> raw chain DataFrame; ReplayFeed replays recorded chains
+        self.feed = feed or (lambda symbol: derivatives.nse_live_option_chain(symbol=symbol))
+        self.poll_stats = {'polls': 0, 'errors': 0, 'skipped_ticks': 0, 'bytes_written': 0}
+        self.stats_lock = threading.Lock()
+
+    @timed('poll_symbol')
+    def poll_symbol(self, symbol):
+        try:
+            options_data = self.feed(symbol)
+            if options_data is None or options_data.empty:
+                print(f"No options data found for {symbol}")
+                return 0
+            return self.store.append(symbol, self.reshape_options_data(options_data))
+        except Exception as e:
+            print(f"Error polling options data for {symbol}: {e}")
+            METRICS.error('poll_symbol', e)
+            with self.stats_lock:
+                self.poll_stats['errors'] += 1
+            return 0
+
+    def poll_once(self, executor=None):
+        """Take one snapshot of every symbol and return the bytes written"""
+        if executor is None:
+            written = [self.poll_symbol(symbol) for symbol in self.symbols]
+        else:
+            written = list(executor.map(self.poll_symbol, self.symbols))
+        self.poll_stats['polls'] += 1
+        self.poll_stats['bytes_written'] += sum(written)
+        return sum(written)
+
+    def run(self, n_polls=None, duration=None):
+        """Poll every `interval` seconds until n_polls polls or duration seconds, whichever comes first.
+        Ticks stay on the start + k * interval grid; a poll that overruns skips the ticks it missed"""
+        start = time.perf_counter()
+        tick = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while n_polls is None or self.poll_stats['polls'] < n_polls:
+                if duration is not None and time.perf_counter() - start >= duration:
+                    break
+                self.poll_once(executor)
+                elapsed = time.perf_counter() - start
+                next_tick = int(elapsed // self.interval) + 1 if self.interval > 0 else tick + 1
+                self.poll_stats['skipped_ticks'] += max(next_tick - tick - 1, 0)
+                tick = next_tick
+                if self.interval > 0:
+                    time.sleep(max(start + tick * self.interval - time.perf_counter(), 0))
+        self.run_time = time.perf_counter() - start
+        return self.run_time
@@ -0,0 +1,295 @@
+import copy
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from .preproc_data import PreprocessData
+from .stream_preproc import StreamPreprocessData
+from .features import FeatureEngine, TickerState
+from .metrics import METRICS, timed
+
+
+def write_frame(df, path):
+    """Write a shard as one buffer per column in the directory path: numpy columns as raw .npy files the reader
+    memory-maps, Arrow-backed columns (strings, nullable numbers) as Arrow IPC, anything else pickled"""
+    import pyarrow as pa
+    os.makedirs(path)
+    layout = []
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        dtype = column.dtype
+        file = os.path.join(path, str(i))
+        if isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+            np.save(file + '.npy', np.ascontiguousarray(column.to_numpy()))
+            layout.append('npy')
+        elif hasattr(dtype, '__from_arrow__') and not isinstance(dtype, pd.CategoricalDtype):
+            table = pa.table({'values': pa.array(column.array)})
+            with pa.OSFile(file + '.arrow', 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            layout.append('arrow')
+        else:
+            column.to_pickle(file + '.pkl')
+            layout.append('pkl')
+    pd.to_pickle({'columns': df.columns, 'dtypes': list(df.dtypes), 'layout': layout, 'rows': len(df)}, os.path.join(path, 'frame.pkl'))
+    return path
+
+
+def read_frame(path):
+    import pyarrow as pa
+    meta = pd.read_pickle(os.path.join(path, 'frame.pkl'))
+    columns = {}
+    for i, (dtype, layout) in enumerate(zip(meta['dtypes'], meta['layout'])):
+        file = os.path.join(path, str(i))
+        if layout == 'npy':
+            columns[i] = np.load(file + '.npy', mmap_mode='r')
+        elif layout == 'arrow':
+            with pa.memory_map(file + '.arrow', 'r') as source:
+                columns[i] = dtype.__from_arrow__(pa.ipc.open_file(source).read_all().column(0))
+        else:
+            columns[i] = pd.read_pickle(file + '.pkl').array
+    # Building the frame copies the mapped buffers into its blocks once, the files can be removed afterwards
+    df = pd.DataFrame(columns, index=pd.RangeIndex(meta['rows']))
+    df.columns = meta['columns']
+    return df
+
+
+def fill_and_encode_shard(in_path, out_path, carry, column, categories):
+    """Worker side of ParallelPreprocessData.preprocess: ffill one shard, fill its leading gaps with the values
+    the serial ffill would carry in from earlier shards, then one-hot encode with the categories of the whole frame"""
+    df = read_frame(in_path).ffill()
+    if carry:
+        df = df.fillna(carry)
+    if column is not None:
+        df[column] = pd.Categorical(df[column], categories=categories)
+        df = pd.get_dummies(df, columns=[column])
+    return write_frame(df, out_path)
+
+
+def parse_numbers_shard(in_path, out_path):
+    """Worker side of ParallelPreprocessData.standardize_data: Indian-format strings to floats"""
+    df = read_frame(in_path)
+    df = PreprocessData(None, None, None, None).remove_commas_and_convert_to_float(df, df.columns)
+    return write_frame(df, out_path)
+
+
+def pack_states(states):
+    # Pickling deques of numpy scalars one by one takes about as long as computing the features, arrays go in one piece
+    return {key: (np.array(state.closes), np.array(state.gains), np.array(state.losses), np.array(state.sentiments),
+                  np.array([state.ema_fast, state.ema_slow, state.signal, state.mean, state.m2,
+                            state.ema_weights['fast'], state.ema_weights['slow'], state.ema_weights['signal']]),
+                  np.array([[window, state.sums[window], state.nans[window]] for window in sorted(state.sums)]))
+            for key, state in states.items()}
+
+
+def unpack_states(packed, window):
+    states = {}
+    for key, (closes, gains, losses, sentiments, moments, running) in packed.items():
+        state = TickerState(window)
+        state.closes.extend(closes)
+        state.gains.extend(gains)
+        state.losses.extend(losses)
+        state.sentiments.extend(sentiments)
+        state.ema_fast, state.ema_slow, state.signal, state.mean, state.m2 = moments[:5]
+        state.ema_weights = dict(zip(['fast', 'slow', 'signal'], moments[5:]))
+        state.sums = {int(window): total for window, total, _ in running}
+        state.nans = {int(window): int(nans) for window, _, nans in running}
+        states[key] = state
+    return states
+
+
+def features_shard(in_path, out_path, engine):
+    """Worker side of ParallelPreprocessData.compute_features, returns the shard and the rolling state of its tickers"""
+    df = engine.compute(read_frame(in_path))
+    return write_frame(df, out_path), pack_states(engine.states)
+
+
+class ParallelPreprocessData(PreprocessData):
+    """PreprocessData with the market frames split by ticker and processed in a process pool.
+    Shards go to the workers and back as per-column buffers in /dev/shm (memory-mapped .npy and Arrow files)
+    rather than pickled frames, and are merged in row order, so the output is identical to the serial path.
+    The buffers save the pickling, not the copy: building a frame from them copies every column once"""
+    ENCODED_COLUMNS = StreamPreprocessData.ENCODED_COLUMNS
+
+    def __init__(self, stock_data, index_data, etf_data, news_data, max_workers=None, shard_dir=None, min_shard_rows=20000):
+        super().__init__(stock_data, index_data, etf_data, news_data)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Shard files live in RAM-backed /dev/shm where it exists, the system temp directory otherwise
+        self.shard_dir = shard_dir or ('/dev/shm' if os.path.isdir('/dev/shm') else None)
+        # Frames are not split into shards smaller than this, the pool overhead would outweigh the work
+        self.min_shard_rows = min_shard_rows
+
+    def n_shards(self, df):
+        return max(1, min(self.max_workers, len(df) // self.min_shard_rows))
+
+    def sharded(self):
+        # Frames too small to split run the serial steps in this process instead of paying for a pool
+        return any(self.n_shards(df) > 1 for df in (self.stock_data, self.index_data, self.etf_data))
+
+    def shard_bounds(self, df):
+        """Contiguous row ranges of about equal size, cut where the ticker changes so a run of one ticker's rows stays together.
+        A frame with fewer ticker runs than shards, e.g. one index, is cut evenly; the carried values keep the ffill exact"""
+        n_shards = self.n_shards(df)
+        if n_shards == 1:
+            return [(0, len(df))]
+        targets = np.linspace(0, len(df), n_shards + 1)[1:-1]
+        changes = np.array([], dtype=int)
+        if 'Ticker' in df.columns:
+            codes = pd.factorize(df['Ticker'])[0]
+            changes = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        if len(changes) < n_shards - 1:
+            cuts = np.unique(targets.astype(int))
+        else:
+            cuts = np.unique(changes[np.minimum(np.searchsorted(changes, targets), len(changes) - 1)])
+        edges = [0] + cuts.tolist() + [len(df)]
+        return list(zip(edges[:-1], edges[1:]))
+
+    def carry_values(self, df, starts):
+        """Per shard start, the last non-null value before it of every column whose shard begins with a gap,
+        which is what the serial ffill carries across the shard boundary"""
+        carries = [{} for _ in starts]
+        positions = np.arange(len(df))
+        for i, col in enumerate(df.columns):
+            column = df.iloc[:, i]
+            heads = [k for k, start in enumerate(starts) if start > 0 and pd.isna(column.iloc[start])]
+            if not heads:
+                continue
+            last_valid = np.maximum.accumulate(np.where(column.notna().to_numpy(), positions, -1))
+            for k in heads:
+                position = last_valid[starts[k] - 1]
+                if position >= 0:
+                    carries[k][col] = column.iloc[position]
+        return carries
+
+    def encoded_categories(self, df, column):
+        # The dummy columns pd.get_dummies would create for the whole frame, every shard gets all of them
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            return df[column].dtype.categories
+        return pd.Categorical(df[column].dropna().unique()).categories
+
+    def run_shards(self, pool, workdir, name, df, bounds, worker, args_for):
+        """Write the shards of df and submit worker on each, returns the futures in shard order"""
+        futures = []
+        for k, (start, stop) in enumerate(bounds):
+            in_path = write_frame(df.iloc[start:stop], os.path.join(workdir, f'{name}_{k}_in'))
+            futures.append(pool.submit(worker, in_path, os.path.join(workdir, f'{name}_{k}_out'), *args_for(k)))
+        return futures
+
+    def merge(self, paths, index):
+        frames = [read_frame(path) for path in paths]
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        df.index = index
+        return df
+
+    def pool(self):
+        return ProcessPoolExecutor(max_workers=self.max_workers)
+
+    def workdir(self):
+        return tempfile.mkdtemp(prefix='preproc_shards_', dir=self.shard_dir)
+
+    @timed('fill_and_encode_shards')
+    def fill_and_encode_market_data(self):
+        frames = {'stock': self.stock_data, 'index': self.index_data, 'etf': self.etf_data}
+        workdir = self.workdir()
+        try:
+            with self.pool() as pool:
+                jobs = {}
+                for name, df in frames.items():
+                    if df.empty:
+                        continue
+                    column = self.ENCODED_COLUMNS[name] if self.ENCODED_COLUMNS[name] in df.columns else None
+                    categories = self.encoded_categories(df, column) if column else None
+                    bounds = self.shard_bounds(df)
+                    carries = self.carry_values(df, [start for start, _ in bounds])
+                    jobs[name] = self.run_shards(pool, workdir, name, df, bounds, fill_and_encode_shard,
+                                                 lambda k: (carries[k], column, categories))
+                    METRICS.inc('shards_total', len(bounds), stage='fill_and_encode_shards')
+                for name, futures in jobs.items():
+                    frames[name] = self.keep_attrs(frames[name], self.merge([future.result() for future in futures], frames[name].index))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        # Empty frames go through the serial steps so they come out exactly as PreprocessData leaves them
+        for name, df in frames.items():
+            if df.empty:
+                df = df.ffill()
+                if self.ENCODED_COLUMNS[name] in df.columns:
+                    df = pd.get_dummies(df, columns=[self.ENCODED_COLUMNS[name]])
+                frames[name] = df
+        self.stock_data, self.index_data, self.etf_data = frames['stock'], frames['index'], frames['etf']
+
+    @timed('preprocess', export=True)
+    def preprocess(self):
+        self.preprocess_news_data()
+        if not self.sharded():
+            self.fill_missing_values()
+            self.encode_categorical_data()
+            return self.stock_data, self.index_data, self.etf_data, self.news_data
+        # News is deduplicated and dated across the whole corpus, it stays in this process
+        self.fill_and_encode_market_data()
+        self.fill_news_values()
+        return self.stock_data, self.index_data, self.etf_data, self.news_data
+
+    @timed('parse_number_shards')
+    def parse_numbers(self):
+        """Convert the Indian-format string columns standardize_data works on in the shards"""
+        frames = {'stock': self.stock_data, 'index': self.index_data, 'etf': self.etf_data}
+        workdir = self.workdir()
+        try:
+            with self.pool() as pool:
+                jobs = {}
+                for name, df in frames.items():
+                    columns = [col for col in self.NUMERICAL_COLUMNS[name] if col in df.columns and not pd.api.types.is_numeric_dtype(df[col])]
+                    if columns and not df.empty:
+                        jobs[name] = columns, self.run_shards(pool, workdir, name, df[columns], self.shard_bounds(df),
+                                                              parse_numbers_shard, lambda k: ())
+                for name, (columns, futures) in jobs.items():
+                    frames[name][columns] = self.merge([future.result() for future in futures], frames[name].index)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def standardize_data(self, fit=True, per_ticker=False):
+        # Parsing the number strings is row-wise and is the slow part, it runs in the shards. The scalers are
+        # fitted here on the whole frames, so their state matches the serial fit bit for bit
+        if self.sharded():
+            self.parse_numbers()
+        super().standardize_data(fit, per_ticker)
+
+    @timed('compute_features')
+    def compute_features(self, df, engine=None):
+        """FeatureEngine.compute with whole tickers spread over the pool. The rows, values and the engine's
+        rolling state are the same as from engine.compute(df)"""
+        engine = engine or FeatureEngine()
+        n_shards = self.n_shards(df)
+        if n_shards == 1 or self.max_workers <= 1:
+            return engine.compute(df)
+
+        # compute() sorts by ticker, so each shard takes a range of the sorted tickers (missing ones sort last)
+        # and the shards come back in the serial order
+        codes, tickers = pd.factorize(df[engine.group_cols[0]], sort=True)
+        codes = np.where(codes < 0, len(tickers), codes)
+        rows_before = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(tickers) + 1))])
+        targets = np.linspace(0, len(df), n_shards + 1)
+        edges = np.unique(np.searchsorted(rows_before, targets))
+        shards = [df[(codes >= low) & (codes < high)] for low, high in zip(edges[:-1], edges[1:])]
+        shards = [shard for shard in shards if not shard.empty]
+
+        # Workers get the engine's settings only, its current state is replaced by the shards' anyway
+        settings = copy.copy(engine)
+        settings.states = {}
+        workdir = self.workdir()
+        try:
+            with self.pool() as pool:
+                futures = []
+                for k, shard in enumerate(shards):
+                    in_path = write_frame(shard, os.path.join(workdir, f'features_{k}_in'))
+                    futures.append(pool.submit(features_shard, in_path, os.path.join(workdir, f'features_{k}_out'), settings))
+                results = [future.result() for future in futures]
+            METRICS.inc('shards_total', len(shards), stage='compute_features')
+            window = engine.window
+            engine.states = {}
+            for _, states in results:
+                engine.states.update(unpack_states(states, window))
+            return self.merge([path for path, _ in results], pd.RangeIndex(len(df)))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
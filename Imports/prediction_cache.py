@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+
+class PredictionCache:
+    """SQLite cache of model outputs per prompt, keyed by model and revision, adapter, tokenizer and truncation
+    settings, template and input, with least recently used entries evicted once the stored values pass max_bytes"""
+    NUMBER = re.compile(r'-?\d+\.\d+')
+
+    def __init__(self, path='prediction_cache.sqlite', max_bytes=256 * 2 ** 20, round_digits=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        # Rounding the floats of an input before hashing lets near-identical prompts share an entry
+        self.round_digits = round_digits
+        self.stats = {'hits': 0, 'misses': 0, 'evicted': 0}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used)')
+        self.connection.commit()
+
+    def normalize(self, text):
+        text = ' '.join(str(text).split())
+        if self.round_digits is not None:
+            text = self.NUMBER.sub(lambda match: f'{float(match.group()):.{self.round_digits}f}', text)
+        return text
+
+    def key(self, model_id, revision, adapter_revision, settings, template, text):
+        """settings is a dict of whatever else changes the output for the same text, such as the tokenizer
+        and max_length. The model is named explicitly: a class name or a local path is not an identity"""
+        if not model_id or not revision:
+            raise ValueError(f"PredictionCache keys need a model name_or_path and revision, got {model_id!r} and {revision!r}")
+        parts = [str(model_id), str(revision), str(adapter_revision), json.dumps(settings, sort_keys=True), template, self.normalize(text)]
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def get_many(self, keys):
+        """Cached values for the keys that are present, as a dict; hits are marked as recently used"""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        # SQLite limits the number of bound parameters per statement
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            rows = self.connection.execute(f"SELECT key, value FROM predictions WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            found.update((key, json.loads(value)) for key, value in rows)
+        if found:
+            now = time.time()
+            self.connection.executemany('UPDATE predictions SET last_used = ? WHERE key = ?', [(now, key) for key in found])
+            self.connection.commit()
+        hits = sum(key in found for key in keys)
+        self.stats['hits'] += hits
+        self.stats['misses'] += len(keys) - hits
+        return found
+
+    def put_many(self, items):
+        """Store (key, value) pairs, value being anything JSON serializable"""
+        now = time.time()
+        rows = []
+        for key, value in items:
+            value = json.dumps(value)
+            rows.append((key, value, len(key) + len(value), now))
+        self.connection.executemany('INSERT OR REPLACE INTO predictions (key, value, size, last_used) VALUES (?, ?, ?, ?)', rows)
+        self.connection.commit()
+        self.evict()
+
+    def size(self):
+        return self.connection.execute('SELECT COALESCE(SUM(size), 0), COUNT(*) FROM predictions').fetchone()
+
+    def evict(self):
+        total, _ = self.size()
+        if total <= self.max_bytes:
+            return
+        # Walk the least recently used rows until enough bytes are freed
+        excess = total - self.max_bytes
+        freed, doomed = 0, []
+        for key, size in self.connection.execute('SELECT key, size FROM predictions ORDER BY last_used'):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self.connection.executemany('DELETE FROM predictions WHERE key = ?', doomed)
+        self.connection.commit()
+        self.stats['evicted'] += len(doomed)
+
+    def report(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        total, entries = self.size()
+        hit_rate = self.stats['hits'] / lookups if lookups else 0.0
+        print(f"prediction cache: {self.stats['hits']} hits, {self.stats['misses']} misses ({hit_rate:.1%} hit rate), "
+              f"{self.stats['evicted']} evicted, {entries} entries / {total / 2 ** 20:.1f} MiB")
+        return dict(self.stats, hit_rate=hit_rate, entries=entries, bytes=total)
+
+    def close(self):
+        self.connection.close()
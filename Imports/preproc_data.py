@@ -1,40 +1,82 @@
+import os
+import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
 import re
 from datetime import datetime
+from .nse_loader import load_nse_csv
+from .scaler_state import IncrementalScaler
+from .news_dates import normalize_news_dates
+from .sentiment_join import SentimentIndex
+from .metrics import METRICS, timed
 
 class PreprocessData:
+    # Numerical columns standardized per frame, the ones missing from a frame are skipped
+    NUMERICAL_COLUMNS = {
+        'stock': ['ClosePrice', 'TotalTradedQuantity', 'Open Interest', 'Option Close Price', 'Implied Volatility'],
+        'index': ['CLOSING_PRICE', 'TOT_TRADED_QTY', 'OPEN_INT', 'SETTLE_PRICE'],
+        'etf': ['ClosePrice', 'TotalTradedQuantity', 'Open Interest', 'Option Close Price', 'Implied Volatility'],
+    }
+
     def __init__(self, stock_data, index_data, etf_data, news_data):
         self.stock_data = stock_data
         self.index_data = index_data
         self.etf_data = etf_data
         self.news_data = news_data
+        # Scaler state per frame ('stock', 'index', 'etf'), kept across runs with save_scalers/load_scalers
+        self.scalers = {}
+        # Row counts per news date layout from the last normalization, including the rows that failed
+        self.date_report = {}
+        # Optional NearDuplicateIndex, syndicated copies of archived or earlier articles are dropped
+        self.near_duplicates = None
+
+    @classmethod
+    def from_store(cls, store, tickers=None, start_date=None, end_date=None):
+        """Load the market and news frames from a DatasetStore, reading only the requested tickers and dates"""
+        frames = [store.read('hist', tickers=tickers, asset_types=[asset_type], start_date=start_date, end_date=end_date)
+                  for asset_type in ['Stock', 'Index', 'ETF']]
+        news_data = store.read('news', tickers=tickers, start_date=start_date, end_date=end_date)
+        return cls(*frames, news_data)
+
+    @classmethod
+    def from_csv(cls, stock_path=None, index_path=None, etf_path=None, news_path=None):
+        """Load the NSE CSVs with typed, compact columns; a missing path gives an empty frame"""
+        stock_data = load_nse_csv(stock_path, 'price_volume') if stock_path else pd.DataFrame()
+        index_data = load_nse_csv(index_path, 'futidx') if index_path else pd.DataFrame()
+        etf_data = load_nse_csv(etf_path, 'price_volume') if etf_path else pd.DataFrame()
+        news_data = pd.read_csv(news_path) if news_path else pd.DataFrame()
+        return cls(stock_data, index_data, etf_data, news_data)
 
+    @timed('fill_missing_values')
     def fill_missing_values(self):
         # Fill missing values for financial data
-        self.stock_data.fillna(method='ffill', inplace=True)
-        self.index_data.fillna(method='ffill', inplace=True)
-        self.etf_data.fillna(method='ffill', inplace=True)
+        self.stock_data = self.stock_data.ffill()
+        self.index_data = self.index_data.ffill()
+        self.etf_data = self.etf_data.ffill()
+        self.fill_news_values()
 
-        # Fill missing values for news data
-        self.news_data['date'].fillna(method='ffill', inplace=True)
-        self.news_data['title'].fillna('No Title', inplace=True)
-        self.news_data['content'].fillna('No Content', inplace=True)
+    def fill_news_values(self):
+        # Fill missing values for news data, assigning back instead of chained inplace fills
+        self.news_data['date'] = self.news_data['date'].ffill()
+        self.news_data['title'] = self.news_data['title'].fillna('No Title')
+        self.news_data['content'] = self.news_data['content'].fillna('No Content')
 
     def remove_commas_and_convert_to_float(self, df, columns):
         for col in columns:
-            if col in df.columns:
+            # Columns loaded from a DatasetStore are already numeric
+            if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
                 # df[col] = df[col].astype(str)
                 df[col] = df[col].str.replace(',', '').astype(float)
         return df
 
-    def standardize_data(self):
-        # Standardize numerical features
-        scaler = StandardScaler()
-        
-        stock_numerical_cols = ['ClosePrice', 'TotalTradedQuantity', 'Open Interest', 'Option Close Price', 'Implied Volatility']
-        index_numerical_cols = ['CLOSING_PRICE', 'TOT_TRADED_QTY', 'OPEN_INT', 'SETTLE_PRICE']
-        etf_numerical_cols = ['ClosePrice', 'TotalTradedQuantity', 'Open Interest', 'Option Close Price', 'Implied Volatility']
+    @timed('standardize_data')
+    def standardize_data(self, fit=True, per_ticker=False):
+        # Standardize numerical features with persistent scaler state: fit=True folds the current rows
+        # into the state with partial_fit, fit=False applies the saved state to new rows as is.
+        # A frame already standardized carries the scaled columns in attrs['standardized'] and is left alone,
+        # assign new rows to the frame to fold them in
+        stock_numerical_cols = self.NUMERICAL_COLUMNS['stock']
+        index_numerical_cols = self.NUMERICAL_COLUMNS['index']
+        etf_numerical_cols = self.NUMERICAL_COLUMNS['etf']
 
         # Remove commas and convert to float
         self.stock_data = self.remove_commas_and_convert_to_float(self.stock_data, stock_numerical_cols)
@@ -46,23 +88,49 @@ class PreprocessData:
         index_numerical_cols = [col for col in index_numerical_cols if col in self.index_data.columns]
         etf_numerical_cols = [col for col in etf_numerical_cols if col in self.etf_data.columns]
 
-        if stock_numerical_cols:
-            self.stock_data[stock_numerical_cols] = scaler.fit_transform(self.stock_data[stock_numerical_cols])
+        if stock_numerical_cols and not self.stock_data.attrs.get('standardized'):
+            self.stock_data[stock_numerical_cols] = self.scale_frame('stock', self.stock_data, stock_numerical_cols, fit, per_ticker)
+
+        if index_numerical_cols and not self.index_data.attrs.get('standardized'):
+            self.index_data[index_numerical_cols] = self.scale_frame('index', self.index_data, index_numerical_cols, fit, per_ticker)
 
-        if index_numerical_cols:
-            self.index_data[index_numerical_cols] = scaler.fit_transform(self.index_data[index_numerical_cols])
+        if etf_numerical_cols and not self.etf_data.attrs.get('standardized'):
+            self.etf_data[etf_numerical_cols] = self.scale_frame('etf', self.etf_data, etf_numerical_cols, fit, per_ticker)
 
-        if etf_numerical_cols:
-            self.etf_data[etf_numerical_cols] = scaler.fit_transform(self.etf_data[etf_numerical_cols])
+    def scale_frame(self, name, df, columns, fit, per_ticker):
+        if name not in self.scalers:
+            self.scalers[name] = IncrementalScaler(columns, 'Ticker' if per_ticker and 'Ticker' in df.columns else None)
+        scaler = self.scalers[name]
+        if fit:
+            scaler.partial_fit(df)
+        # ffill, copies and slices keep attrs; the steps that rebuild a frame pass them on with keep_attrs
+        df.attrs['standardized'] = list(columns)
+        return scaler.transform(df)
 
+    def keep_attrs(self, source, df):
+        """df with the attrs of the frame it was built from, which get_dummies and merges drop"""
+        df.attrs.update(source.attrs)
+        return df
+
+    def save_scalers(self, directory):
+        for name, scaler in self.scalers.items():
+            scaler.save(os.path.join(directory, f'{name}_scaler.json'))
+
+    def load_scalers(self, directory):
+        for name in ['stock', 'index', 'etf']:
+            path = os.path.join(directory, f'{name}_scaler.json')
+            if os.path.exists(path):
+                self.scalers[name] = IncrementalScaler.load(path)
+
+    @timed('encode_categorical_data')
     def encode_categorical_data(self):
         # Encode categorical features
         if 'Option Type' in self.stock_data.columns:
-            self.stock_data = pd.get_dummies(self.stock_data, columns=['Option Type'])
+            self.stock_data = self.keep_attrs(self.stock_data, pd.get_dummies(self.stock_data, columns=['Option Type']))
         if 'OPTION_TYPE' in self.index_data.columns:
-            self.index_data = pd.get_dummies(self.index_data, columns=['OPTION_TYPE'])
+            self.index_data = self.keep_attrs(self.index_data, pd.get_dummies(self.index_data, columns=['OPTION_TYPE']))
         if 'Option Type' in self.etf_data.columns:
-            self.etf_data = pd.get_dummies(self.etf_data, columns=['Option Type'])
+            self.etf_data = self.keep_attrs(self.etf_data, pd.get_dummies(self.etf_data, columns=['Option Type']))
 
     def clean_text(self, text):
         text = re.sub(r'\s+', ' ', text)  # Remove extra spaces and newline characters
@@ -82,16 +150,47 @@ class PreprocessData:
             return date_obj.strftime('%d-%m-%Y')
         except Exception as e:
             print(f"Error parsing date: {date_str}, Error: {e}")
+            METRICS.error('preprocess_date', e)
             return None
     
+    @timed('preprocess_news_data')
     def preprocess_news_data(self):
+        rows_in = len(self.news_data)
         # Preprocess news data (if required)
         self.news_data['Clean_Title'] = self.news_data['title'].apply(lambda x: self.clean_text(str(x)))
         # Remove duplicate records based on 'title' and 'content'
         self.news_data.drop_duplicates(subset=['title', 'content'], inplace=True)
-        # Process date column
-        # self.news_data['date'] = self.news_data['date'].apply(self.preprocess_date)
+        if self.near_duplicates is not None:
+            self.news_data = self.near_duplicates.drop_near_duplicates(self.news_data)
+        # Process date column, every layout is parsed in bulk and bad rows are counted instead of printed
+        self.news_data['date'], self.date_report = normalize_news_dates(self.news_data['date'])
+        self.report_bad_dates(self.date_report)
+        METRICS.rows('preprocess_news_data', rows_in=rows_in, rows_out=len(self.news_data))
+        for layout in ('unrecognized', 'unparseable'):
+            if self.date_report.get(layout):
+                METRICS.inc('errors_total', self.date_report[layout], stage='preprocess_news_data', type=f'{layout}_date')
+
+    def report_bad_dates(self, report):
+        bad_rows = report.get('unrecognized', 0) + report.get('unparseable', 0)
+        if bad_rows:
+            print(f"Could not parse {bad_rows} news dates ({report['unrecognized']} unrecognized, {report['unparseable']} invalid)")
     
+    @timed('attach_news_sentiment')
+    def attach_news_sentiment(self, lookback='3D', sentiment_col='sentiment', scorer=None):
+        # Add Sentiment and News_Count to every market frame from the news published up to each bar's close.
+        # scorer maps a list of article texts (title and content) to scores, it fills sentiment_col when given
+        if scorer is not None:
+            texts = self.news_data['title'].fillna('').astype(str) + ' ' + self.news_data['content'].fillna('').astype(str)
+            self.news_data[sentiment_col] = np.asarray(scorer(texts.tolist()), dtype=np.float64)
+        sentiment_index = SentimentIndex(self.news_data, sentiment_col=sentiment_col)
+        if 'Ticker' in self.stock_data.columns:
+            self.stock_data = self.keep_attrs(self.stock_data, sentiment_index.join(self.stock_data, lookback))
+        if 'Ticker' in self.index_data.columns:
+            self.index_data = self.keep_attrs(self.index_data, sentiment_index.join(self.index_data, lookback))
+        if 'Ticker' in self.etf_data.columns:
+            self.etf_data = self.keep_attrs(self.etf_data, sentiment_index.join(self.etf_data, lookback))
+
+    @timed('preprocess', export=True)
     def preprocess(self):
         self.preprocess_news_data()
         self.fill_missing_values()
@@ -0,0 +1,32 @@
+import os
+import sys
+
+
+def in_notebook():
+    """True inside a Jupyter kernel, where tqdm.notebook widgets can render"""
+    if 'ipykernel' not in sys.modules:
+        return False
+    try:
+        from IPython import get_ipython
+    except ImportError:
+        return False
+    shell = get_ipython()
+    return shell is not None and type(shell).__name__ == 'ZMQInteractiveShell'
+
+
+def progress(iterable, **kwargs):
+    """Progress bar over iterable: notebook widget in Jupyter, text bar on a terminal, and the plain
+    iterable in batch jobs (or with THESIS_PROGRESS=off). tqdm is only imported when a bar is shown"""
+    mode = os.environ.get('THESIS_PROGRESS', 'auto')
+    if mode == 'off':
+        return iterable
+    if mode == 'auto' and not in_notebook() and not sys.stderr.isatty():
+        return iterable
+    try:
+        if in_notebook():
+            from tqdm.notebook import tqdm
+        else:
+            from tqdm import tqdm
+    except ImportError:
+        return iterable
+    return tqdm(iterable, **kwargs)
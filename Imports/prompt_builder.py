@@ -0,0 +1,172 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import zlib
+import numpy as np
+import pandas as pd
+from .features import FeatureEngine, parse_bar_dates
+from .nse_loader import parse_indian_numbers
+
+
+class ShardWriter:
+    """Writes records of one split to numbered files of at most max_bytes each"""
+    def __init__(self, directory, split, file_format='jsonl', max_bytes=64 * 2 ** 20):
+        self.directory = directory
+        self.split = split
+        self.file_format = file_format
+        self.max_bytes = max_bytes
+        self.shards = []
+        self.file = None
+
+    def open_shard(self):
+        name = f'{self.split}-{len(self.shards):05d}.{self.file_format}'
+        self.file = open(os.path.join(self.directory, name), 'wb')
+        self.shards.append({'file': name, 'split': self.split, 'records': 0, 'bytes': 0, 'sha256': hashlib.sha256()})
+        if self.file_format == 'csv':
+            self.write_bytes(self.csv_line(['Prompt', 'Target']), count=False)
+
+    def csv_line(self, values):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerow(values)
+        return buffer.getvalue().encode('utf-8')
+
+    def write_bytes(self, data, count=True):
+        shard = self.shards[-1]
+        self.file.write(data)
+        shard['bytes'] += len(data)
+        shard['sha256'].update(data)
+        if count:
+            shard['records'] += 1
+
+    def write(self, record):
+        if self.file_format == 'csv':
+            # Same Prompt/Target layout as Test_Xydataset.csv
+            data = self.csv_line([record['input'], record['response']])
+        else:
+            data = (json.dumps(record) + '\n').encode('utf-8')
+        if self.file is None or self.shards[-1]['bytes'] + len(data) > self.max_bytes and self.shards[-1]['records']:
+            self.close()
+            self.open_shard()
+        self.write_bytes(data)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def manifest(self):
+        return [dict(shard, sha256=shard['sha256'].hexdigest()) for shard in self.shards]
+
+
+class PromptDatasetBuilder:
+    """Turns preprocessed market frames into Alpaca instruction/input/response records,
+    one ticker at a time, and writes them as size-bounded train/test shards with a manifest"""
+    INSTRUCTION = ("Given the following market data. Return strictly a single word as prediction value which is "
+                   "'bullish' if the market is absolutely 'bullish' or 'bearish' if the market is absolutely 'bearish'.")
+    # Feature column and the name it has in the prompt text
+    PROMPT_FIELDS = [
+        ('Lag1_ClosePrice', 'Lag1_ClosePrice'),
+        ('Lag3_ClosePrice', 'Lag3_ClosePrice'),
+        ('SMA_7', '7-day SMA'),
+        ('SMA_30', '30-day SMA'),
+        ('Volatility', 'Volatility'),
+        ('RSI', 'RSI'),
+        ('MACD', 'MACD'),
+        ('MACD_Signal', 'MACD Signal'),
+        ('Sentiment_Rolling', 'Sentiment Rolling'),
+    ]
+
+    def __init__(self, instruction=None, precision=None, horizon=1, test_start=None, test_tickers=None, test_fraction=None, feature_engine=None):
+        self.instruction = instruction or self.INSTRUCTION
+        # None keeps the full repr of every float as in the original datasets, an int rounds to that many decimals
+        self.precision = precision
+        # A bar is 'bullish' when the close `horizon` bars later is higher than its own close
+        self.horizon = horizon
+        # Split rules, checked in order: held out tickers, then a date cutoff, then a stable hash of ticker and date
+        self.test_start = pd.Timestamp(test_start) if test_start is not None else None
+        self.test_tickers = set(test_tickers or [])
+        self.test_fraction = test_fraction
+        self.feature_engine = feature_engine or FeatureEngine()
+
+    def format_value(self, value):
+        if self.precision is None:
+            return str(float(value))
+        text = f'{value:.{self.precision}f}'
+        # Trailing zeros only cost tokens
+        if '.' in text:
+            text = text.rstrip('0').rstrip('.')
+        return '0' if text == '-0' else text
+
+    def split_of(self, ticker, date):
+        if ticker in self.test_tickers:
+            return 'test'
+        if self.test_start is not None:
+            return 'test' if date >= self.test_start else 'train'
+        if self.test_fraction:
+            bucket = zlib.crc32(f'{ticker}|{date:%Y-%m-%d}'.encode('utf-8')) % 10000
+            return 'test' if bucket < self.test_fraction * 10000 else 'train'
+        return 'train'
+
+    def iter_ticker_frames(self, frames):
+        """Split frames into one frame per ticker; a ticker must not span two input frames"""
+        for df in frames:
+            for _, ticker_frame in df.groupby('Ticker', sort=False, observed=True):
+                yield ticker_frame
+
+    def records(self, frames):
+        """Yield (split, record) for every labelled bar, holding one ticker's history at a time"""
+        for ticker_frame in self.iter_ticker_frames(frames):
+            engine = self.feature_engine
+            df = engine.compute(ticker_frame)
+            dates = parse_bar_dates(df[engine.column_for(df, engine.DATE_COLUMNS)])
+            closes = parse_indian_numbers(df[engine.column_for(df, engine.CLOSE_COLUMNS)]).astype(float)
+            future = closes.groupby([df[col] for col in engine.group_cols], sort=False, observed=True).shift(-self.horizon)
+
+            df['Sentiment_Rolling'] = df['Sentiment_Rolling'].fillna(0.0)
+            features = [col for col, _ in self.PROMPT_FIELDS]
+            usable = (df[features].notna().all(axis=1) & future.notna()).to_numpy()
+            if not usable.any():
+                continue
+            # Format column by column, then glue the fields of each row together
+            fields = [[f'{name}: {self.format_value(value)}' for value in df[col].to_numpy()[usable]] for col, name in self.PROMPT_FIELDS]
+            labels = np.where(future.to_numpy()[usable] > closes.to_numpy()[usable], 'bullish', 'bearish')
+            tickers = df['Ticker'].astype(str).to_numpy()[usable]
+            for parts, label, ticker, date in zip(zip(*fields), labels, tickers, dates.to_numpy()[usable]):
+                record = {'instruction': self.instruction, 'input': ', '.join(parts) + '.', 'response': str(label)}
+                yield self.split_of(ticker, pd.Timestamp(date)), record
+
+    def build(self, frames, output_dir, max_shard_bytes=64 * 2 ** 20, formats=None):
+        """Write the records of frames (an iterable of DataFrames) as shards plus manifest.json"""
+        formats = formats or {'train': 'jsonl', 'test': 'csv'}
+        os.makedirs(output_dir, exist_ok=True)
+        writers = {split: ShardWriter(output_dir, split, file_format, max_shard_bytes) for split, file_format in formats.items()}
+        counts = {split: {'bullish': 0, 'bearish': 0} for split in writers}
+        input_chars = 0
+        try:
+            for split, record in self.records(frames):
+                writers[split].write(record)
+                counts[split][record['response']] += 1
+                input_chars += len(record['input'])
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        manifest = {
+            'instruction': self.instruction,
+            'fields': [name for _, name in self.PROMPT_FIELDS],
+            'precision': self.precision,
+            'horizon': self.horizon,
+            'split': {
+                'test_start': str(self.test_start.date()) if self.test_start is not None else None,
+                'test_tickers': sorted(self.test_tickers),
+                'test_fraction': self.test_fraction,
+            },
+            'labels': counts,
+            'input_chars': input_chars,
+            'shards': [shard for writer in writers.values() for shard in writer.manifest()],
+        }
+        with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
@@ -0,0 +1,89 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+
+def new_scaler():
+    # sklearn takes about a second to import, so it is only loaded once a scaler is fitted or loaded
+    from sklearn.preprocessing import StandardScaler
+    return StandardScaler()
+
+
+class IncrementalScaler:
+    """StandardScaler state that is updated with partial_fit, optionally one per ticker, and saved to JSON"""
+    GLOBAL_KEY = '__all__'
+
+    def __init__(self, columns, group_col=None):
+        self.columns = list(columns)
+        # With a group column every ticker gets its own scaler, plus a global one for unseen tickers
+        self.group_col = group_col
+        self.scalers = {}
+
+    def partial_fit(self, df):
+        """Fold the rows of df into the running mean/variance, only the new rows are scanned. Every call counts
+        its rows, passing the same rows twice weighs them twice. Rows without a ticker only update the global scaler"""
+        if df.empty:
+            return self
+        values = df[self.columns].to_numpy(dtype=np.float64)
+        if self.GLOBAL_KEY not in self.scalers:
+            self.scalers[self.GLOBAL_KEY] = new_scaler()
+        self.scalers[self.GLOBAL_KEY].partial_fit(values)
+        if self.group_col is not None:
+            for key, rows in df.groupby(self.group_col, sort=False, observed=True).indices.items():
+                if str(key) not in self.scalers:
+                    self.scalers[str(key)] = new_scaler()
+                self.scalers[str(key)].partial_fit(values[rows])
+        return self
+
+    def transform(self, df):
+        """Scaled copy of the numerical columns of df, using the stored state without refitting.
+        Rows of tickers without a scaler of their own, or without a ticker, use the global scaler"""
+        values = df[self.columns].to_numpy(dtype=np.float64, copy=True)
+        if self.group_col is None:
+            groups = {self.GLOBAL_KEY: np.arange(len(df))}
+        else:
+            indices = df.groupby(self.group_col, sort=False, dropna=False, observed=True).indices
+            groups = {self.GLOBAL_KEY if pd.isna(key) else str(key): rows for key, rows in indices.items()}
+        for key, rows in groups.items():
+            scaler = self.scalers.get(key, self.scalers.get(self.GLOBAL_KEY))
+            if scaler is None:
+                raise ValueError("IncrementalScaler has not been fitted")
+            values[rows] = (values[rows] - scaler.mean_) / scaler.scale_
+        return values
+
+    def save(self, path):
+        """Write the scaler state to JSON, floats are written with repr so they load back bit-for-bit"""
+        state = {
+            'columns': self.columns,
+            'group_col': self.group_col,
+            'scalers': {
+                key: {
+                    'mean': scaler.mean_.tolist(),
+                    'var': scaler.var_.tolist(),
+                    'scale': scaler.scale_.tolist(),
+                    'n_samples_seen': np.broadcast_to(scaler.n_samples_seen_, scaler.mean_.shape).tolist(),
+                }
+                for key, scaler in self.scalers.items()
+            },
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(state, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            state = json.load(f)
+        scaler_state = cls(state['columns'], state['group_col'])
+        for key, params in state['scalers'].items():
+            scaler = new_scaler()
+            scaler.mean_ = np.array(params['mean'], dtype=np.float64)
+            scaler.var_ = np.array(params['var'], dtype=np.float64)
+            scaler.scale_ = np.array(params['scale'], dtype=np.float64)
+            scaler.n_samples_seen_ = np.array(params['n_samples_seen'], dtype=np.int64)
+            scaler.n_features_in_ = len(scaler.mean_)
+            scaler_state.scalers[key] = scaler
+        return scaler_state
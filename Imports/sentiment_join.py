@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from .features import parse_bar_dates
+
+
+class SentimentIndex:
+    """Per-ticker, time-sorted news sentiment that price bars are joined to as of their close,
+    so a bar only ever sees articles published up to that bar"""
+    # One sortable int64 key per event: ticker code in the high bits, seconds since EPOCH in the low bits
+    TIME_BITS = 34
+    EPOCH = pd.Timestamp('1970-01-01', tz='UTC')
+    BAR_DATE_COLUMNS = ['Date', 'TIMESTAMP']
+
+    def __init__(self, news, sentiment_col='sentiment', ticker_col='ticker', date_col='date', tz='Asia/Kolkata', bar_close='15:30'):
+        # Naive dates are read as tz wall clock; a daily bar is stamped at the market close
+        self.tz = tz
+        self.bar_close = pd.Timedelta(f'{bar_close}:00')
+        self.ticker_codes = {}
+        missing = [col for col in (ticker_col, date_col, sentiment_col) if col not in news.columns]
+        if missing:
+            raise ValueError(f"news has no {', '.join(map(repr, missing))} column, score the articles before joining their sentiment")
+        news = news.dropna(subset=[date_col, sentiment_col])
+        codes = self.encode_tickers(news[ticker_col], add=True)
+        keys = self.make_keys(codes, self.to_seconds(news[date_col]))
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        sentiment = news[sentiment_col].to_numpy(dtype=np.float64)[order]
+        # Window sums come from differences of prefix sums, so any lookback costs two binary searches
+        self.cumulative_sum = np.concatenate([[0.0], np.cumsum(sentiment)])
+
+    def encode_tickers(self, tickers, add=False):
+        tickers = tickers.astype(str)
+        if add:
+            for ticker in pd.unique(tickers):
+                self.ticker_codes.setdefault(ticker, len(self.ticker_codes))
+        return tickers.map(self.ticker_codes).fillna(-1).to_numpy(dtype=np.int64)
+
+    def to_seconds(self, dates):
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates, format='mixed', dayfirst=True)
+        if dates.dt.tz is None:
+            dates = dates.dt.tz_localize(self.tz)
+        return ((dates - self.EPOCH) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+
+    def make_keys(self, codes, seconds):
+        return (codes << self.TIME_BITS) + seconds
+
+    def join(self, bars, lookback='3D', ticker_col='Ticker'):
+        """Sentiment mean and article count of the news in (close - lookback, close] of every bar"""
+        date_col = next(col for col in self.BAR_DATE_COLUMNS if col in bars.columns)
+        dates = parse_bar_dates(bars[date_col])
+        closes = dates.dt.normalize() + self.bar_close
+        seconds = self.to_seconds(closes)
+
+        codes = self.encode_tickers(bars[ticker_col])
+        window = int(pd.Timedelta(lookback).total_seconds())
+        # Both ends are searched with side='right': articles at exactly close - lookback are out, at close are in
+        upper = np.searchsorted(self.keys, self.make_keys(codes, seconds), side='right')
+        lower = np.searchsorted(self.keys, self.make_keys(codes, seconds - window), side='right')
+        count = np.where(codes >= 0, upper - lower, 0)
+        total = self.cumulative_sum[upper] - self.cumulative_sum[lower]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(count > 0, total / count, np.nan)
+
+        bars = bars.copy()
+        bars['Sentiment'] = mean
+        bars['News_Count'] = count
+        return bars
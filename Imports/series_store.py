@@ -0,0 +1,138 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from .features import FeatureEngine, parse_bar_dates
+from .nse_loader import parse_indian_numbers
+
+
+class SeriesStore:
+    """Numeric columns of hist_dat or PreprocessData output as one float64 matrix on disk, each ticker's rows
+    contiguous and chronological. The arrays are opened with np.load(mmap_mode='r') and a calendar-day index per
+    ticker maps a date to its row in O(1), so a trailing window is a zero-copy slice of the mapped file.
+    Worker processes opening the same store share its read-only pages through the page cache"""
+    DATE_COLUMNS = FeatureEngine.DATE_COLUMNS
+    ARRAYS = ['values', 'days', 'day_index']
+
+    def __init__(self, root='series_store'):
+        self.root = root
+        self.manifest = None
+        self.arrays = {}
+
+    def numeric_columns(self, df, exclude):
+        """Numeric columns, plus string columns whose every value is a number such as '20,25,167'"""
+        columns = {}
+        for col in df.columns:
+            if col in exclude or str(col).startswith('Unnamed:'):
+                continue
+            values = df[col]
+            if pd.api.types.is_numeric_dtype(values):
+                columns[col] = values
+            elif pd.api.types.is_string_dtype(values) or values.dtype == object:
+                parsed = parse_indian_numbers(values)
+                if values.notna().any() and parsed.notna().sum() == values.notna().sum():
+                    columns[col] = parsed
+        return columns
+
+    def write(self, df, columns=None, ticker_col='Ticker'):
+        """Replace the store with the rows of df. One row per ticker and date is expected, the date index of a day
+        with several rows points at the last of them"""
+        date_col = next(col for col in self.DATE_COLUMNS if col in df.columns)
+        if columns is None:
+            values = self.numeric_columns(df, {ticker_col, date_col})
+        else:
+            values = {col: parse_indian_numbers(df[col]) for col in columns}
+        codes, names = pd.factorize(df[ticker_col].astype(str), sort=True)
+        dates = parse_bar_dates(df[date_col])
+        days = dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+        # Rows without a date cannot be looked up and are left out
+        order = np.lexsort((days, codes))
+        order = order[dates.notna().to_numpy()[order]]
+        matrix = np.empty((len(order), len(values)), dtype=np.float64)
+        for i, col_values in enumerate(values.values()):
+            matrix[:, i] = col_values.to_numpy(dtype=np.float64, na_value=np.nan)[order]
+        tickers, days = codes[order], days[order]
+
+        manifest = {'columns': [str(col) for col in values], 'tickers': {}}
+        day_index = []
+        index_offset = 0
+        bounds = np.flatnonzero(np.r_[True, tickers[1:] != tickers[:-1], True]) if len(order) else np.array([0])
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            ticker_days = days[start:stop]
+            calendar = np.arange(ticker_days[0], ticker_days[-1] + 1)
+            # Row of the last bar on or before every calendar day, relative to the ticker's first row
+            day_index.append((np.searchsorted(ticker_days, calendar, side='right') - 1).astype(np.int32))
+            manifest['tickers'][str(names[tickers[start]])] = {'start': int(start), 'rows': int(stop - start), 'first_day': int(ticker_days[0]),
+                                                        'last_day': int(ticker_days[-1]), 'index_offset': index_offset}
+            index_offset += len(calendar)
+
+        os.makedirs(self.root, exist_ok=True)
+        arrays = {'values': matrix, 'days': days, 'day_index': np.concatenate(day_index) if day_index else np.empty(0, dtype=np.int32)}
+        for name, array in arrays.items():
+            # Written under a temporary name and renamed, readers never map a half-written file
+            with open(os.path.join(self.root, f'{name}.npy.tmp'), 'wb') as f:
+                np.save(f, array)
+            os.replace(os.path.join(self.root, f'{name}.npy.tmp'), os.path.join(self.root, f'{name}.npy'))
+        with open(os.path.join(self.root, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+        self.close()
+        return len(order)
+
+    def open(self):
+        if self.manifest is None:
+            with open(os.path.join(self.root, 'manifest.json'), 'r') as f:
+                self.manifest = json.load(f)
+            self.arrays = {name: np.load(os.path.join(self.root, f'{name}.npy'), mmap_mode='r') for name in self.ARRAYS}
+        return self
+
+    def close(self):
+        self.manifest, self.arrays = None, {}
+
+    def __getstate__(self):
+        # Pickled into a worker process, the store is mapped again there instead of copying the arrays
+        return {'root': self.root, 'manifest': None, 'arrays': {}}
+
+    @property
+    def columns(self):
+        return self.open().manifest['columns']
+
+    @property
+    def tickers(self):
+        return list(self.open().manifest['tickers'])
+
+    def column_index(self, column):
+        return self.columns.index(column)
+
+    def row(self, ticker, date):
+        """Row of ticker's last bar on or before date, None before its first bar"""
+        meta = self.open().manifest['tickers'][ticker]
+        day = np.datetime64(date, 'D').astype(np.int64) - meta['first_day']
+        if day < 0:
+            return None
+        if day > meta['last_day'] - meta['first_day']:
+            return meta['start'] + meta['rows'] - 1
+        return meta['start'] + int(self.arrays['day_index'][meta['index_offset'] + day])
+
+    def window(self, ticker, date, length):
+        """Up to length rows of ticker ending at its last bar on or before date, as a read-only view of the mapped
+        values (rows x columns). Fewer rows come back near the start of the ticker's history"""
+        row = self.row(ticker, date)
+        if row is None:
+            return self.arrays['values'][:0]
+        start = max(self.manifest['tickers'][ticker]['start'], row - length + 1)
+        return self.arrays['values'][start:row + 1]
+
+    def window_dates(self, ticker, date, length):
+        row = self.row(ticker, date)
+        if row is None:
+            return np.empty(0, dtype='datetime64[D]')
+        start = max(self.manifest['tickers'][ticker]['start'], row - length + 1)
+        return self.arrays['days'][start:row + 1].astype('datetime64[D]')
+
+    def frame(self, ticker):
+        """All rows of ticker as a DataFrame indexed by date, a copy"""
+        meta = self.open().manifest['tickers'][ticker]
+        rows = slice(meta['start'], meta['start'] + meta['rows'])
+        return pd.DataFrame(np.array(self.arrays['values'][rows]), columns=self.columns,
+                            index=pd.DatetimeIndex(self.arrays['days'][rows].astype('datetime64[D]'), name='Date'))
@@ -0,0 +1,73 @@
+import pandas as pd
+from .preproc_data import PreprocessData
+from .news_dates import normalize_news_dates
+
+
+class StreamPreprocessData(PreprocessData):
+    """Chunked version of PreprocessData.preprocess() that keeps only one chunk in memory at a time"""
+    # Categories must be fixed up front so every chunk gets the same dummy columns
+    ENCODED_CATEGORIES = {
+        'Option Type': ['call', 'put'],
+        'OPTION_TYPE': ['CE', 'PE', 'XX'],
+    }
+    ENCODED_COLUMNS = {'stock': 'Option Type', 'index': 'OPTION_TYPE', 'etf': 'Option Type'}
+
+    def __init__(self, categories=None):
+        super().__init__(pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame())
+        self.categories = dict(self.ENCODED_CATEGORIES)
+        if categories:
+            self.categories.update(categories)
+
+    def preprocess_market_chunks(self, chunks, column):
+        last_row = None
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            chunk = chunk.ffill()
+            # After ffill only the leading gaps are left, they take the last values of the previous chunks
+            if last_row is not None:
+                chunk = chunk.fillna(last_row)
+            last_row = chunk.iloc[-1]
+
+            if column in chunk.columns:
+                chunk[column] = pd.Categorical(chunk[column], categories=self.categories[column])
+                chunk = pd.get_dummies(chunk, columns=[column])
+            yield chunk
+
+    def preprocess_news_chunks(self, chunks):
+        seen = set()
+        last_date = None
+        self.date_report = {}
+        for chunk in chunks:
+            chunk = chunk.copy()
+            chunk['Clean_Title'] = chunk['title'].apply(lambda x: self.clean_text(str(x)))
+
+            # Drop duplicates within the chunk and against every earlier chunk
+            keys = pd.util.hash_pandas_object(chunk[['title', 'content']], index=False)
+            duplicated = keys.duplicated() | keys.isin(seen)
+            seen.update(keys[~duplicated])
+            chunk = chunk[~duplicated]
+            if chunk.empty:
+                continue
+
+            chunk['date'], report = normalize_news_dates(chunk['date'])
+            for name, count in report.items():
+                self.date_report[name] = self.date_report.get(name, 0) + count
+            chunk['date'] = chunk['date'].ffill()
+            if last_date is not None:
+                chunk['date'] = chunk['date'].fillna(last_date)
+            if pd.notna(chunk['date'].iloc[-1]):
+                last_date = chunk['date'].iloc[-1]
+            chunk['title'] = chunk['title'].fillna('No Title')
+            chunk['content'] = chunk['content'].fillna('No Content')
+            yield chunk
+        self.report_bad_dates(self.date_report)
+
+    def preprocess_stream(self, chunks, kind):
+        """Yield processed chunks of the 'stock', 'index', 'etf' or 'news' frame from an iterator of chunks,
+        e.g. pd.read_csv(path, chunksize=100000)"""
+        if kind == 'news':
+            return self.preprocess_news_chunks(chunks)
+        if kind not in self.ENCODED_COLUMNS:
+            raise ValueError(f"Unknown frame {kind}, expected 'stock', 'index', 'etf' or 'news'")
+        return self.preprocess_market_chunks(chunks, self.ENCODED_COLUMNS[kind])
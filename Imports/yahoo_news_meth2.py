@@ -1,44 +1,35 @@
 import html
-from requests_html import HTMLSession
 import re
 import pandas as pd
-from tqdm.notebook import tqdm
-from bs4 import BeautifulSoup
+from .http_cache import cached_get
+from .html_extract import extract_yahoo_article
+from .http_client import get_client
+from .metrics import METRICS, timed
+from .progress import progress
 
 class GetYahooNewsData2:
-    def __init__(self, tickers):
+    # Yahoo serves a consent page instead of the quote and article HTML to clients without a browser User-Agent
+    HEADERS = {
+        "Accept": "application/json, text/plain, /",
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/84.0.4147.105 Safari/537.36",
+        "Referer": "https://finance.yahoo.com/"
+        }
+
+    def __init__(self, tickers, cache=None):
         self.tickers = tickers
         self.news_data = pd.DataFrame()
-        self.session = HTMLSession()
+        self.session = get_client()
+        self.cache = cache
 
     # Step 2: Extract content from each article link
     def extract_article_content(self, ticker, url):
         all_article_content = []
         for article_link in url:
-            article_resp = self.session.get(article_link).content.decode("utf-8")
-            soup = BeautifulSoup(article_resp, 'html.parser')
-            
-            # Extract title
-            title_tag = soup.find('h1', {'data-test-locator': 'headline'})
-            title = title_tag.get_text() if title_tag else 'No title available'
-            
-            # Extract date
-            date_tag = soup.find('time')
-            date = date_tag['datetime'] if date_tag else 'No date available'
-            
-            # Extract article content
-            article_body = soup.find('div', class_='caas-body')
-            if article_body:
-                paragraphs = article_body.find_all('p')
-                article_content = ' '.join([p.text for p in paragraphs])
-              
-            article_details = {
-                    'url': article_link,
-                    'title': title,
-                    'date': date,
-                    'content': article_content,
-                    'ticker': ticker
-                }  
+            article_resp = cached_get(article_link, headers=self.HEADERS, cache=self.cache, session=self.session).content.decode("utf-8")
+            article_details = extract_yahoo_article(article_resp, article_link, ticker)
+            # Pages without a caas-body have no article text to keep
+            if article_details is None:
+                continue
               
             # article_details = {
             #         'url': article_link,
@@ -49,21 +40,17 @@ class GetYahooNewsData2:
             #     }
             all_article_content.append(article_details)
             
+        METRICS.rows('yahoo_extract_article_content', rows_in=len(url), rows_out=len(all_article_content))
         return all_article_content
         
+    @timed('get_yahoo_news2', export=True)
     def get_yahoo_news2(self):
             all_articles_content = []
             article_links = []
             
-            headers = {
-                "Accept": "application/json, text/plain, /",
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/84.0.4147.105 Safari/537.36",
-                "Referer": "https://finance.yahoo.com/"
-                }
-            
-            for ticker in tqdm(self.tickers["Stock"], desc="Fetching article content"):
+            for ticker in progress(self.tickers["Stock"], desc="Fetching article content"):
                 url = f'https://finance.yahoo.com/quote/{ticker}.NS/news?p={ticker}.NS'
-                response = self.session.get(url).content.decode("utf-8")
+                response = cached_get(url, headers=self.HEADERS, cache=self.cache, session=self.session).content.decode("utf-8")
 
                 #Extract news article links
                 links = re.findall(r'<a\s[^>]*class="[^"]*subtle-link[^"]*"[^>]*href="([^"]*\.html)"', response)
@@ -78,7 +65,7 @@ class GetYahooNewsData2:
                 # Append the filtered links to article_links
                 article_links.append((ticker, filtered_links))
                 
-            for ticker, links in tqdm(article_links, desc="Getting contents of the articles"):
+            for ticker, links in progress(article_links, desc="Getting contents of the articles"):
                 all_articles_content.extend(self.extract_article_content(ticker, links))
                 
             if all_articles_content:    
@@ -0,0 +1,100 @@
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import Imports.module as module
+from Imports import GetFinData
+from Imports.backfill import date_windows
+
+
+class FakeNSE:
+    """Stands in for nselib's capital_market and derivatives: one row per weekday (three futures expiries for
+    indices) after a fixed latency per request, and a failure for the windows listed in fail_on"""
+    def __init__(self, latency=0.05, fail_on=()):
+        self.latency = latency
+        self.fail_on = set(fail_on)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def days(self, from_date, to_date):
+        if (from_date, to_date) in self.fail_on:
+            raise ConnectionError('Read timed out')
+        with self.lock:
+            self.requests += 1
+        time.sleep(self.latency)
+        return pd.bdate_range(datetime.strptime(from_date, '%d-%m-%Y'), datetime.strptime(to_date, '%d-%m-%Y'))
+
+    def price_volume_and_deliverable_position_data(self, symbol, from_date, to_date):
+        days = self.days(from_date, to_date)
+        close = 100 + (days.dayofyear.to_numpy() % 50)
+        return pd.DataFrame({'Symbol': symbol, 'Series': 'EQ', 'Date': days.strftime('%d-%b-%Y'), 'ClosePrice': close,
+                             'TotalTradedQuantity': days.day.to_numpy() * 1000})
+
+    def future_price_volume_data(self, symbol, instrument, from_date, to_date):
+        days = self.days(from_date, to_date).repeat(3)
+        expiries = (days + pd.offsets.MonthEnd(1) + pd.to_timedelta(np.tile([0, 31, 62], len(days) // 3), unit='D')).strftime('%d-%b-%Y')
+        return pd.DataFrame({'TIMESTAMP': days.strftime('%d-%b-%Y'), 'INSTRUMENT': instrument, 'SYMBOL': symbol,
+                             'EXPIRY_DT': expiries, 'STRIKE_PRICE': 0, 'OPTION_TYPE': 'XX',
+                             'CLOSING_PRICE': 5000 + days.dayofyear.to_numpy()})
+
+
+def run(fake, tickers, start, end, workers, checkpoint_dir=None):
+    real = module.capital_market, module.derivatives
+    module.capital_market = module.derivatives = fake
+    try:
+        fin_data = GetFinData(tickers, start, end, max_workers=len(tickers), checkpoint_dir=checkpoint_dir, backfill_workers=workers)
+        started = time.perf_counter()
+        fin_data.run()
+        return fin_data.hist_dat, time.perf_counter() - started
+    finally:
+        module.capital_market, module.derivatives = real
+
+
+def main(start='2014-01-01', end='2023-12-31', latency=0.05, workers=8):
+    # Stocks share the ETF endpoint, and would also poll the live option chain
+    tickers = {'ETF': ['NIFTYBEES', 'BANKBEES', 'GOLDBEES'], 'Index': ['NIFTY']}
+
+    # Sequential windows, what nselib does by itself for a long range
+    serial = FakeNSE(latency)
+    expected, serial_time = run(serial, tickers, start, end, workers=1)
+    rows = sum(len(df) for df in expected.values())
+    print(f"{start} to {end}: {rows:,} rows in {serial.requests} requests, 1 at a time: {serial_time:.2f}s")
+
+    concurrent = FakeNSE(latency)
+    result, concurrent_time = run(concurrent, tickers, start, end, workers)
+    for asset_type, df in expected.items():
+        pd.testing.assert_frame_equal(df, result[asset_type])
+    print(f"{workers} concurrent requests: {concurrent_time:.2f}s ({serial_time / concurrent_time:.1f}x), same rows")
+
+    # Every date appears once per contract even where windows overlap
+    for asset_type, df in result.items():
+        keys = [col for col in GetFinData.KEY_COLUMNS[asset_type] if col in df.columns]
+        assert not df.duplicated(keys).any(), asset_type
+
+    root = tempfile.mkdtemp()
+    try:
+        # A backfill where a third of the index windows time out, then a rerun against a healthy feed
+        windows = date_windows(datetime.strptime(start, '%Y-%m-%d'), datetime.strptime(end, '%Y-%m-%d'), GetFinData.WINDOW_DAYS['Index'])
+        failing = [(a.strftime('%d-%m-%Y'), b.strftime('%d-%m-%Y')) for a, b in windows[::3]]
+        crashed, _ = run(FakeNSE(latency, fail_on=failing), tickers, start, end, workers, root)
+        print(f"first run: {len(failing)} of {len(windows)} index windows failed, {len(crashed['Index']):,} of {len(expected['Index']):,} index rows")
+
+        resumed = FakeNSE(latency)
+        result, resume_time = run(resumed, tickers, start, end, workers, root)
+        for asset_type, df in expected.items():
+            pd.testing.assert_frame_equal(df, result[asset_type])
+        assert resumed.requests == len(failing), resumed.requests
+        print(f"rerun fetched only the {resumed.requests} missing windows in {resume_time:.2f}s, result matches a clean backfill")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
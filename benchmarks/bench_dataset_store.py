@@ -0,0 +1,60 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import tracemalloc
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from Imports.dataset_store import DatasetStore
+
+DATASETS = os.path.join(os.path.dirname(__file__), '..', 'Datasets')
+
+
+def measure(func, *args, **kwargs):
+    """Return (seconds, peak traced MiB, result) for one call"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20, result
+
+
+def read_csv_and_filter(path, ticker, start_date, end_date, columns):
+    """What a caller has to do today: load every row, then parse and filter"""
+    df = pd.read_csv(path)
+    dates = pd.to_datetime(df['TIMESTAMP'], format='%d-%b-%Y')
+    mask = (df['Ticker'] == ticker) & (dates >= start_date) & (dates <= end_date)
+    df = df.loc[mask, columns].copy()
+    for col in columns:
+        if df[col].dtype == object:
+            df[col] = df[col].str.replace(',', '').astype(float)
+    return df
+
+
+def main():
+    root = tempfile.mkdtemp(prefix='dataset_store_')
+    try:
+        store = DatasetStore(root)
+        elapsed, peak, rows = measure(store.convert_datasets, DATASETS)
+        print(f"convert Datasets/ ({sum(rows.values())} rows): {elapsed:.2f}s, peak {peak:.1f} MiB")
+
+        path = os.path.join(DATASETS, 'index_options_data.csv')
+        columns = ['CLOSING_PRICE', 'OPEN_INT']
+        queries = [
+            ('full load', {}, ('2000-01-01', '2100-01-01')),
+            ('one ticker, one month, 2 columns', {'columns': columns}, ('2015-03-01', '2015-03-31')),
+        ]
+        for name, kwargs, (start_date, end_date) in queries:
+            csv_time, csv_peak, _ = measure(pd.read_csv, path) if not kwargs else measure(read_csv_and_filter, path, 'NIFTY', start_date, end_date, columns)
+            store_time, store_peak, df = measure(store.read, 'hist', asset_types=['Index'], tickers=['NIFTY'], start_date=start_date, end_date=end_date, **kwargs)
+            print(f"{name:<34} read_csv {csv_time * 1000:.0f}ms / {csv_peak:.1f} MiB, store {store_time * 1000:.0f}ms / {store_peak:.1f} MiB ({len(df)} rows)")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import importlib.util
+import sys
+import os
+import time
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from Imports.html_extract import extract_et_article, extract_yahoo_article, extract_et_listing_links, extract_articles
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def et_article_full_parse(html, url, ticker):
+    """The original full-tree ET extraction, kept as the reference"""
+    soup = BeautifulSoup(html, 'html.parser')
+    title_tag = soup.find('h1', class_='artTitle')
+    title = title_tag.get_text() if title_tag else 'No title available'
+    date_tag = soup.find('time', class_='jsdtTime')
+    date = date_tag.get_text() if date_tag else 'No date available'
+    article_body = soup.find('h2', class_='summary')
+    if article_body:
+        return {'url': url, 'title': title, 'date': date, 'content': article_body.get_text(), 'ticker': ticker}
+    return None
+
+
+def yahoo_article_full_parse(html, url, ticker):
+    """The original full-tree Yahoo extraction, kept as the reference"""
+    soup = BeautifulSoup(html, 'html.parser')
+    title_tag = soup.find('h1', {'data-test-locator': 'headline'})
+    title = title_tag.get_text() if title_tag else 'No title available'
+    date_tag = soup.find('time')
+    date = date_tag['datetime'] if date_tag else 'No date available'
+    article_body = soup.find('div', class_='caas-body')
+    if article_body:
+        paragraphs = article_body.find_all('p')
+        return {'url': url, 'title': title, 'date': date, 'content': ' '.join([p.text for p in paragraphs]), 'ticker': ticker}
+    return None
+
+
+def et_listing_full_parse(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    links = []
+    for story in soup.find_all('div', class_='eachStory'):
+        a_tag = story.find('a')
+        if a_tag and 'href' in a_tag.attrs and a_tag['href'].endswith('.cms'):
+            links.append(a_tag['href'])
+    return links
+
+
+def time_call(func, repeat, *args):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main(repeat=50, backfill_pages=2000):
+    et_html = load_fixture('et_article.html')
+    yahoo_html = load_fixture('yahoo_article.html')
+    listing_html = load_fixture('et_listing.html')
+    url, ticker = 'https://economictimes.indiatimes.com/x/articleshow/1.cms', 'ADANIENT'
+
+    has_lxml = importlib.util.find_spec('lxml') is not None
+    cases = [
+        ('et article', et_article_full_parse, extract_et_article, (et_html, url, ticker)),
+        ('yahoo article', yahoo_article_full_parse, extract_yahoo_article, (yahoo_html, url, ticker)),
+        ('et listing', et_listing_full_parse, extract_et_listing_links, (listing_html,)),
+    ]
+    for name, reference, fast, args in cases:
+        reference_time, expected = time_call(reference, repeat, *args)
+        fast_time, result = time_call(fast, repeat, *args)
+        assert result == expected, f"{name}: strained extraction differs from the full parse"
+        print(f"{name:<14} full parse {reference_time * 1000:.1f}ms, strained {fast_time * 1000:.1f}ms, speedup {reference_time / fast_time:.1f}x")
+        if has_lxml:
+            lxml_time, result = time_call(fast, repeat, *args, 'lxml')
+            assert result == expected, f"{name}: lxml extraction differs from the full parse"
+            print(f"{'':<14} strained with lxml {lxml_time * 1000:.1f}ms, speedup {reference_time / lxml_time:.1f}x")
+
+    pages = [(et_html, f'{url}?{i}', ticker) for i in range(backfill_pages)]
+    for processes in (1, os.cpu_count()):
+        start = time.perf_counter()
+        records = extract_articles(pages, source='et', processes=processes)
+        elapsed = time.perf_counter() - start
+        print(f"backfill of {len(records)} pages with {processes} process(es): {elapsed:.2f}s ({len(records) / elapsed:.0f} pages/s)")
+
+
+if __name__ == '__main__':
+    main()
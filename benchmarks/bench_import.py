@@ -0,0 +1,57 @@
+import sys
+import os
+import json
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+# Reported per import; tests/test_imports.py checks that preprocessing loads none of them
+NETWORK_MODULES = ['nselib', 'serpapi', 'selenium', 'requests_html', 'bs4', 'tqdm', 'requests', 'torch', 'Imports.module']
+
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'max_rss_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  'modules': sorted(sys.modules)}}))
+"""
+
+
+def measure_import(statement, repeat=5):
+    """Import statement in fresh interpreters: best wall time, peak RSS and the modules it left loaded"""
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', CHILD.format(statement=statement)], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    best = min(runs, key=lambda run: run['seconds'])
+    return best['seconds'], min(run['max_rss_mib'] for run in runs), set(best['modules'])
+
+
+def loaded(modules, names):
+    return [name for name in names if name in modules or any(module.startswith(name + '.') for module in modules)]
+
+
+def main():
+    baseline_time, baseline_rss, _ = measure_import('import pandas')
+    print(f"{'import pandas (floor)':<48} {baseline_time * 1000:7.0f}ms {baseline_rss:7.1f} MiB RSS")
+    cases = [
+        'import Imports; dir(Imports)',
+        'from Imports import PreprocessData',
+        'from Imports import StreamPreprocessData, FeatureEngine',
+        'from Imports import ParallelPreprocessData',
+        'from Imports import GetFinData, GetYahooNewsData2',
+    ]
+    for statement in cases:
+        try:
+            seconds, rss, modules = measure_import(statement)
+        except subprocess.CalledProcessError as e:
+            # GetFinData needs nselib installed
+            print(f"{statement:<48} skipped: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        heavy = loaded(modules, NETWORK_MODULES)
+        print(f"{statement:<48} {seconds * 1000:7.0f}ms {rss:7.1f} MiB RSS, loads: {', '.join(heavy) or 'none of the network stack'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import sys
+import os
+import time
+import numpy as np
+import torch
+from tokenizers import Tokenizer, models, trainers, pre_tokenizers
+from transformers import PreTrainedTokenizerFast, LlamaConfig, LlamaForCausalLM
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from Imports.label_scoring import LabelScorer, ALPACA_PROMPT, INSTRUCTION
+
+
+def make_inputs(n, seed=0):
+    """Prompt inputs in the Test_Xydataset layout, with a spread of float lengths"""
+    rng = np.random.default_rng(seed)
+    names = ['Lag1_ClosePrice', 'Lag3_ClosePrice', '7-day SMA', '30-day SMA', 'Volatility', 'RSI', 'MACD', 'MACD Signal']
+    inputs = []
+    for _ in range(n):
+        digits = rng.integers(1, 14, size=len(names))
+        values = [f'{rng.uniform(-500, 5000):.{d}f}' for d in digits]
+        inputs.append(', '.join(f'{name}: {value}' for name, value in zip(names, values)) + f', Sentiment Rolling: {rng.choice([-1.0, 0.0, 1.0])}.')
+    return inputs
+
+
+def make_tiny_model(texts, vocab_size=800, seed=0):
+    """Randomly initialised two-layer Llama with a BPE tokenizer trained on the prompts"""
+    tokenizer = Tokenizer(models.BPE(unk_token='<unk>'))
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.train_from_iterator(texts, trainers.BpeTrainer(vocab_size=vocab_size, special_tokens=['<pad>', '<s>', '</s>', '<unk>']))
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=tokenizer, pad_token='<pad>', bos_token='<s>', eos_token='</s>', unk_token='<unk>')
+    torch.manual_seed(seed)
+    config = LlamaConfig(vocab_size=len(tokenizer), hidden_size=128, intermediate_size=256, num_hidden_layers=2,
+                         num_attention_heads=4, num_key_value_heads=4, max_position_embeddings=2048,
+                         pad_token_id=tokenizer.pad_token_id, bos_token_id=tokenizer.bos_token_id, eos_token_id=tokenizer.eos_token_id)
+    return LlamaForCausalLM(config).eval(), tokenizer
+
+
+@torch.inference_mode()
+def generate_and_parse(model, tokenizer, inputs, batch_size=16, max_new_tokens=8):
+    """What the evaluation notebook does: padded batches in file order, generate, decode, split"""
+    tokenizer.padding_side = 'left'
+    predictions = []
+    for start in range(0, len(inputs), batch_size):
+        prompts = [ALPACA_PROMPT.format(INSTRUCTION, text) for text in inputs[start:start + batch_size]]
+        batch = tokenizer(prompts, return_tensors='pt', padding=True, truncation=True, max_length=2048)
+        outputs = model.generate(**batch, max_new_tokens=max_new_tokens, do_sample=False, pad_token_id=tokenizer.pad_token_id)
+        for text in tokenizer.batch_decode(outputs, skip_special_tokens=True):
+            predictions.append(text.split('### Response:')[1].strip() if '### Response:' in text else '')
+    return predictions
+
+
+def main(n_prompts=512):
+    torch.set_num_threads(1)
+    inputs = make_inputs(n_prompts)
+    model, tokenizer = make_tiny_model([ALPACA_PROMPT.format(INSTRUCTION, text) for text in inputs] + ['bullish bearish'] * 100)
+
+    start = time.perf_counter()
+    generate_and_parse(model, tokenizer, inputs)
+    generate_time = time.perf_counter() - start
+    print(f"generate + parse: {generate_time:.2f}s ({n_prompts / generate_time:.0f} prompts/s)")
+
+    scorer = LabelScorer(model, tokenizer)
+    start = time.perf_counter()
+    probabilities = scorer.predict_proba(inputs)
+    score_time = time.perf_counter() - start
+    padding = 1 - scorer.padding_stats['tokens'] / scorer.padding_stats['padded_tokens']
+    print(f"label scoring:    {score_time:.2f}s ({n_prompts / score_time:.0f} prompts/s), "
+          f"{'single' if scorer.single_token else 'multi'}-token labels, padding {padding:.1%}, speedup {generate_time / score_time:.1f}x")
+    print(f"P(bullish) range {probabilities[:, 1].min():.3f}-{probabilities[:, 1].max():.3f}")
+
+
+if __name__ == '__main__':
+    main()
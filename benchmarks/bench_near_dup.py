@@ -0,0 +1,85 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from Imports.near_dup import NearDuplicateIndex
+
+
+def make_articles(rng, vocabulary, n, start, words=55):
+    """Synthetic articles of random words, with urls numbered from start"""
+    tokens = vocabulary[rng.integers(0, len(vocabulary), size=(n, words))]
+    return pd.DataFrame({
+        'url': [f'https://example.com/articleshow/{i}.cms' for i in range(start, start + n)],
+        'title': [' '.join(row[:10]) for row in tokens],
+        'content': [' '.join(row[10:]) for row in tokens],
+    })
+
+
+def syndicate(rng, articles, edits=1):
+    """Copies of the articles with a few words replaced, as a second outlet would publish them"""
+    copies = articles.copy()
+    copies['url'] = copies['url'] + '?syndicated'
+    contents = []
+    for content in copies['content']:
+        words = content.split()
+        for position in rng.integers(0, len(words), size=edits):
+            words[position] = 'edited'
+        contents.append(' '.join(words))
+    copies['content'] = contents
+    return copies
+
+
+def main(n_articles=1_000_000, batch_size=50_000, duplicate_rate=0.05, threshold=0.8):
+    rng = np.random.default_rng(0)
+    vocabulary = np.array([f'w{i}' for i in range(20_000)], dtype=object)
+    root = tempfile.mkdtemp(prefix='near_dup_')
+    try:
+        index = NearDuplicateIndex(root, threshold=threshold)
+        print(f"threshold {threshold}: {index.bands} bands x {index.rows} rows of {index.num_perm} permutations")
+
+        found = injected = false_positives = 0
+        total_seconds = 0.0
+        previous = None
+        for start in range(0, n_articles, batch_size):
+            size = min(batch_size, n_articles - start)
+            originals = make_articles(rng, vocabulary, size, start)
+            batch = originals
+            n_copies = 0
+            # Each scrape repeats some stories of the previous, already archived, scrape with small edits
+            if previous is not None:
+                n_copies = int(size * duplicate_rate)
+                copies = syndicate(rng, previous.sample(n_copies, random_state=start))
+                batch = pd.concat([originals, copies], ignore_index=True)
+            previous = originals
+
+            begin = time.perf_counter()
+            kept = index.drop_near_duplicates(batch)
+            elapsed = time.perf_counter() - begin
+            total_seconds += elapsed
+
+            kept_copies = kept['url'].str.endswith('?syndicated').sum()
+            found += n_copies - kept_copies
+            injected += n_copies
+            false_positives += size - (len(kept) - kept_copies)
+            print(f"archive {len(index.keys) - len(kept):>9,} + batch {len(batch):>7,}: {elapsed:.2f}s ({len(batch) / elapsed:,.0f} articles/s)")
+
+        print(f"{n_articles:,} articles in {total_seconds:.1f}s, {n_articles / total_seconds:,.0f} articles/s")
+        print(f"syndicated copies caught {found:,}/{injected:,}, originals wrongly dropped {false_positives:,}")
+
+        begin = time.perf_counter()
+        index.save()
+        saved = time.perf_counter() - begin
+        begin = time.perf_counter()
+        reloaded = NearDuplicateIndex(root)
+        print(f"save {saved:.2f}s, load {time.perf_counter() - begin:.2f}s ({len(reloaded.keys):,} articles)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
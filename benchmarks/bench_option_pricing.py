@@ -0,0 +1,111 @@
+import sys
+import os
+import math
+import time
+import numpy as np
+import pandas as pd
+from scipy.optimize import brentq
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from Imports.option_pricing import bs_price, bs_greeks, implied_volatility, price_option_chain
+
+
+def scalar_price(S, K, T, r, sigma, is_call):
+    """Textbook one-option Black-Scholes, kept as the reference"""
+    cdf = lambda x: 0.5 * (1 + math.erf(x / math.sqrt(2)))
+    d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
+    d2 = d1 - sigma * math.sqrt(T)
+    if is_call:
+        return S * cdf(d1) - K * math.exp(-r * T) * cdf(d2)
+    return K * math.exp(-r * T) * cdf(-d2) - S * cdf(-d1)
+
+
+def scalar_greeks(S, K, T, r, sigma, is_call):
+    cdf = lambda x: 0.5 * (1 + math.erf(x / math.sqrt(2)))
+    pdf = lambda x: math.exp(-0.5 * x * x) / math.sqrt(2 * math.pi)
+    d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
+    d2 = d1 - sigma * math.sqrt(T)
+    decay = -S * pdf(d1) * sigma / (2 * math.sqrt(T))
+    if is_call:
+        delta, theta = cdf(d1), decay - r * K * math.exp(-r * T) * cdf(d2)
+    else:
+        delta, theta = cdf(d1) - 1, decay + r * K * math.exp(-r * T) * cdf(-d2)
+    return {'Delta': delta, 'Gamma': pdf(d1) / (S * sigma * math.sqrt(T)), 'Theta': theta / 365, 'Vega': S * pdf(d1) * math.sqrt(T) / 100}
+
+
+def scalar_iv(price, S, K, T, r, is_call):
+    try:
+        return brentq(lambda sigma: scalar_price(S, K, T, r, sigma, is_call) - price, 1e-4, 5.0, xtol=1e-12)
+    except ValueError:
+        return float('nan')
+
+
+def make_contracts(n, seed=0, spot=22000.0):
+    """Random strikes/expiries/vols around a NIFTY-like spot, priced with Black-Scholes"""
+    rng = np.random.default_rng(seed)
+    K = spot * rng.uniform(0.6, 1.4, n)
+    T = rng.uniform(1 / 365, 1.0, n)
+    sigma = rng.uniform(0.05, 1.2, n)
+    is_call = rng.random(n) < 0.5
+    return np.full(n, spot), K, T, sigma, is_call
+
+
+def make_chain(n_strikes, spot=22000.0, r=0.065, seed=0):
+    """A reshaped option chain (GetFinData layout) with prices from a volatility smile"""
+    rng = np.random.default_rng(seed)
+    strikes = np.round(spot * np.linspace(0.5, 1.5, n_strikes) / 0.05) * 0.05
+    expiry_dates = np.array(['29-Aug-2024', '26-Sep-2024', '31-Oct-2024'])
+    expiries = expiry_dates[np.arange(n_strikes) % 3]
+    T = ((pd.to_datetime(expiries, format='%d-%b-%Y') + pd.Timedelta(hours=15, minutes=30) - pd.Timestamp('2024-08-02 10:00')).total_seconds() / (365 * 24 * 3600)).to_numpy()
+    smile = 0.15 + 0.3 * np.log(strikes / spot) ** 2
+    frames = []
+    for option_type, is_call in (('call', True), ('put', False)):
+        prices = bs_price(spot, strikes, T, r, smile, is_call)
+        frames.append(pd.DataFrame({
+            'Date': '02-Aug-2024 10:00:00', 'Ticker': 'NIFTY', 'Option Type': option_type, 'Strike Price': strikes,
+            'Expiry Date': expiries, 'Option Close Price': prices.round(2), 'Implied Volatility': (smile * 100).round(2),
+            'Open Interest': rng.integers(0, 10000, n_strikes), 'Volume': rng.integers(0, 1000, n_strikes),
+            'Delta': None, 'Gamma': None, 'Theta': None, 'Vega': None,
+        }))
+    return pd.concat(frames).sort_index(kind='stable').reset_index(drop=True), smile
+
+
+def main(n_reference=2000, n_contracts=100_000, r=0.065):
+    S, K, T, sigma, is_call = make_contracts(n_reference)
+    prices = bs_price(S, K, T, r, sigma, is_call)
+    greeks = bs_greeks(S, K, T, r, sigma, is_call)
+    solved = implied_volatility(prices, S, K, T, r, is_call)
+    start = time.perf_counter()
+    reference_iv = np.array([scalar_iv(p, s, k, t, r, c) for p, s, k, t, c in zip(prices, S, K, T, is_call)])
+    reference_time = time.perf_counter() - start
+    price_error = max(abs(p - scalar_price(s, k, t, r, v, c)) for p, s, k, t, v, c in zip(prices, S, K, T, sigma, is_call))
+    greek_error = max(abs(greeks[g][i] - scalar_greeks(S[i], K[i], T[i], r, sigma[i], is_call[i])[g]) for g in greeks for i in range(n_reference))
+    # brentq returns something even where the price carries no volatility information, compare where both solve
+    both = np.isfinite(reference_iv) & np.isfinite(solved)
+    print(f"vs scalar reference on {n_reference:,} options: price {price_error:.2e}, greeks {greek_error:.2e}, "
+          f"IV {np.abs(solved[both] - reference_iv[both]).max():.2e} ({both.sum()} solved by both, "
+          f"{np.isfinite(reference_iv).sum()} by brentq, {np.isfinite(solved).sum()} vectorized)")
+
+    S, K, T, sigma, is_call = make_contracts(n_contracts, seed=1)
+    prices = bs_price(S, K, T, r, sigma, is_call)
+    start = time.perf_counter()
+    bs_greeks(S, K, T, r, sigma, is_call)
+    greeks_time = time.perf_counter() - start
+    start = time.perf_counter()
+    solved = implied_volatility(prices, S, K, T, r, is_call)
+    iv_time = time.perf_counter() - start
+    print(f"{n_contracts:,} contracts: greeks {greeks_time * 1000:.0f}ms, implied volatility {iv_time * 1000:.0f}ms "
+          f"(scalar brentq would take ~{reference_time / n_reference * n_contracts:.0f}s), "
+          f"{np.isfinite(solved).mean():.1%} solved")
+
+    chain, smile = make_chain(n_contracts // 2)
+    start = time.perf_counter()
+    priced = price_option_chain(chain, r)
+    chain_time = time.perf_counter() - start
+    recovered = priced['Model Implied Volatility'].to_numpy() / 100 - np.repeat(smile, 2)
+    print(f"option chain of {len(chain):,} rows priced in {chain_time * 1000:.0f}ms, "
+          f"median smile error {np.nanmedian(np.abs(recovered)):.2e}, greeks missing {priced['Delta'].isna().mean():.1%}")
+
+
+if __name__ == '__main__':
+    main()
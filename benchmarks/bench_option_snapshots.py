@@ -0,0 +1,87 @@
+import sys
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from Imports import GetFinData
+from Imports.option_snapshots import OptionSnapshotStore, OptionChainPoller, ReplayFeed
+from synthetic import make_option_chain
+
+
+def record_chains(n_polls, n_strikes=600, symbol='NIFTY', seed=0, trade_fraction=0.1, oi_fraction=0.03, interval=5):
+    """A session of polled raw chains where a small share of strikes trade between polls"""
+    rng = np.random.default_rng(seed)
+    chain = make_option_chain(n_strikes, symbol=symbol, seed=seed)
+    chain['CALLS_Volume'] = chain['PUTS_Volume'] = 0
+    start = pd.Timestamp('2024-08-02 09:15:00')
+    chains = []
+    for poll in range(n_polls):
+        chain = chain.copy()
+        chain['Fetch_Time'] = (start + pd.Timedelta(seconds=poll * interval)).strftime('%d-%b-%Y %H:%M:%S')
+        for side in ('CALLS', 'PUTS'):
+            traded = rng.random(n_strikes) < trade_fraction
+            moves = rng.normal(0, 0.01, traded.sum())
+            chain.loc[traded, f'{side}_LTP'] = (chain.loc[traded, f'{side}_LTP'] * (1 + moves)).round(2).clip(lower=0.05)
+            chain.loc[traded, f'{side}_IV'] = (chain.loc[traded, f'{side}_IV'] + 50 * moves).round(2).clip(lower=1)
+            chain.loc[traded, f'{side}_Volume'] += rng.integers(1, 500, traded.sum())
+            oi = rng.random(n_strikes) < oi_fraction
+            chain.loc[oi, f'{side}_OI'] += rng.integers(-200, 200, oi.sum())
+        chains.append(chain)
+    return chains
+
+
+def sorted_values(df):
+    df = df.assign(**{'Strike Price': df['Strike Price'].astype(float)})
+    df = df.sort_values(OptionSnapshotStore.KEY_COLUMNS).reset_index(drop=True)
+    return df[OptionSnapshotStore.KEY_COLUMNS + OptionSnapshotStore.VALUE_COLUMNS[:4]].astype({col: float for col in OptionSnapshotStore.VALUE_COLUMNS[:4]})
+
+
+def main(n_symbols=10, n_polls=240, n_strikes=600, keyframe_every=60, n_checks=50):
+    symbols = [f'SYM{i:02d}' for i in range(n_symbols)]
+    recorded = {symbol: record_chains(n_polls, n_strikes, symbol, seed=i) for i, symbol in enumerate(symbols)}
+    fin_data = GetFinData({}, '2024-01-01', '2024-12-31')
+
+    # Baseline: the full reshaped chain saved as CSV on every poll
+    full_bytes = sum(len(fin_data.reshape_options_data(chain).to_csv(index=False).encode()) for chain in recorded[symbols[0]]) * n_symbols
+
+    root = tempfile.mkdtemp()
+    try:
+        store = OptionSnapshotStore(root, keyframe_every=keyframe_every)
+        poller = OptionChainPoller(symbols, store, interval=0, max_workers=8, feed=ReplayFeed(recorded))
+        start = time.perf_counter()
+        poller.run(n_polls=n_polls)
+        poll_time = time.perf_counter() - start
+        log_bytes = store.stats['bytes_written']
+        print(f"{n_symbols} symbols x {n_polls} polls x {2 * n_strikes} contracts logged in {poll_time:.2f}s "
+              f"({poll_time / (n_symbols * n_polls) * 1000:.1f}ms per snapshot)")
+        print(f"full CSV per poll: {full_bytes / 2 ** 20:.1f} MiB, delta log: {log_bytes / 2 ** 20:.2f} MiB "
+              f"({full_bytes / log_bytes:.0f}x smaller, {store.stats['keyframes']} keyframes, "
+              f"{store.stats['cells_written'] / (n_symbols * n_polls):.0f} cells per snapshot)")
+
+        # Reopen the store as after a restart and check random snapshots against the recorded chains
+        store = OptionSnapshotStore(root, keyframe_every=keyframe_every)
+        rng = np.random.default_rng(1)
+        times = []
+        for _ in range(n_checks):
+            symbol, seq = symbols[rng.integers(n_symbols)], int(rng.integers(n_polls))
+            start = time.perf_counter()
+            snapshot = store.snapshot(symbol, seq)
+            times.append(time.perf_counter() - start)
+            expected = fin_data.reshape_options_data(recorded[symbol][seq])
+            pd.testing.assert_frame_equal(sorted_values(snapshot), sorted_values(expected))
+            assert snapshot['Date'].iloc[0] == expected['Date'].iloc[0]
+        print(f"{n_checks} random snapshots rebuilt and matched, {np.mean(times) * 1000:.1f}ms each on average")
+
+        start = time.perf_counter()
+        history = store.history(symbols[0])
+        print(f"IV/OI history of {symbols[0]}: {len(history):,} rows in {time.perf_counter() - start:.2f}s")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
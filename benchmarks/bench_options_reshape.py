@@ -0,0 +1,55 @@
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from Imports import GetFinData
+from synthetic import make_option_chain
+
+
+def reshape_rowwise(options_data):
+    """The original record-by-record reshape, kept as the reference"""
+    records = []
+    for i in range(len(options_data)):
+        for prefix, option_type in (('CALLS', 'call'), ('PUTS', 'put')):
+            records.append({
+                'Date': options_data.at[i, 'Fetch_Time'],
+                'Ticker': options_data.at[i, 'Symbol'],
+                'Option Type': option_type,
+                'Strike Price': options_data.at[i, 'Strike_Price'],
+                'Expiry Date': options_data.at[i, 'Expiry_Date'],
+                'Option Close Price': options_data.at[i, f'{prefix}_LTP'],
+                'Implied Volatility': options_data.at[i, f'{prefix}_IV'],
+                'Open Interest': options_data.at[i, f'{prefix}_OI'],
+                'Volume': options_data.at[i, f'{prefix}_Volume'],
+                'Delta': options_data.at[i, f'{prefix}_Delta'] if f'{prefix}_Delta' in options_data.columns else None,
+                'Gamma': options_data.at[i, f'{prefix}_Gamma'] if f'{prefix}_Gamma' in options_data.columns else None,
+                'Theta': options_data.at[i, f'{prefix}_Theta'] if f'{prefix}_Theta' in options_data.columns else None,
+                'Vega': options_data.at[i, f'{prefix}_Vega'] if f'{prefix}_Vega' in options_data.columns else None
+            })
+    return pd.DataFrame(records)
+
+
+def main(sizes=(1000, 10000, 100000), rowwise_limit=10000):
+    fin_data = GetFinData({}, '2024-01-01', '2024-12-31')
+    for n_strikes in sizes:
+        chain = make_option_chain(n_strikes)
+
+        start = time.perf_counter()
+        vectorized = fin_data.reshape_options_data(chain)
+        vectorized_time = time.perf_counter() - start
+
+        if n_strikes <= rowwise_limit:
+            start = time.perf_counter()
+            rowwise = reshape_rowwise(chain)
+            rowwise_time = time.perf_counter() - start
+            pd.testing.assert_frame_equal(rowwise, vectorized)
+            print(f"{n_strikes:>7} strikes: rowwise {rowwise_time:.3f}s, vectorized {vectorized_time:.3f}s, speedup {rowwise_time / vectorized_time:.1f}x")
+        else:
+            print(f"{n_strikes:>7} strikes: vectorized {vectorized_time:.3f}s (rowwise skipped)")
+
+
+if __name__ == '__main__':
+    main()
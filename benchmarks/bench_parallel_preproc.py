@@ -0,0 +1,61 @@
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from Imports import PreprocessData, ParallelPreprocessData, FeatureEngine
+import synthetic
+
+
+def with_gaps(df, fraction=0.02, seed=0):
+    """Knock holes into the market columns, including the first rows, so shards start with gaps to carry over"""
+    rng = np.random.default_rng(seed)
+    df = df.copy()
+    for col in df.columns:
+        if col in ('Ticker', 'Symbol', 'SYMBOL'):
+            continue
+        missing = rng.random(len(df)) < fraction
+        missing[:2] = True
+        df.loc[missing, col] = np.nan
+    return df
+
+
+def timed_run(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main(scale=20, workers=None):
+    data = synthetic.scaled_datasets(scale)
+    frames = [with_gaps(data['stock'], seed=1), with_gaps(data['index'], seed=2), with_gaps(data['etf'], seed=3), data['news']]
+    rows = sum(len(df) for df in frames[:3])
+    cpus = os.cpu_count() or 1
+    workers = workers or sorted({2, 4, cpus} - {1}) or [2]
+    print(f"{rows:,} market rows at {scale}x, {cpus} CPU(s)")
+
+    serial, serial_time = timed_run(lambda: PreprocessData(*[df.copy() for df in frames]).preprocess())
+    # The index frame holds one series per contract, the largest feature computation
+    engine = FeatureEngine(['Ticker', 'EXPIRY_DT'])
+    features, features_time = timed_run(lambda: engine.compute(frames[1].copy()))
+    print(f"{'serial':<12} preprocess {serial_time:6.2f}s   features {features_time:6.2f}s")
+
+    for n in workers:
+        preproc = ParallelPreprocessData(*[df.copy() for df in frames], max_workers=n)
+        result, parallel_time = timed_run(preproc.preprocess)
+        for expected, actual in zip(serial, result):
+            pd.testing.assert_frame_equal(expected, actual)
+        parallel_engine = FeatureEngine(['Ticker', 'EXPIRY_DT'])
+        parallel_features, parallel_features_time = timed_run(lambda: preproc.compute_features(frames[1].copy(), parallel_engine))
+        pd.testing.assert_frame_equal(features, parallel_features)
+        assert [str(key) for key in engine.states] == [str(key) for key in parallel_engine.states]
+        print(f"{n:>2} workers   preprocess {parallel_time:6.2f}s ({serial_time / parallel_time:.2f}x)   "
+              f"features {parallel_features_time:6.2f}s ({features_time / parallel_features_time:.2f}x)   identical")
+    if cpus == 1:
+        print("One CPU: the workers share it, the timings only show the sharding overhead")
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,109 @@
+import sys
+import os
+import multiprocessing
+import shutil
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from Imports import SeriesStore
+
+COLUMNS = ['OpenPrice', 'HighPrice', 'LowPrice', 'ClosePrice', 'TotalTradedQuantity', 'SMA_7', 'SMA_30', 'RSI', 'MACD', 'Volatility']
+
+
+def make_history(n_tickers, n_days, seed=0):
+    """Daily bars in the price_volume layout with a few indicator columns, tickers interleaved by date as NSE returns them"""
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range('2014-01-01', periods=n_days)
+    df = pd.DataFrame({
+        'Ticker': np.tile([f'SYM{i:04d}' for i in range(n_tickers)], n_days),
+        'Date': np.repeat(days.strftime('%d-%b-%Y'), n_tickers),
+    })
+    for col in COLUMNS:
+        df[col] = rng.normal(100, 10, len(df)).round(2)
+    return df
+
+
+def mask_window(df, dates, ticker, date, length):
+    """What a sample generator does today: boolean masks over the whole frame"""
+    return df.loc[(df['Ticker'] == ticker) & (dates <= date), COLUMNS].tail(length).to_numpy()
+
+
+def mapping_usage(path):
+    """Rss and Pss in KiB of this process's mapping of path, from /proc/self/smaps"""
+    usage, inside = {'Rss': 0, 'Pss': 0}, False
+    with open('/proc/self/smaps') as f:
+        for line in f:
+            fields = line.split()
+            if '-' in fields[0] and ':' not in fields[0]:
+                inside = line.rstrip().endswith(path)
+            elif inside and fields[0][:-1] in usage:
+                usage[fields[0][:-1]] += int(fields[1])
+    return usage
+
+
+def touch_and_report(store, barrier, results):
+    store.open()
+    # Read every page of the values, as a worker scanning all windows would
+    total = float(np.nansum(store.arrays['values']))
+    barrier.wait()
+    results.put((os.getpid(), mapping_usage(os.path.join(os.path.abspath(store.root), 'values.npy')), total))
+    barrier.wait()
+
+
+def main(n_tickers=200, n_days=2500, n_lookups=2000, length=30, n_workers=4):
+    df = make_history(n_tickers, n_days)
+    root = tempfile.mkdtemp()
+    try:
+        store = SeriesStore(root)
+        start = time.perf_counter()
+        rows = store.write(df, columns=COLUMNS)
+        size = os.path.getsize(os.path.join(root, 'values.npy')) / 2 ** 20
+        print(f"{rows:,} rows of {n_tickers} tickers written in {time.perf_counter() - start:.2f}s, values.npy {size:.1f} MiB")
+
+        rng = np.random.default_rng(1)
+        samples = [(f'SYM{rng.integers(n_tickers):04d}', pd.Timestamp('2014-01-01') + pd.Timedelta(days=int(rng.integers(0, n_days * 7 // 5))))
+                   for _ in range(n_lookups)]
+        dates = pd.to_datetime(df['Date'], format='%d-%b-%Y')
+        for ticker, date in samples[:100]:
+            np.testing.assert_array_equal(mask_window(df, dates, ticker, date, length), store.window(ticker, date, length))
+
+        results = {}
+        for name, lookup in [('boolean masks', lambda ticker, date: mask_window(df, dates, ticker, date, length)),
+                             ('SeriesStore.window', lambda ticker, date: store.window(ticker, date, length))]:
+            start = time.perf_counter()
+            for ticker, date in samples:
+                lookup(ticker, date)
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()
+            for ticker, date in samples[:200]:
+                lookup(ticker, date)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[name] = elapsed
+            print(f"{name:<20} {elapsed / n_lookups * 1e6:9.1f}µs per {length}-bar window, peak {peak / 2 ** 20:.2f} MiB over 200 lookups")
+        print(f"speedup {results['boolean masks'] / results['SeriesStore.window']:.0f}x")
+
+        # Workers map the same file: each is charged its share (Pss) of the pages, not a copy (Rss)
+        store.close()
+        context = multiprocessing.get_context('spawn')
+        barrier, queue = context.Barrier(n_workers), context.Queue()
+        workers = [context.Process(target=touch_and_report, args=(SeriesStore(root), barrier, queue)) for _ in range(n_workers)]
+        for worker in workers:
+            worker.start()
+        reports = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        for pid, usage, _ in reports:
+            print(f"worker {pid}: values.npy Rss {usage['Rss'] / 1024:.1f} MiB, Pss {usage['Pss'] / 1024:.1f} MiB")
+        total_pss = sum(usage['Pss'] for _, usage, _ in reports) / 1024
+        print(f"{n_workers} workers together hold {total_pss:.1f} MiB of a {size:.1f} MiB store")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+import argparse
+import functools
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+from Imports import PreprocessData
+from Imports.features import parse_bar_dates
+from Imports.news_dates import normalize_news_dates
+from Imports.html_extract import extract_et_article, extract_yahoo_article, extract_et_listing_links
+import synthetic
+from synthetic import make_option_chain
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+BASELINES = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+
+@functools.lru_cache(maxsize=1)
+def scaled_datasets(scale):
+    """Cases run scale by scale, so each scale's frames are generated once"""
+    return synthetic.scaled_datasets(scale)
+
+
+def fin_data_module():
+    """Imports.module for the GetFinData cases. They never reach NSE, so where nselib is not installed a bare
+    stand-in is put in its place and the suite still runs offline"""
+    try:
+        import nselib  # noqa: F401
+    except ImportError:
+        nselib = types.ModuleType('nselib')
+        nselib.capital_market = types.ModuleType('nselib.capital_market')
+        nselib.derivatives = types.ModuleType('nselib.derivatives')
+        sys.modules.update({'nselib': nselib, 'nselib.capital_market': nselib.capital_market, 'nselib.derivatives': nselib.derivatives})
+    import Imports.module as module
+    return module
+
+
+class StubDerivatives:
+    """Replaces nselib.derivatives in Imports.module so get_options_data runs offline"""
+    def __init__(self, chain):
+        self.chain = chain
+
+    def nse_live_option_chain(self, symbol):
+        return self.chain.copy()
+
+
+def case_get_options_data(scale):
+    chain = make_option_chain(1000 * scale)
+    module = fin_data_module()
+    fin_data = module.GetFinData({}, '2024-01-01', '2024-12-31')
+
+    def run():
+        real, module.derivatives = module.derivatives, StubDerivatives(chain)
+        try:
+            return len(fin_data.get_options_data('NIFTY'))
+        finally:
+            module.derivatives = real
+    return run
+
+
+def case_reshape_options_data(scale):
+    chain = make_option_chain(1000 * scale)
+    fin_data = fin_data_module().GetFinData({}, '2024-01-01', '2024-12-31')
+    return lambda: len(fin_data.reshape_options_data(chain))
+
+
+def case_preprocess(scale):
+    data = scaled_datasets(scale)
+
+    def run():
+        # preprocess works in place, every run starts from fresh copies
+        preproc = PreprocessData(data['stock'].copy(), data['index'].copy(), data['etf'].copy(), data['news'].copy())
+        stock, index, etf, news = preproc.preprocess()
+        return len(stock) + len(index) + len(etf) + len(news)
+    return run
+
+
+def case_standardize_data(scale):
+    data = scaled_datasets(scale)
+
+    def run():
+        preproc = PreprocessData(data['stock'].copy(), data['index'].copy(), data['etf'].copy(), data['news'])
+        preproc.standardize_data()
+        return len(preproc.stock_data) + len(preproc.index_data) + len(preproc.etf_data)
+    return run
+
+
+def case_remove_commas(scale):
+    etf = scaled_datasets(scale)['etf']
+    columns = ['TotalTradedQuantity', 'TurnoverInRs', 'No.ofTrades', 'DeliverableQty']
+    preproc = PreprocessData(pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame())
+    return lambda: len(preproc.remove_commas_and_convert_to_float(etf[columns].copy(), columns))
+
+
+def case_news_dates(scale):
+    dates = scaled_datasets(scale)['news']['date']
+    return lambda: len(normalize_news_dates(dates)[0])
+
+
+def case_bar_dates(scale):
+    dates = scaled_datasets(scale)['index']['TIMESTAMP']
+    return lambda: len(parse_bar_dates(dates))
+
+
+def case_preprocess_date(scale):
+    """The row-by-row news date parser that PreprocessData still exposes"""
+    dates = scaled_datasets(scale)['news']['date'].tolist()
+    preproc = PreprocessData(pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame())
+    return lambda: sum(preproc.preprocess_date(date) is not None for date in dates)
+
+
+def case_html_extract(scale):
+    pages = {}
+    for name in ('et_article', 'yahoo_article', 'et_listing'):
+        with open(os.path.join(FIXTURES, f'{name}.html'), 'r', encoding='utf-8') as f:
+            pages[name] = f.read()
+    n_pages = 2 * scale
+
+    def run():
+        records = 0
+        for _ in range(n_pages):
+            records += extract_et_article(pages['et_article'], 'url', 'TICKER') is not None
+            records += extract_yahoo_article(pages['yahoo_article'], 'url', 'TICKER') is not None
+            records += len(extract_et_listing_links(pages['et_listing']))
+        return records
+    return run
+
+
+# name -> factory(scale) returning the callable that is timed; scale 1 is the size of Datasets/
+CASES = {
+    'get_options_data': case_get_options_data,
+    'reshape_options_data': case_reshape_options_data,
+    'preprocess': case_preprocess,
+    'standardize_data': case_standardize_data,
+    'remove_commas_and_convert_to_float': case_remove_commas,
+    'normalize_news_dates': case_news_dates,
+    'parse_bar_dates': case_bar_dates,
+    'preprocess_date': case_preprocess_date,
+    'html_extract': case_html_extract,
+}
+
+
+def measure(run, repeat):
+    """Best and median wall time over repeat runs, then the peak traced memory of one more run"""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': min(times), 'median_seconds': float(np.median(times)), 'peak_mib': peak / 2 ** 20, 'result': result, 'repeat': repeat}
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(), 'platform': platform.platform(),
+            'commit': commit, 'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def run_suite(cases=None, scales=(1, 10, 100), repeat=5):
+    results = {}
+    for scale in scales:
+        for name in cases or CASES:
+            run = CASES[name](scale)
+            # Large inputs take long enough that one timed run is representative
+            result = measure(run, repeat if scale < 100 else 1)
+            results[f'{name}@{scale}x'] = result
+            print(f"{name}@{scale}x: {result['seconds'] * 1000:.1f}ms, peak {result['peak_mib']:.1f} MiB")
+    return {'environment': environment(), 'results': results}
+
+
+def compare(current, baseline, time_threshold=1.25, memory_threshold=1.25, min_seconds=0.025):
+    """Print every case against the baseline and return the ones that got slower or bigger beyond the thresholds.
+    Slowdowns of less than min_seconds are scheduler noise on the 1x cases and are not flagged"""
+    regressions = []
+    for key, result in current['results'].items():
+        reference = baseline['results'].get(key)
+        if reference is None:
+            print(f"{key}: no baseline")
+            continue
+        time_ratio = result['seconds'] / reference['seconds'] if reference['seconds'] else float('inf')
+        memory_ratio = result['peak_mib'] / reference['peak_mib'] if reference['peak_mib'] else 1.0
+        flags = []
+        if time_ratio > time_threshold and result['seconds'] - reference['seconds'] > min_seconds:
+            flags.append('SLOWER')
+        if memory_ratio > memory_threshold:
+            flags.append('MORE MEMORY')
+        if result['result'] != reference.get('result'):
+            flags.append('DIFFERENT RESULT')
+        print(f"{key}: time {time_ratio:.2f}x, memory {memory_ratio:.2f}x {' '.join(flags)}")
+        if flags:
+            regressions.append({'case': key, 'time_ratio': time_ratio, 'memory_ratio': memory_ratio, 'flags': flags})
+    if baseline.get('environment', {}).get('platform') != current['environment']['platform']:
+        print("Baseline was recorded on a different platform, ratios are only indicative")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmark suite on Datasets/ scaled by synthetic copies')
+    parser.add_argument('--cases', nargs='*', choices=list(CASES), help='cases to run, all by default')
+    parser.add_argument('--scales', nargs='*', type=int, default=[1, 10, 100], help='dataset multipliers, e.g. 1 10 100 1000')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--save-baseline', action='store_true', help=f'write the results to {os.path.basename(BASELINES)}')
+    parser.add_argument('--compare', nargs='?', const=BASELINES, help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='time and memory ratio counted as a regression')
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.cases, args.scales, args.repeat)
+    for path in [args.output] + ([BASELINES] if args.save_baseline else []):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(current, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold, args.threshold)
+        print(f"{len(regressions)} regression(s)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import os
+import numpy as np
+import pandas as pd
+
+DATASETS = os.path.join(os.path.dirname(__file__), '..', 'Datasets')
+# Price-like columns get a per-copy level shift, quantity-like ones a per-copy volume multiplier
+PRICE_COLUMNS = ['PrevClose', 'OpenPrice', 'HighPrice', 'LowPrice', 'LastPrice', 'ClosePrice', 'AveragePrice',
+                 'STRIKE_PRICE', 'OPENING_PRICE', 'TRADE_HIGH_PRICE', 'TRADE_LOW_PRICE', 'CLOSING_PRICE',
+                 'LAST_TRADED_PRICE', 'PREV_CLS', 'SETTLE_PRICE', 'UNDERLYING_VALUE']
+QUANTITY_COLUMNS = ['TotalTradedQuantity', 'TurnoverInRs', 'No.ofTrades', 'DeliverableQty',
+                    'TOT_TRADED_QTY', 'TOT_TRADED_VAL', 'OPEN_INT', 'CHANGE_IN_OI']
+
+
+def load_datasets():
+    """The Datasets/ files as NSE and the scrapers wrote them, numbers still in Indian format"""
+    return {
+        'etf': pd.read_csv(os.path.join(DATASETS, 'etf_data.csv')),
+        'index': pd.read_csv(os.path.join(DATASETS, 'index_options_data.csv')),
+        'news': pd.read_csv(os.path.join(DATASETS, 'et_news_data.csv')),
+    }
+
+
+def indian_format(values, decimals=0):
+    """Format numbers with lakh/crore grouping, e.g. 4361927906.66 -> '4,36,19,27,906.66'"""
+    out = []
+    for value in np.asarray(values, dtype=float):
+        text = f'{abs(value):.{decimals}f}'
+        whole, _, fraction = text.partition('.')
+        if len(whole) > 3:
+            head, tail = whole[:-3], whole[-3:]
+            groups = []
+            while len(head) > 2:
+                groups.insert(0, head[-2:])
+                head = head[:-2]
+            whole = ','.join(([head] if head else []) + groups + [tail])
+        out.append(('-' if value < 0 else '') + whole + ('.' + fraction if fraction else ''))
+    return out
+
+
+def copy_suffix(values, copy):
+    return values.astype(str) + f'_{copy:04d}' if copy else values.astype(str)
+
+
+def scale_market(df, factor, seed=0):
+    """factor copies of an NSE market frame under new tickers, with the same schema and number formats.
+    Each copy moves its prices by one random level and its volumes by one random multiplier"""
+    rng = np.random.default_rng(seed)
+    copies = []
+    for copy in range(factor):
+        level, volume = rng.lognormal(0, 0.3), rng.lognormal(0, 0.5)
+        part = df.copy()
+        for col in ('Symbol', 'SYMBOL', 'Ticker'):
+            if col in part.columns:
+                part[col] = copy_suffix(part[col], copy)
+        for col in part.columns:
+            multiplier = level if col in PRICE_COLUMNS else volume if col in QUANTITY_COLUMNS else None
+            if multiplier is None or copy == 0:
+                continue
+            if pd.api.types.is_numeric_dtype(part[col]):
+                scaled = part[col] * multiplier
+                part[col] = scaled.round().astype(part[col].dtype) if pd.api.types.is_integer_dtype(part[col]) else scaled.round(2)
+            else:
+                # Indian-format strings, keep decimals when the source column has them
+                numbers = pd.to_numeric(part[col].astype(str).str.replace(',', '', regex=False), errors='coerce') * multiplier
+                decimals = 2 if part[col].astype(str).str.contains('.', regex=False).any() else 0
+                part[col] = indian_format(numbers.fillna(0), decimals)
+        copies.append(part)
+    df = pd.concat(copies, ignore_index=True)
+    if 'Unnamed: 0' in df.columns:
+        df['Unnamed: 0'] = np.arange(len(df))
+    return df
+
+
+def scale_news(df, factor, seed=0, iso_fraction=0.3):
+    """factor copies of the ET news corpus with distinct urls, and a share of the dates rewritten in
+    the Yahoo ISO layout so both date paths are exercised"""
+    rng = np.random.default_rng(seed)
+    parsed = pd.to_datetime(df['date'].str.replace('Last Updated:', '', regex=False).str.replace('IST', '', regex=False).str.strip(),
+                            format='%b %d, %Y, %I:%M:%S %p', errors='coerce')
+    copies = []
+    for copy in range(factor):
+        part = df.copy()
+        if copy:
+            part['url'] = part['url'] + f'?copy={copy}'
+            shifted = parsed - pd.to_timedelta(rng.integers(0, 365, len(part)), unit='D')
+            iso = rng.random(len(part)) < iso_fraction
+            et_dates = 'Last Updated: ' + shifted.dt.strftime('%b %d, %Y, %I:%M:%S %p') + ' IST'
+            iso_dates = shifted.dt.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+            part['date'] = np.where(iso, iso_dates, et_dates)
+            part.loc[parsed.isna().to_numpy(), 'date'] = df['date']
+        copies.append(part)
+    return pd.concat(copies, ignore_index=True)
+
+
+def stock_from_etf(etf):
+    """The price_volume layout is shared by stocks and ETFs, the ETF file stands in for stock_data"""
+    stock = etf.copy()
+    stock['Asset Type'] = 'Stock'
+    return stock
+
+
+def make_option_chain(n_strikes, symbol='NIFTY', seed=0):
+    """A nse_live_option_chain response with n_strikes rows over three expiries"""
+    rng = np.random.default_rng(seed)
+    strikes = 10000 + 50 * np.arange(n_strikes)
+    expiries = np.array(['29-Aug-2024', '26-Sep-2024', '31-Oct-2024'])
+    return pd.DataFrame({
+        'Fetch_Time': '02-Aug-2024 15:30:00',
+        'Symbol': symbol,
+        'Expiry_Date': expiries[np.arange(n_strikes) % len(expiries)],
+        'CALLS_OI': rng.integers(0, 100000, n_strikes),
+        'CALLS_Volume': rng.integers(0, 50000, n_strikes),
+        'CALLS_IV': rng.uniform(5, 60, n_strikes).round(2),
+        'CALLS_LTP': rng.uniform(0.05, 2000, n_strikes).round(2),
+        'Strike_Price': strikes,
+        'PUTS_LTP': rng.uniform(0.05, 2000, n_strikes).round(2),
+        'PUTS_IV': rng.uniform(5, 60, n_strikes).round(2),
+        'PUTS_Volume': rng.integers(0, 50000, n_strikes),
+        'PUTS_OI': rng.integers(0, 100000, n_strikes),
+    })
+
+
+def scaled_datasets(factor, seed=0):
+    datasets = load_datasets()
+    etf = scale_market(datasets['etf'], factor, seed)
+    return {
+        'stock': stock_from_etf(etf),
+        'index': scale_market(datasets['index'], factor, seed + 1),
+        'etf': etf,
+        'news': scale_news(datasets['news'], factor, seed + 2),
+    }
@@ -0,0 +1,74 @@
+import os
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Imports.module and Imports.option_snapshots import nselib at module level. Tests never reach NSE, they
+# replace capital_market and derivatives with fakes, so a bare stand-in package is enough when it is missing
+try:
+    import nselib  # noqa: F401
+except ImportError:
+    nselib = types.ModuleType('nselib')
+    nselib.capital_market = types.ModuleType('nselib.capital_market')
+    nselib.derivatives = types.ModuleType('nselib.derivatives')
+    sys.modules.update({'nselib': nselib, 'nselib.capital_market': nselib.capital_market, 'nselib.derivatives': nselib.derivatives})
+
+
+class LocalServer:
+    """HTTP server on 127.0.0.1 answering from routes, a dict of path to a function of the request headers
+    returning (status, headers, body). Every request is recorded in hits as (monotonic time, path, headers)"""
+    def __init__(self):
+        self.routes = {}
+        self.hits = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.hits.append((time.monotonic(), self.path, dict(self.headers)))
+                status, headers, body = server.routes[self.path](self.headers)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.host = f'127.0.0.1:{self.httpd.server_port}'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        return f'http://{self.host}{path}'
+
+    def paths(self):
+        return [path for _, path, _ in self.hits]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    """The process-wide METRICS, enabled and empty for the test"""
+    from Imports.metrics import METRICS
+    monkeypatch.setattr(METRICS, 'enabled', True)
+    METRICS.reset()
+    yield METRICS
+    METRICS.reset()
+
+
+@pytest.fixture
+def server():
+    server = LocalServer()
+    yield server
+    server.close()
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+import pytest
+from Imports.backfill import GRID_ORIGIN, date_windows
+
+
+@pytest.mark.parametrize('days', [90, 365])
+@pytest.mark.parametrize('start, end', [('2014-01-01', '2023-12-31'), ('2024-03-29', '2024-06-28'), ('2023-02-10', '2023-02-11')])
+def test_windows_cover_the_range_within_the_limit(days, start, end):
+    start, end = datetime.fromisoformat(start), datetime.fromisoformat(end)
+    windows = date_windows(start, end, days)
+    assert windows[0][0] == start and windows[-1][1] == end
+    for (a, b), (c, _) in zip(windows, windows[1:]):
+        assert c == b + timedelta(days=1)
+    assert all(1 <= (b - a).days < days for a, b in windows)
+
+
+def test_windows_do_not_depend_on_the_start_date():
+    later = date_windows(datetime(2021, 3, 15), datetime(2023, 12, 31), 90)
+    earlier = date_windows(datetime(2019, 7, 2), datetime(2023, 12, 31), 90)
+    assert later[1:] == earlier[-len(later) + 1:]
+
+
+def test_one_day_windows_are_widened():
+    day = datetime(2024, 3, 30)
+    assert date_windows(day, day, 90) == [(day - timedelta(days=1), day)]
+    # Starting on the last day of a block and ending on the first day of another
+    block = GRID_ORIGIN + timedelta(days=90 * 100)
+    windows = date_windows(block - timedelta(days=1), block + timedelta(days=90), 90)
+    assert windows == [(block - timedelta(days=1), block), (block, block + timedelta(days=89)),
+                       (block + timedelta(days=89), block + timedelta(days=90))]
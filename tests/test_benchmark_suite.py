@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+def test_suite_runs_without_nselib(tmp_path):
+    # A fresh interpreter, without the nselib stand-in this test session installs
+    output = tmp_path / 'results.json'
+    completed = subprocess.run([sys.executable, os.path.join(ROOT, 'benchmarks', 'suite.py'), '--cases', 'get_options_data', 'reshape_options_data',
+                                '--scales', '1', '--repeat', '1', '--output', str(output)], capture_output=True, text=True, timeout=300)
+    assert completed.returncode == 0, completed.stderr
+    assert 'get_options_data@1x' in completed.stdout and output.exists()
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+from Imports.dataset_store import DatasetStore
+
+
+def make_bars(ticker, start, days, close=100.0):
+    dates = pd.bdate_range(start, periods=days)
+    return pd.DataFrame({
+        'Symbol': ticker, 'Series': 'EQ', 'Date': dates.strftime('%d-%b-%Y'),
+        'ClosePrice': [f'{close + i:,.2f}' for i in range(days)],
+        'TotalTradedQuantity': [f'{1_000_000 + i:,}' for i in range(days)],
+        'Ticker': ticker,
+    })
+
+
+def test_overlapping_writes_keep_one_row_per_day(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    store.write('hist', make_bars('TCS', '2023-12-18', 20), 'Stock')
+    store.write('hist', make_bars('INFY', '2023-12-18', 20), 'Stock')
+    # A backfill rerun overlapping the last days of the first one, with revised closes
+    assert store.write('hist', make_bars('TCS', '2024-01-08', 10, close=200.0), 'Stock') == 10
+
+    tcs = store.read('hist', tickers=['TCS'])
+    assert len(tcs) == 25 and not tcs.duplicated(['Date']).any()
+    assert tcs['Date'].iloc[0] == '18-Dec-2023'
+    assert tcs.set_index('Date').loc['08-Jan-2024', 'ClosePrice'] == 200.0
+    assert tcs.set_index('Date').loc['05-Jan-2024', 'ClosePrice'] == 114.0
+    assert len(store.read('hist', tickers=['INFY'])) == 20
+
+    # Writing the same rows again changes nothing
+    before = store.read('hist')
+    store.write('hist', make_bars('TCS', '2024-01-08', 10, close=200.0), 'Stock')
+    pd.testing.assert_frame_equal(store.read('hist'), before)
+
+
+def test_partitions_share_one_schema(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    first = make_bars('TCS', '2023-12-25', 10)
+    first['Open Interest'] = np.nan
+    store.write('hist', first, 'Stock')
+    second = make_bars('TCS', '2024-03-01', 5)
+    second['Open Interest'] = 1.5
+    second['Remarks'] = 'ex-dividend'
+    store.write('hist', second, 'Stock')
+
+    df = store.read('hist')
+    assert len(df) == 15
+    assert df['Open Interest'].dtype == np.float64 and df['ClosePrice'].dtype == np.float64
+    assert df['Open Interest'].isna().sum() == 10 and df['Remarks'].notna().sum() == 5
+    assert store.read('hist', columns=['Remarks'], start_date='2024-03-01').shape == (5, 1)
+
+
+def test_news_is_keyed_by_ticker_and_url(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    news = pd.DataFrame({
+        'url': ['https://example.com/a.cms', 'https://example.com/b.cms', 'https://example.com/a.cms'],
+        'title': ['A', 'B', 'A'],
+        'date': ['2024-03-01T09:15:00.000Z'] * 3,
+        'ticker': ['TCS', 'TCS', 'INFY'],
+    })
+    store.write('news', news, 'News')
+    store.write('news', news.iloc[:2].assign(title=['A updated', 'B']), 'News')
+    df = store.read('news')
+    assert len(df) == 3
+    assert sorted(df['title']) == ['A', 'A updated', 'B']
+
+
+def test_news_dates_are_ist_wall_clock(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    news = pd.DataFrame({
+        'url': ['https://economictimes.indiatimes.com/a.cms', 'https://finance.yahoo.com/news/b.html', 'https://example.com/c'],
+        'date': ['Last Updated: Aug 02, 2024, 12:03:00 PM IST', '2024-08-01T20:00:00.000Z', 'yesterday'],
+        'ticker': 'TCS',
+    })
+    store.write('news', news, 'News')
+    df = store.read('news', columns=['url', 'date_key'])
+    assert df['date_key'].tolist()[:2] == [pd.Timestamp('2024-08-02 01:30'), pd.Timestamp('2024-08-02 12:03')]
+    assert df['date_key'].isna().sum() == 1
+    assert store.read('news', start_date='2024-08-02', end_date='2024-08-02 23:59')['url'].tolist() == news['url'][[1, 0]].tolist()
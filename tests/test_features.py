@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from Imports.features import FeatureEngine
+from Imports.parallel_preproc import ParallelPreprocessData
+
+
+def make_bars(tickers=('TCS', 'INFY', 'SBIN', 'ITC'), n_days=250, nan_positions=(), seed=0):
+    """Daily bars of several tickers, interleaved by date as NSE returns them"""
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range('2022-01-03', periods=n_days).strftime('%d-%b-%Y')
+    frames = []
+    for ticker in tickers:
+        close = 100 + np.cumsum(rng.normal(0, 1, n_days))
+        close[list(nan_positions)] = np.nan
+        frames.append(pd.DataFrame({'Ticker': ticker, 'Date': days, 'ClosePrice': close, 'Sentiment': rng.normal(0, 0.5, n_days)}))
+    return pd.concat(frames).sort_values('Date', kind='stable', key=lambda dates: pd.to_datetime(dates, format='%d-%b-%Y')).reset_index(drop=True)
+
+
+def incremental(engine, batch, rows):
+    """Features of the given rows of a batch result from FeatureEngine.update, one bar at a time"""
+    updates = [engine.update(row.Ticker, row.ClosePrice, row.Sentiment) for row in batch.loc[rows].itertuples()]
+    return pd.DataFrame(updates, index=rows)
+
+
+def assert_features_equal(batch, updates, columns=FeatureEngine.FEATURE_COLUMNS):
+    for col in columns:
+        np.testing.assert_allclose(updates[col].to_numpy(float), batch.loc[updates.index, col].to_numpy(float),
+                                   rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=col)
+
+
+@pytest.mark.parametrize('warm_days', [0, 40, 180])
+def test_update_matches_compute(warm_days):
+    bars = make_bars()
+    batch = FeatureEngine().compute(bars)
+    engine = FeatureEngine()
+    history = batch.groupby('Ticker').head(warm_days).index
+    if warm_days:
+        engine.compute(batch.loc[history, bars.columns])
+    rows = batch.index.difference(history)
+    assert_features_equal(batch, incremental(engine, batch, rows))
+
+
+def test_running_windows_skip_missing_closes_like_rolling():
+    bars = make_bars(nan_positions=(12, 13, 70, 150, 151, 152))
+    batch = FeatureEngine().compute(bars)
+    engine = FeatureEngine()
+    history = batch.groupby('Ticker').head(60).index
+    engine.compute(batch.loc[history, bars.columns])
+    updates = incremental(engine, batch, batch.index.difference(history))
+    assert updates['SMA_30'].isna().any() and updates['SMA_30'].notna().any()
+    assert_features_equal(batch, updates)
+
+
+@pytest.mark.parametrize('warm_days', [0, 2, 61])
+def test_macd_carries_over_missing_closes_like_ewm(warm_days):
+    # Leading gaps, a gap at the end of the warm history and a long gap later on
+    bars = make_bars(nan_positions=(0, 1, 59, 60, 100, 101, 102, 103, 104, 200))
+    batch = FeatureEngine().compute(bars)
+    engine = FeatureEngine()
+    history = batch.groupby('Ticker').head(warm_days).index
+    if warm_days:
+        engine.compute(batch.loc[history, bars.columns])
+    updates = incremental(engine, batch, batch.index.difference(history))
+    assert updates['MACD'].iloc[-50:].notna().all()
+    assert_features_equal(batch, updates, ['MACD', 'MACD_Signal'])
+
+
+def test_parallel_features_carry_the_running_state(tmp_path):
+    # The history ends on missing closes, so the carried averages have decayed weights
+    bars = make_bars(tickers=[f'SYM{i}' for i in range(8)], nan_positions=(198, 199))
+    history = bars.groupby('Ticker').head(200).index
+    serial = FeatureEngine()
+    serial.compute(bars.loc[history])
+    parallel = FeatureEngine()
+    ParallelPreprocessData(None, None, None, None, max_workers=2, shard_dir=str(tmp_path), min_shard_rows=100).compute_features(bars.loc[history], parallel)
+    for key, state in serial.states.items():
+        other = parallel.states[key]
+        assert other.sums == pytest.approx(state.sums) and other.nans == state.nans
+        assert (other.mean, other.m2) == pytest.approx((state.mean, state.m2))
+        assert other.ema_weights == pytest.approx(state.ema_weights)
+
+    rows = bars.index.difference(history)
+    batch = FeatureEngine().compute(bars).set_index(['Ticker', 'Date'])
+    updates = incremental(parallel, bars, rows)
+    expected = batch.loc[list(zip(bars.loc[rows, 'Ticker'], bars.loc[rows, 'Date']))].set_index(rows)
+    assert_features_equal(expected, updates)
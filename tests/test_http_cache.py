@@ -0,0 +1,66 @@
+import os
+import time
+from Imports.http_cache import HTTPCache
+from Imports.http_client import HTTPClient
+
+
+def versioned(body, **validators):
+    """Route answering 304 when the request carries the current validator, else the body with lower-case
+    validator headers as some servers send them"""
+    def route(headers):
+        if 'etag' in validators and headers.get('If-None-Match') == validators['etag']:
+            return 304, {}, b''
+        if 'last-modified' in validators and headers.get('If-Modified-Since') == validators['last-modified']:
+            return 304, {}, b''
+        return 200, {'content-type': 'text/html; charset=iso-8859-1', **validators}, body
+    return route
+
+
+def make_cache(tmp_path, **kwargs):
+    return HTTPCache(str(tmp_path / 'cache'), session=HTTPClient(rate_limits={}), **kwargs)
+
+
+def test_fresh_pages_are_served_from_disk(tmp_path, server):
+    server.routes['/quote'] = versioned('caf\xe9'.encode('iso-8859-1'))
+    cache = make_cache(tmp_path)
+    first = cache.get(server.url('/quote'))
+    second = cache.get(server.url('/quote'))
+    assert server.paths() == ['/quote']
+    assert cache.stats == {'hits': 1, 'revalidated': 0, 'misses': 1}
+    assert second.from_cache and second.content == first.content
+    # Content-Type came as content-type and still picks the decoding
+    assert second.text == 'caf\xe9'
+
+
+def test_stale_pages_are_revalidated_with_lower_case_validators(tmp_path, server):
+    server.routes['/etag'] = versioned(b'<html>etag</html>', etag='"v1"')
+    server.routes['/modified'] = versioned(b'<html>modified</html>', **{'last-modified': 'Fri, 02 Aug 2024 10:00:00 GMT'})
+    cache = make_cache(tmp_path, ttls=[('.*', 0)])
+    for path in ['/etag', '/modified']:
+        cache.get(server.url(path))
+        response = cache.get(server.url(path))
+        assert response.status_code == 200 and response.from_cache
+
+    assert cache.stats == {'hits': 0, 'revalidated': 2, 'misses': 2}
+    assert cache.index[server.url('/etag')]['headers'] == {'Content-Type': 'text/html; charset=iso-8859-1', 'ETag': '"v1"'}
+    sent = [headers for _, _, headers in server.hits]
+    assert sent[1]['If-None-Match'] == '"v1"'
+    assert sent[3]['If-Modified-Since'] == 'Fri, 02 Aug 2024 10:00:00 GMT'
+
+    # The index rebuilt from disk keeps the validators
+    assert make_cache(tmp_path).index[server.url('/etag')]['etag'] == '"v1"'
+
+
+def test_least_recently_used_pages_are_evicted(tmp_path, server):
+    for path in ['/a', '/b', '/c']:
+        server.routes[path] = versioned(b'x' * 100)
+    cache = make_cache(tmp_path, max_bytes=250)
+    for path in ['/a', '/b', '/a', '/c']:
+        cache.get(server.url(path))
+        time.sleep(0.01)
+
+    assert set(cache.index) == {server.url('/a'), server.url('/c')}
+    assert len(os.listdir(tmp_path / 'cache')) == 4
+    cache.get(server.url('/b'))
+    assert server.paths() == ['/a', '/b', '/c', '/b']
+    assert cache.stats == {'hits': 1, 'revalidated': 0, 'misses': 4}
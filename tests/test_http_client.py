@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+import pandas as pd
+from Imports.http_client import HTTPClient
+from Imports.yahoo_news_meth2 import GetYahooNewsData2
+
+
+def test_requests_to_a_host_are_spaced_by_its_rate_limit(server):
+    server.routes['/quote'] = lambda headers: (200, {}, b'ok')
+    client = HTTPClient(rate_limits={server.host: (10, 1)})
+    for _ in range(4):
+        assert client.get(server.url('/quote')).status_code == 200
+    times = [hit[0] for hit in server.hits]
+    # One request per 0.1s with no burst, a little slack for the timer
+    assert all(later - earlier >= 0.09 for earlier, later in zip(times, times[1:]))
+
+
+def test_retry_after_is_honoured_before_retrying(server):
+    calls = []
+
+    def busy(headers):
+        calls.append(1)
+        if len(calls) == 1:
+            return 503, {'Retry-After': '0.5'}, b'busy'
+        return 200, {}, b'ok'
+
+    server.routes['/news'] = busy
+    client = HTTPClient(rate_limits={}, backoff_base=0.01)
+    response = client.get(server.url('/news'))
+    assert response.status_code == 200 and response.content == b'ok'
+    assert len(server.hits) == 2
+    assert server.hits[1][0] - server.hits[0][0] >= 0.45
+
+
+def test_retries_stop_after_max_retries(server):
+    server.routes['/down'] = lambda headers: (500, {}, b'down')
+    client = HTTPClient(rate_limits={}, max_retries=2, backoff_base=0.01)
+    assert client.get(server.url('/down')).status_code == 500
+    assert server.paths() == ['/down'] * 3
+
+
+class RecordingSession:
+    def __init__(self, pages):
+        self.pages = pages
+        self.headers = []
+
+    def get(self, url, headers=None):
+        self.headers.append(headers)
+        return SimpleNamespace(content=self.pages.get(url, '').encode('utf-8'), status_code=200)
+
+
+def test_yahoo_requests_send_browser_headers():
+    quote = 'https://finance.yahoo.com/quote/TCS.NS/news?p=TCS.NS'
+    article = 'https://finance.yahoo.com/news/tcs-results.html'
+    session = RecordingSession({quote: f'<a class="subtle-link" href="{article}">TCS</a>'})
+    yahoo = GetYahooNewsData2({'Stock': ['TCS']})
+    yahoo.session = session
+    yahoo.get_yahoo_news2()
+    assert len(session.headers) == 2
+    assert all(headers['User-Agent'].startswith('Mozilla/5.0') for headers in session.headers)
+    assert yahoo.news_data.equals(pd.DataFrame())
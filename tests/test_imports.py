@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+# Modules a preprocessing-only worker must never load
+HEAVY_MODULES = ['torch', 'transformers', 'sklearn', 'nselib', 'serpapi', 'selenium', 'requests_html', 'bs4', 'Imports.module']
+
+CHILD = """
+import json, sys, time
+{setup}
+start = time.perf_counter()
+{statement}
+print(json.dumps({{'seconds': time.perf_counter() - start, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def measure_import(statement, stub_nselib=False):
+    """Import time and loaded modules of statement in a fresh interpreter. Without stub_nselib, an import
+    of nselib fails when it is not installed and shows up among the modules when it is"""
+    # conftest puts its nselib stand-in in sys.modules when nselib is missing
+    setup = "sys.path.insert(0, 'tests'); import conftest" if stub_nselib else ''
+    result = subprocess.run([sys.executable, '-c', CHILD.format(setup=setup, statement=statement)], cwd=ROOT,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    run = json.loads(result.stdout.strip().splitlines()[-1])
+    return run['seconds'], set(run['modules'])
+
+
+def loaded(modules, names):
+    return [name for name in names if name in modules or any(module.startswith(name + '.') for module in modules)]
+
+
+def test_listing_the_package_imports_nothing():
+    pandas_seconds, _ = measure_import('import pandas')
+    seconds, modules = measure_import('import Imports; dir(Imports)')
+    assert loaded(modules, HEAVY_MODULES + ['pandas']) == []
+    assert seconds < pandas_seconds
+
+
+@pytest.mark.parametrize('statement', [
+    'from Imports import PreprocessData',
+    'from Imports import StreamPreprocessData, FeatureEngine',
+    'from Imports import ParallelPreprocessData',
+    'from Imports import SeriesStore, DatasetStore, IncrementalScaler',
+])
+def test_preprocessing_does_not_load_the_network_or_model_stack(statement):
+    _, modules = measure_import(statement)
+    assert loaded(modules, HEAVY_MODULES) == []
+
+
+def test_fetching_loads_the_network_stack_only_when_asked():
+    _, modules = measure_import('from Imports import GetFinData', stub_nselib=True)
+    assert 'Imports.module' in modules
+    assert loaded(modules, ['torch', 'transformers', 'sklearn']) == []
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+import torch
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import GPT2Config, GPT2LMHeadModel, LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+from Imports.label_scoring import LabelScorer
+
+WORDS = ['close', 'rsi', 'sma', 'macd', 'volatility', 'bullish', 'bearish', 'bull', 'bear', 'ish', 'up', 'down',
+         'label', 'the', 'market', ':', ',', '.'] + [str(i) for i in range(10)]
+
+
+def make_tiny_lm(kind, seed=0):
+    """Randomly initialised two-layer causal LM with a word-level tokenizer, built offline. Llama's rotary
+    positions only see offsets, GPT-2's learned ones see where each token sits, so wrong position ids show"""
+    vocab = {token: i for i, token in enumerate(['<pad>', '<s>', '</s>', '<unk>'] + WORDS)}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token='<unk>'))
+    tokenizer.pre_tokenizer = pre_tokenizers.Sequence([pre_tokenizers.Whitespace(), pre_tokenizers.Digits(individual_digits=True)])
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=tokenizer, pad_token='<pad>', bos_token='<s>', eos_token='</s>', unk_token='<unk>')
+    torch.manual_seed(seed)
+    if kind == 'llama':
+        config = LlamaConfig(vocab_size=len(vocab), hidden_size=64, intermediate_size=128, num_hidden_layers=2, num_attention_heads=4,
+                             num_key_value_heads=4, max_position_embeddings=256, pad_token_id=0, bos_token_id=1, eos_token_id=2)
+        return LlamaForCausalLM(config).eval(), tokenizer
+    config = GPT2Config(vocab_size=len(vocab), n_embd=64, n_layer=2, n_head=4, n_positions=256, pad_token_id=0, bos_token_id=1, eos_token_id=2)
+    return GPT2LMHeadModel(config).eval(), tokenizer
+
+
+def make_inputs(n=12, seed=0):
+    """Prompts from a few to a few dozen tokens, so a batch holds very different lengths"""
+    rng = np.random.default_rng(seed)
+    names = ['close', 'rsi', 'sma', 'macd', 'volatility']
+    return [' , '.join(f'{names[i % 5]} : {rng.integers(0, 10 ** rng.integers(1, 6))}' for i in range(rng.integers(1, 8))) + ' .'
+            for _ in range(n)]
+
+
+@torch.inference_mode()
+def unpadded_scores(model, tokenizer, prompts, labels):
+    """Log-likelihood of every label after every prompt, one unpadded sequence per forward pass"""
+    scores = np.zeros((len(prompts), len(labels)))
+    for p, prompt in enumerate(prompts):
+        prompt_ids = tokenizer(prompt)['input_ids']
+        for l, label in enumerate(labels):
+            label_ids = tokenizer(label, add_special_tokens=False)['input_ids']
+            log_probs = torch.log_softmax(model(torch.tensor([prompt_ids + label_ids])).logits[0].float(), dim=-1)
+            scores[p, l] = sum(float(log_probs[len(prompt_ids) - 1 + k, token]) for k, token in enumerate(label_ids))
+    return scores
+
+
+@pytest.mark.parametrize('kind', ['llama', 'gpt2'])
+@pytest.mark.parametrize('labels', [('bearish', 'bullish'), ('bear ish', 'bull ish down')])
+def test_padded_batches_score_like_single_prompts(kind, labels):
+    model, tokenizer = make_tiny_lm(kind)
+    inputs = make_inputs()
+    batched = LabelScorer(model, tokenizer, labels=labels, template='{} {}', instruction='the market', max_batch_tokens=10 ** 6)
+    scores = batched.score_prompts(inputs)
+    assert batched.single_token == (len(labels[0].split()) == 1)
+    # One batch of left-padded rows of mixed lengths
+    assert batched.padding_stats['padded_tokens'] > 2 * batched.padding_stats['tokens']
+    expected = unpadded_scores(model, tokenizer, batched.format_prompts(inputs), labels)
+    np.testing.assert_allclose(scores, expected, rtol=1e-5, atol=1e-5)
@@ -0,0 +1,89 @@
+import json
+import pytest
+from Imports.metrics import NULL_TIMER, Metrics, timed
+from Imports.module import GetFinData
+
+
+@timed('inner')
+def inner():
+    raise ConnectionError('Read timed out')
+
+
+@timed('outer')
+def outer():
+    return inner()
+
+
+def errors(metrics):
+    """errors_total per stage, over all error types"""
+    counts = {}
+    for (name, labels), value in metrics.counters.items():
+        if name == 'errors_total':
+            counts[dict(labels)['stage']] = counts.get(dict(labels)['stage'], 0) + value
+    return counts
+
+
+def test_an_exception_is_counted_at_the_stage_that_raised_it(metrics):
+    with pytest.raises(ConnectionError):
+        outer()
+    assert errors(metrics) == {'inner': 1}
+    # Both stages still record their time
+    assert {dict(labels)['stage'] for _, labels in metrics.histograms} == {'inner', 'outer'}
+
+
+def test_a_handler_does_not_count_a_counted_exception_again(metrics):
+    try:
+        outer()
+    except ConnectionError as e:
+        metrics.error('handler', e)
+    metrics.error('handler', ValueError('not seen by a stage'))
+    metrics.error('handler', 'HTTP 503')
+    assert errors(metrics) == {'inner': 1, 'handler': 2}
+
+
+def test_a_failed_fetch_is_counted_once(metrics):
+    df = GetFinData({}, '2024-01-01', '2024-06-30').get_past_data('TCS', 'Bond')
+    assert df.empty
+    assert errors(metrics) == {'backfill': 1}
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    assert metrics.timer(stage='load') is NULL_TIMER
+    metrics.inc('rows_total', 5)
+    metrics.error('load', ValueError())
+    assert metrics.counters == {} and metrics.histograms == {}
+
+
+def make_metrics():
+    metrics = Metrics(enabled=True, prefix='test')
+    metrics.inc('rows_total', 10, stage='load', direction='in')
+    metrics.inc('rows_total', 4, stage='load', direction='in')
+    metrics.error('load', 'bad "quoted"\\value')
+    for seconds in (0.002, 0.03, 0.03, 100.0):
+        metrics.observe('stage_seconds', seconds, stage='load')
+    return metrics
+
+
+def test_json_export(tmp_path):
+    path = make_metrics().export(str(tmp_path / 'out' / 'run.json'))
+    snapshot = json.loads(open(path).read())
+    assert {'name': 'rows_total', 'labels': {'direction': 'in', 'stage': 'load'}, 'value': 14} in snapshot['counters']
+    histogram, = snapshot['histograms']
+    assert histogram['count'] == 4 and histogram['sum'] == pytest.approx(100.062)
+    buckets = dict((str(bound), count) for bound, count in histogram['buckets'])
+    assert buckets['0.001'] == 0 and buckets['0.005'] == 1 and buckets['0.05'] == 3 and buckets['60.0'] == 3 and buckets['+Inf'] == 4
+
+
+def test_prometheus_export(tmp_path):
+    path = make_metrics().export(str(tmp_path / 'run.prom'))
+    lines = open(path).read().splitlines()
+    assert lines.count('# TYPE test_rows_total counter') == 1
+    assert 'test_rows_total{direction="in",stage="load"} 14' in lines
+    assert 'test_errors_total{stage="load",type="bad \\"quoted\\"\\\\value"} 1' in lines
+    assert '# TYPE test_stage_seconds histogram' in lines
+    assert 'test_stage_seconds_bucket{stage="load",le="0.05"} 3' in lines
+    assert 'test_stage_seconds_bucket{stage="load",le="+Inf"} 4' in lines
+    assert 'test_stage_seconds_count{stage="load"} 4' in lines
+    buckets = [int(line.rsplit(' ', 1)[1]) for line in lines if line.startswith('test_stage_seconds_bucket')]
+    assert buckets == sorted(buckets)
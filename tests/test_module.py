@@ -0,0 +1,238 @@
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import pytest
+import Imports.module as module
+from Imports.backfill import date_windows
+from Imports.module import GetFinData
+
+
+def make_option_chain(n_strikes=6, symbol='NIFTY'):
+    """A small nse_live_option_chain response"""
+    strikes = 22000 + 50 * np.arange(n_strikes)
+    return pd.DataFrame({
+        'Fetch_Time': '02-Aug-2024 15:30:00',
+        'Symbol': symbol,
+        'Expiry_Date': '29-Aug-2024',
+        'CALLS_OI': 1000,
+        'CALLS_Volume': 500,
+        'CALLS_IV': 14.5,
+        'CALLS_LTP': np.linspace(400, 150, n_strikes),
+        'Strike_Price': strikes,
+        'PUTS_LTP': np.linspace(100, 350, n_strikes),
+        'PUTS_IV': 15.5,
+        'PUTS_Volume': 400,
+        'PUTS_OI': 900,
+    })
+
+
+class FakeDerivatives:
+    def __init__(self, chain):
+        self.chain = chain
+
+    def nse_live_option_chain(self, symbol):
+        return self.chain.copy()
+
+
+class FakeNSE(FakeDerivatives):
+    """Stands in for nselib's capital_market and derivatives: deterministic rows for every request after a
+    fixed latency, and a record of the requests made. Once fail_after requests were served every later one
+    times out, as when the connection drops midway through a backfill"""
+    def __init__(self, latency=0.02, fail_after=None):
+        super().__init__(make_option_chain())
+        self.latency = latency
+        self.fail_after = fail_after
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def days(self, request, from_date, to_date):
+        with self.lock:
+            if self.fail_after is not None and len(self.requests) >= self.fail_after:
+                raise ConnectionError('Read timed out')
+            self.requests.append(request)
+        time.sleep(self.latency)
+        return pd.bdate_range(datetime.strptime(from_date, '%d-%m-%Y'), datetime.strptime(to_date, '%d-%m-%Y'))
+
+    def price_volume_and_deliverable_position_data(self, symbol, from_date, to_date):
+        days = self.days(('history', symbol, from_date, to_date), from_date, to_date)
+        return pd.DataFrame({'Symbol': symbol, 'Series': 'EQ', 'Date': days.strftime('%d-%b-%Y'),
+                             'ClosePrice': 100 + days.dayofyear.to_numpy() % 50 + len(symbol)})
+
+    def future_price_volume_data(self, symbol, instrument, from_date, to_date):
+        days = self.days(('futures', symbol, from_date, to_date), from_date, to_date)
+        return pd.DataFrame({'TIMESTAMP': days.strftime('%d-%b-%Y'), 'INSTRUMENT': instrument, 'SYMBOL': symbol,
+                             'EXPIRY_DT': '29-Aug-2024', 'STRIKE_PRICE': 0, 'OPTION_TYPE': 'XX',
+                             'CLOSING_PRICE': 5000 + days.dayofyear.to_numpy()})
+
+    def nse_live_option_chain(self, symbol):
+        self.days(('options', symbol), '01-08-2024', '02-08-2024')
+        return make_option_chain(symbol=symbol)
+
+
+class FrozenDatetime(datetime):
+    """Today for the backfill: windows closed before it are checkpointed"""
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2024, 8, 2, 15, 30)
+
+
+TICKERS = {'Stock': ['TCS', 'INFY', 'HDFCBANK', 'RELIANCE'], 'ETF': ['NIFTYBEES'], 'Index': ['NIFTY']}
+
+
+@pytest.fixture
+def nse(monkeypatch):
+    fake = FakeNSE()
+    monkeypatch.setattr(module, 'capital_market', fake)
+    monkeypatch.setattr(module, 'derivatives', fake)
+    return fake
+
+
+def test_concurrent_fetch_matches_sequential(nse):
+    # One window at a time for the sequential run; the concurrent one overlaps tickers and windows
+    sequential = GetFinData(TICKERS, '2023-01-01', '2024-06-30', max_workers=1, backfill_workers=1)
+    sequential.run()
+    concurrent = GetFinData(TICKERS, '2023-01-01', '2024-06-30', max_workers=8, backfill_workers=8)
+    concurrent.run()
+    assert set(sequential.hist_dat) == {'Stock', 'ETF', 'Index'} and set(sequential.options_dat) == {'Stock'}
+    for asset_type, df in sequential.hist_dat.items():
+        pd.testing.assert_frame_equal(df, concurrent.hist_dat[asset_type])
+    for asset_type, df in sequential.options_dat.items():
+        pd.testing.assert_frame_equal(df, concurrent.options_dat[asset_type])
+    assert concurrent.run_time < sequential.run_time
+
+
+def test_compare_fetch_modes_leaves_the_data_alone(nse):
+    fin_data = GetFinData(TICKERS, '2024-01-01', '2024-06-30', max_workers=2)
+    fin_data.run()
+    hist_dat, options_dat, run_time = fin_data.hist_dat, fin_data.options_dat, fin_data.run_time
+    timings = fin_data.compare_fetch_modes(max_workers=8)
+    assert timings['speedup'] > 1
+    assert fin_data.hist_dat is hist_dat and fin_data.options_dat is options_dat
+    assert fin_data.run_time == run_time and fin_data.max_workers == 2
+
+
+def test_options_are_priced(monkeypatch):
+    monkeypatch.setattr(module, 'derivatives', FakeDerivatives(make_option_chain()))
+    df = GetFinData({}, '2024-01-01', '2024-12-31').get_options_data('NIFTY')
+    assert len(df) == 12
+    assert df['Delta'].notna().all()
+
+
+def test_options_are_returned_unpriced_when_pricing_fails(monkeypatch, metrics):
+    def broken_pricing(df, r):
+        raise ValueError('no underlying')
+
+    monkeypatch.setattr(module, 'derivatives', FakeDerivatives(make_option_chain()))
+    monkeypatch.setattr(module, 'price_option_chain', broken_pricing)
+    df = GetFinData({}, '2024-01-01', '2024-12-31').get_options_data('NIFTY')
+    assert len(df) == 12
+    assert df['Delta'].isna().all()
+    assert df['Option Close Price'].notna().all()
+    assert metrics.counters[('errors_total', (('stage', 'price_option_chain'), ('type', 'ValueError')))] == 1
+
+
+def test_news_watermarks_compare_across_layouts(tmp_path):
+    corpus = pd.DataFrame({
+        'url': ['https://economictimes.indiatimes.com/a.cms', 'https://economictimes.indiatimes.com/b.cms', 'https://finance.yahoo.com/news/c.html'],
+        'date': ['Last Updated: Aug 02, 2024, 12:03:00 PM IST', 'Last Updated: Aug 01, 2024, 08:02:00 AM IST', '2024-08-02T07:00:00.000Z'],
+        'ticker': ['TCS', 'TCS', 'INFY'],
+    })
+    corpus.to_csv(tmp_path / 'news.csv', index=False)
+    fin_data = GetFinData({}, '2024-01-01', '2024-12-31')
+    fin_data.load_news_corpus(str(tmp_path / 'news.csv'))
+    assert fin_data.news_watermarks == {'TCS': pd.Timestamp('2024-08-02 12:03', tz='Asia/Kolkata'),
+                                        'INFY': pd.Timestamp('2024-08-02 12:30', tz='Asia/Kolkata')}
+    assert fin_data.seen_urls == set(corpus['url'])
+
+
+def test_incremental_news_stops_at_the_watermark(monkeypatch, tmp_path, capsys):
+    base = 'https://economictimes.indiatimes.com'
+    pd.DataFrame({'url': [f'{base}/a.cms'], 'date': ['Last Updated: Aug 02, 2024, 12:03:00 PM IST'], 'ticker': ['TCS']}).to_csv(tmp_path / 'news.csv', index=False)
+    fin_data = GetFinData({}, '2024-01-01', '2024-12-31')
+    fin_data.load_news_corpus(str(tmp_path / 'news.csv'))
+    # Newest first, as on the ET listing
+    dates = {'/new2.cms': 'Last Updated: Aug 03, 2024, 09:15:00 AM IST', '/new1.cms': 'Last Updated: Aug 02, 2024, 02:00:00 PM IST',
+             '/a.cms': 'Last Updated: Aug 02, 2024, 12:03:00 PM IST', '/old.cms': 'Last Updated: Aug 01, 2024, 10:00:00 AM IST',
+             '/older.cms': 'Last Updated: Jul 31, 2024, 10:00:00 AM IST'}
+    fetched = []
+
+    def extract_article_content(uri, headers, ticker):
+        fetched.append(uri)
+        return {'url': f'{base}{uri}', 'title': uri, 'date': dates[uri], 'content': 'summary', 'ticker': ticker}
+
+    normalized = []
+    original = module.normalize_news_dates
+
+    def normalize_news_dates(values, *args):
+        normalized.append(len(values))
+        return original(values, *args)
+
+    monkeypatch.setattr(module, 'normalize_news_dates', normalize_news_dates)
+    monkeypatch.setattr(module, 'cached_get', lambda url, headers, cache: SimpleNamespace(content=b''))
+    monkeypatch.setattr(module, 'extract_et_full_btn', lambda html: f'{base}/tcs/news')
+    monkeypatch.setattr(module, 'extract_et_listing_links', lambda html: list(dates))
+    monkeypatch.setattr(fin_data, 'parse_xml', lambda xml_file, ticker: {'Ticker_Name': 'tcs', 'CID': '8345'})
+    monkeypatch.setattr(fin_data, 'get_page_html', lambda url, headers: '')
+    monkeypatch.setattr(fin_data, 'extract_article_content', extract_article_content)
+
+    fin_data.gather_news(['TCS'], incremental=True)
+    # The seen article is skipped and nothing past the first one older than the watermark is fetched
+    assert fetched == ['/new2.cms', '/new1.cms', '/old.cms']
+    assert fin_data.new_news_data['url'].tolist() == [f'{base}{uri}' for uri in fetched]
+    assert fin_data.news_watermarks['TCS'] == pd.Timestamp('2024-08-03 09:15', tz='Asia/Kolkata')
+    # One column-wide parse for the new watermarks, none per article
+    assert normalized == [3]
+    assert capsys.readouterr().out == 'Fetched 3 new articles\n'
+
+
+def test_unknown_asset_types_are_rejected(nse, metrics, capsys):
+    fin_data = GetFinData({'Bond': ['GSEC']}, '2024-01-01', '2024-06-30')
+    with pytest.raises(ValueError, match='Unknown asset type Bond'):
+        fin_data.fetch_window('GSEC', 'Bond', datetime(2024, 1, 1), datetime(2024, 3, 31))
+    assert fin_data.get_past_data('GSEC', 'Bond').empty
+    assert 'Unknown asset type Bond' in capsys.readouterr().out
+    # Counted once, by backfill where it was raised
+    errors = {key: value for key, value in metrics.counters.items() if key[0] == 'errors_total'}
+    assert errors == {('errors_total', (('stage', 'backfill'), ('type', 'ValueError'))): 1}
+    assert nse.requests == []
+
+
+def test_backfill_resumes_with_the_missing_windows(monkeypatch, tmp_path):
+    monkeypatch.setattr(module, 'datetime', FrozenDatetime)
+    clean = FakeNSE(latency=0)
+    monkeypatch.setattr(module, 'derivatives', clean)
+    expected = GetFinData({}, '2020-01-01', '2023-12-31').get_past_data('NIFTY', 'Index')
+    windows = len(clean.requests)
+
+    # The connection drops after 10 windows
+    dropped = FakeNSE(latency=0, fail_after=10)
+    monkeypatch.setattr(module, 'derivatives', dropped)
+    fin_data = GetFinData({}, '2020-01-01', '2023-12-31', checkpoint_dir=str(tmp_path), backfill_workers=1)
+    partial = fin_data.get_past_data('NIFTY', 'Index')
+    assert len(partial.attrs['missing_windows']) == windows - 10
+    assert fin_data.missing_windows[('Index', 'NIFTY')] == partial.attrs['missing_windows']
+
+    resumed = FakeNSE(latency=0)
+    monkeypatch.setattr(module, 'derivatives', resumed)
+    result = fin_data.get_past_data('NIFTY', 'Index')
+    fetched = [(from_date, to_date) for _, _, from_date, to_date in resumed.requests]
+    assert sorted(fetched) == sorted((a.strftime('%d-%m-%Y'), b.strftime('%d-%m-%Y')) for a, b in partial.attrs['missing_windows'])
+    assert result.attrs['missing_windows'] == [] and not fin_data.missing_windows
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_backfill_over_a_longer_range_reuses_the_checkpoints(monkeypatch, tmp_path):
+    monkeypatch.setattr(module, 'datetime', FrozenDatetime)
+    monkeypatch.setattr(module, 'capital_market', FakeNSE(latency=0))
+    GetFinData({}, '2021-03-15', '2023-12-31', checkpoint_dir=str(tmp_path)).get_past_data('TCS', 'Stock')
+    earlier = FakeNSE(latency=0)
+    monkeypatch.setattr(module, 'capital_market', earlier)
+    GetFinData({}, '2020-02-01', '2023-12-31', checkpoint_dir=str(tmp_path)).get_past_data('TCS', 'Stock')
+    # Only the windows before the old start date and the one it cut short are fetched
+    windows = date_windows(datetime(2020, 2, 1), datetime(2023, 12, 31), GetFinData.WINDOW_DAYS['Stock'])
+    new = [(a.strftime('%d-%m-%Y'), b.strftime('%d-%m-%Y')) for a, b in windows if a <= datetime(2021, 3, 15)]
+    assert sorted((from_date, to_date) for _, _, from_date, to_date in earlier.requests) == sorted(new)
+    assert 0 < len(new) < len(windows)
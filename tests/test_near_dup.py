@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+from Imports.near_dup import NearDuplicateIndex
+from Imports.preproc_data import PreprocessData
+
+
+def make_news(n=40, seed=0):
+    """n distinct articles followed by a syndicated copy of every fourth one with one word changed"""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f'w{i}' for i in range(5000)], dtype=object)
+    tokens = vocabulary[rng.integers(0, len(vocabulary), size=(n, 200))]
+    news = pd.DataFrame({
+        'url': [f'https://example.com/articleshow/{i}.cms' for i in range(n)],
+        'title': [' '.join(row[:10]) for row in tokens],
+        'content': [' '.join(row[10:]) for row in tokens],
+        'date': '2024-03-01T09:15:00.000Z',
+        'ticker': 'TCS',
+    })
+    copies = news.iloc[::4].copy()
+    copies['url'] = copies['url'] + '?syndicated'
+    copies['content'] = copies['content'].str.replace(r'^\w+', 'edited', regex=True)
+    return pd.concat([news, copies], ignore_index=True)
+
+
+def preprocessed_urls(news, index):
+    data = PreprocessData(pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), news.copy())
+    data.near_duplicates = index
+    data.preprocess_news_data()
+    return data.news_data['url'].tolist()
+
+
+def test_second_run_over_the_same_news_keeps_the_same_articles(tmp_path):
+    news = make_news()
+    index = NearDuplicateIndex(str(tmp_path))
+    first = preprocessed_urls(news, index)
+    assert first == news['url'].iloc[:40].tolist()
+    assert len(index.keys) == 40
+
+    # Archived articles are not duplicates of themselves and are not archived twice
+    assert preprocessed_urls(news, index) == first
+    assert len(index.keys) == 40
+
+    index.save()
+    assert preprocessed_urls(news, NearDuplicateIndex(str(tmp_path))) == first
+
+
+def test_new_copies_of_archived_articles_are_dropped(tmp_path):
+    news = make_news()
+    index = NearDuplicateIndex(str(tmp_path))
+    index.drop_near_duplicates(news.iloc[:40])
+    kept = index.drop_near_duplicates(news.iloc[40:])
+    assert kept.empty
+
+
+def test_batched_adds_match_one_index_built_at_once():
+    news = make_news(n=400, seed=1)
+    texts = (news['title'] + ' ' + news['content']).tolist()
+    batched = NearDuplicateIndex()
+    for start in range(0, 400, 25):
+        batched.drop_near_duplicates(news.iloc[start:start + 25])
+    assert len(batched.runs) < 16
+
+    whole = NearDuplicateIndex()
+    whole.drop_near_duplicates(news.iloc[:400])
+    assert batched.keys == whole.keys
+    np.testing.assert_array_equal(batched.signatures, whole.signatures)
+    assert batched.find_duplicates(texts)[0] == whole.find_duplicates(texts)[0]
+    for merged, expected in zip(batched.compact(), whole.compact()):
+        np.testing.assert_array_equal(np.sort(merged, axis=1), np.sort(expected, axis=1))
@@ -0,0 +1,44 @@
+import pandas as pd
+from Imports.news_dates import normalize_news_dates, parse_news_date
+from Imports.preproc_data import PreprocessData
+
+DATES = ['Last Updated: Aug 02, 2024, 12:03:00 PM IST', '2024-08-02T07:00:00.000Z', None, 'yesterday']
+
+
+def test_layouts_are_parsed_to_ist():
+    parsed, counts = normalize_news_dates(DATES)
+    assert parsed.iloc[0] == pd.Timestamp('2024-08-02 12:03:00', tz='Asia/Kolkata')
+    assert parsed.iloc[1] == pd.Timestamp('2024-08-02 12:30:00', tz='Asia/Kolkata')
+    assert parsed.iloc[2:].isna().all()
+    assert counts == {'missing': 1, 'et': 1, 'iso': 1, 'unrecognized': 1, 'unparseable': 0}
+
+
+def test_single_dates_parse_like_the_column():
+    parsed, _ = normalize_news_dates(DATES)
+    singles = [parse_news_date(date) for date in DATES + [float('nan')]]
+    assert singles[:2] == parsed.iloc[:2].tolist()
+    assert all(date is pd.NaT for date in singles[2:])
+
+
+def test_normalizing_twice_keeps_the_dates():
+    once, _ = normalize_news_dates(DATES)
+    twice, counts = normalize_news_dates(once)
+    pd.testing.assert_series_equal(twice, once)
+    assert counts['datetime'] == 2 and counts['missing'] == 2
+
+
+def test_parsed_dates_are_converted_or_localized():
+    once, _ = normalize_news_dates(DATES)
+    # In UTC, and naive IST wall clock as DatasetStore stores them
+    pd.testing.assert_series_equal(normalize_news_dates(once.dt.tz_convert('UTC'))[0], once)
+    pd.testing.assert_series_equal(normalize_news_dates(once.dt.tz_localize(None))[0], once)
+
+
+def test_preprocessing_news_twice_keeps_the_dates():
+    news = pd.DataFrame({'title': ['a', 'b', 'c', 'd'], 'content': ['w', 'x', 'y', 'z'], 'date': DATES, 'ticker': 'TCS'})
+    data = PreprocessData(pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), news)
+    data.preprocess_news_data()
+    first = data.news_data['date'].copy()
+    data.preprocess_news_data()
+    pd.testing.assert_series_equal(data.news_data['date'], first)
+    assert first.notna().sum() == 2
@@ -0,0 +1,96 @@
+import time
+import pandas as pd
+from Imports.nse_loader import NSE_SCHEMAS, apply_schema, load_nse_csv, memory_report
+
+INDEX_OPTIONS = 'Datasets/index_options_data.csv'
+
+PRICE_VOLUME = (
+    ',Symbol,Series,Date,PrevClose,OpenPrice,HighPrice,LowPrice,LastPrice,ClosePrice,AveragePrice,'
+    'TotalTradedQuantity,TurnoverInRs,No.ofTrades,DeliverableQty,%DlyQttoTradedQty,Ticker,Asset Type\n'
+    '0,NIFTYBEES,EQ,09-Aug-2023,215.79,216.85,216.85,212.8,216.5,216.49,215.39,"20,25,167","43,61,92,790.66",'
+    '"22,818","15,20,530",75.08,NIFTYBEES,ETF\n'
+    '1,NIFTYBEES,EQ,10-Aug-2023,216.49,217.27,217.27,215.01,215.45,215.33,215.57,"21,00,995","45,29,01,973.43",'
+    '"25,814","15,58,558",74.18,NIFTYBEES,ETF\n'
+)
+
+
+def check_schema(df, layout):
+    schema = NSE_SCHEMAS[layout]
+    assert not [col for col in df.columns if str(col).startswith('Unnamed:') or col == '']
+    for col in schema['categories']:
+        if col in df.columns:
+            assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+    for col in schema['dates']:
+        if col in df.columns:
+            assert pd.api.types.is_datetime64_any_dtype(df[col]), col
+    for col in schema['numbers']:
+        if col in df.columns:
+            assert df[col].dtype.kind == 'i' or df[col].dtype == 'float64', col
+
+
+def test_price_volume_numbers_keep_full_precision(tmp_path):
+    path = tmp_path / 'etf.csv'
+    path.write_text(PRICE_VOLUME)
+    df = load_nse_csv(path, 'price_volume')
+    check_schema(df, 'price_volume')
+    # float32 would round these crore-sized turnovers to the nearest 32 rupees
+    assert df['TurnoverInRs'].tolist() == [436192790.66, 452901973.43]
+    assert df['ClosePrice'].dtype == 'float64' and df['ClosePrice'].tolist() == [216.49, 215.33]
+    assert df['TotalTradedQuantity'].dtype == 'int32' and df['TotalTradedQuantity'].tolist() == [2025167, 2100995]
+    assert df['Date'].tolist() == [pd.Timestamp('2023-08-09'), pd.Timestamp('2023-08-10')]
+
+
+def test_futidx_load_matches_the_schema_applied_to_read_csv():
+    df = load_nse_csv(INDEX_OPTIONS, 'futidx')
+    check_schema(df, 'futidx')
+    expected = apply_schema(pd.read_csv(INDEX_OPTIONS), 'futidx')
+    pd.testing.assert_series_equal(df.dtypes, expected.dtypes)
+    pd.testing.assert_frame_equal(df, expected, check_categorical=False)
+
+
+def test_option_chain_round_trip(tmp_path):
+    chain = pd.DataFrame({
+        'Ticker': ['NIFTY', 'NIFTY'], 'Expiry Date': ['25-Jul-2024', '25-Jul-2024'], 'Option Type': ['CE', 'PE'],
+        'Strike Price': ['24,000', '24,000'], 'Option Close Price': ['1,234.55', '-'],
+        'Open Interest': ['1,23,450', '98,765'], 'Asset Type': ['Index', 'Index'],
+    })
+    typed = apply_schema(chain, 'option_chain')
+    check_schema(typed, 'option_chain')
+    # '-' marks an untraded strike in the NSE chain
+    assert typed['Option Close Price'].isna().tolist() == [False, True]
+    assert typed['Option Close Price'].iloc[0] == 1234.55
+    path = tmp_path / 'chain.csv'
+    chain.to_csv(path)
+    pd.testing.assert_frame_equal(load_nse_csv(path, 'option_chain'), typed, check_categorical=False)
+
+
+def test_bad_dates_become_nat(tmp_path):
+    path = tmp_path / 'etf.csv'
+    path.write_text(PRICE_VOLUME.replace('10-Aug-2023', 'not a date'))
+    assert load_nse_csv(path, 'price_volume')['Date'].isna().tolist() == [False, True]
+
+
+def test_memory_report(capsys):
+    report = memory_report(INDEX_OPTIONS, 'futidx')
+    assert set(report) == {'read_csv', 'typed'}
+    for entry in report.values():
+        assert set(entry) == {'seconds', 'peak_mib', 'frame_mib'}
+        assert entry['seconds'] > 0 and entry['peak_mib'] > 0
+    assert report['typed']['frame_mib'] < report['read_csv']['frame_mib'] * 0.6
+    assert report['typed']['peak_mib'] < report['read_csv']['peak_mib']
+    output = capsys.readouterr().out.splitlines()
+    assert [line.split()[0] for line in output] == ['read_csv', 'typed']
+
+
+def test_typed_load_is_not_slower_than_read_csv():
+    def best(load):
+        load()
+        times = []
+        for _ in range(5):
+            start = time.perf_counter()
+            load()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    # Best of five with some slack, the typed load is roughly twice as fast
+    assert best(lambda: load_nse_csv(INDEX_OPTIONS, 'futidx')) < best(lambda: pd.read_csv(INDEX_OPTIONS)) * 1.2
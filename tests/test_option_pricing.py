@@ -0,0 +1,91 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from Imports.option_pricing import bs_greeks, implied_volatility, parity_underlying, price_option_chain, year_fractions
+
+SPOT, RATE, SIGMA = 22000.0, 0.065, 0.15
+FETCH_TIME, EXPIRY = '02-Aug-2024 15:30:00', '29-Aug-2024'
+
+
+def cdf(x):
+    return 0.5 * (1 + math.erf(x / math.sqrt(2)))
+
+
+def scalar_black_scholes(S, K, T, r, sigma, is_call):
+    """Textbook Black-Scholes for one option: price, delta, gamma, theta per day, vega per point"""
+    d1 = (math.log(S / K) + (r + sigma ** 2 / 2) * T) / (sigma * math.sqrt(T))
+    d2 = d1 - sigma * math.sqrt(T)
+    pdf = math.exp(-d1 ** 2 / 2) / math.sqrt(2 * math.pi)
+    if is_call:
+        price = S * cdf(d1) - K * math.exp(-r * T) * cdf(d2)
+        delta = cdf(d1)
+        theta = -S * pdf * sigma / (2 * math.sqrt(T)) - r * K * math.exp(-r * T) * cdf(d2)
+    else:
+        price = K * math.exp(-r * T) * cdf(-d2) - S * cdf(-d1)
+        delta = cdf(d1) - 1
+        theta = -S * pdf * sigma / (2 * math.sqrt(T)) + r * K * math.exp(-r * T) * cdf(-d2)
+    return {'Price': price, 'Delta': delta, 'Gamma': pdf / (S * sigma * math.sqrt(T)), 'Theta': theta / 365,
+            'Vega': S * pdf * math.sqrt(T) / 100}
+
+
+def time_to_expiry():
+    return float(year_fractions([FETCH_TIME], [EXPIRY])[0])
+
+
+def make_chain(strikes, untraded=()):
+    """Reshaped option chain priced at SIGMA, both legs of the untraded strikes reported at 0 as nselib does"""
+    T = time_to_expiry()
+    rows = []
+    for strike in strikes:
+        for option_type in ('call', 'put'):
+            price = scalar_black_scholes(SPOT, strike, T, RATE, SIGMA, option_type == 'call')['Price']
+            rows.append({'Date': FETCH_TIME, 'Ticker': 'NIFTY', 'Option Type': option_type, 'Strike Price': strike,
+                         'Expiry Date': EXPIRY, 'Option Close Price': 0.0 if strike in untraded else round(price, 2),
+                         'Implied Volatility': 0.0, 'Open Interest': 100, 'Volume': 10,
+                         'Delta': None, 'Gamma': None, 'Theta': None, 'Vega': None})
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize('strike', [20000.0, 21500.0, 22000.0, 22500.0, 24000.0])
+@pytest.mark.parametrize('is_call', [True, False])
+def test_greeks_and_implied_volatility_match_scalar_black_scholes(strike, is_call):
+    T = time_to_expiry()
+    expected = scalar_black_scholes(SPOT, strike, T, RATE, SIGMA, is_call)
+    greeks = bs_greeks(SPOT, strike, T, RATE, SIGMA, is_call)
+    for greek, value in greeks.items():
+        assert float(value) == pytest.approx(expected[greek], rel=1e-9, abs=1e-12)
+    solved = implied_volatility(expected['Price'], SPOT, strike, T, RATE, is_call)
+    assert solved[0] == pytest.approx(SIGMA, abs=1e-6)
+
+
+def test_implied_volatility_is_nan_without_time_value():
+    T = time_to_expiry()
+    # Below intrinsic, zero, and above the spot for a call
+    solved = implied_volatility([1000.0, 0.0, 30000.0], SPOT, [20000.0, 22000.0, 22000.0], T, RATE, [True, True, True])
+    assert np.isnan(solved).all()
+
+
+def test_parity_ignores_untraded_strikes():
+    strikes = [20000.0 + 250 * i for i in range(17)]
+    chain = make_chain(strikes, untraded={20000.0, 20250.0, 23750.0, 24000.0})
+    spot = parity_underlying(chain, year_fractions(chain['Date'], chain['Expiry Date']), RATE)
+    assert spot.iloc[0] == pytest.approx(SPOT, abs=1.0)
+
+
+def test_priced_chain_with_zero_wings_matches_black_scholes():
+    strikes = [20000.0 + 250 * i for i in range(17)]
+    untraded = {20000.0, 20250.0, 23750.0, 24000.0}
+    priced = price_option_chain(make_chain(strikes, untraded=untraded), RATE)
+    T = time_to_expiry()
+    for _, row in priced.iterrows():
+        if row['Strike Price'] in untraded:
+            assert np.isnan(row['Model Implied Volatility']) and np.isnan(row['Delta'])
+            continue
+        expected = scalar_black_scholes(SPOT, row['Strike Price'], T, RATE, SIGMA, row['Option Type'] == 'call')
+        # Prices are rounded to the paisa, deep out of the money that moves the volatility a little
+        assert row['Model Implied Volatility'] == pytest.approx(SIGMA * 100, abs=0.5)
+        assert row['Delta'] == pytest.approx(expected['Delta'], abs=0.01)
+    atm_call = priced[(priced['Strike Price'] == SPOT) & (priced['Option Type'] == 'call')].iloc[0]
+    assert atm_call['Model Implied Volatility'] == pytest.approx(SIGMA * 100, abs=0.01)
+    assert atm_call['Delta'] == pytest.approx(scalar_black_scholes(SPOT, SPOT, T, RATE, SIGMA, True)['Delta'], abs=1e-3)
@@ -0,0 +1,123 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from Imports.module import GetFinData
+from Imports.option_snapshots import OptionChainPoller, OptionSnapshotStore, ReplayFeed
+
+
+def record_chains(n_polls, n_strikes=20, symbol='NIFTY', seed=0):
+    """Raw live chains of one session where a few strikes trade between polls and the far strike lists late"""
+    rng = np.random.default_rng(seed)
+    chain = pd.DataFrame({
+        'Symbol': symbol,
+        'Expiry_Date': '29-Aug-2024',
+        'Strike_Price': 22000 + 50 * np.arange(n_strikes),
+        'CALLS_OI': rng.integers(100, 1000, n_strikes).astype(float),
+        'CALLS_Volume': 0.0,
+        'CALLS_IV': rng.uniform(10, 20, n_strikes).round(2),
+        'CALLS_LTP': np.linspace(400, 20, n_strikes).round(2),
+        'PUTS_LTP': np.linspace(20, 400, n_strikes).round(2),
+        'PUTS_IV': rng.uniform(10, 20, n_strikes).round(2),
+        'PUTS_Volume': 0.0,
+        'PUTS_OI': rng.integers(100, 1000, n_strikes).astype(float),
+    })
+    chains = []
+    for poll in range(n_polls):
+        chain = chain.copy()
+        chain['Fetch_Time'] = (pd.Timestamp('2024-08-02 09:15:00') + pd.Timedelta(seconds=5 * poll)).strftime('%d-%b-%Y %H:%M:%S')
+        traded = rng.random(n_strikes) < 0.2
+        chain.loc[traded, 'CALLS_LTP'] = (chain.loc[traded, 'CALLS_LTP'] * rng.uniform(0.98, 1.02, traded.sum())).round(2)
+        chain.loc[traded, 'CALLS_Volume'] += rng.integers(1, 50, traded.sum())
+        chains.append(chain if poll >= 3 else chain.iloc[:-1])
+    return chains
+
+
+def reshape(chains):
+    fin_data = GetFinData({}, '2024-01-01', '2024-12-31')
+    return [fin_data.reshape_options_data(chain) for chain in chains]
+
+
+def assert_snapshot_equal(snapshot, chain):
+    columns = OptionSnapshotStore.KEY_COLUMNS + OptionSnapshotStore.VALUE_COLUMNS[:4]
+    expected = chain.assign(**{'Strike Price': chain['Strike Price'].astype(float)}).sort_values(OptionSnapshotStore.KEY_COLUMNS)
+    actual = snapshot.sort_values(OptionSnapshotStore.KEY_COLUMNS)
+    assert actual['Date'].eq(chain['Date'].iloc[0]).all()
+    pd.testing.assert_frame_equal(actual[columns].reset_index(drop=True), expected[columns].reset_index(drop=True), check_dtype=False)
+
+
+def test_every_snapshot_round_trips(tmp_path):
+    chains = reshape(record_chains(12))
+    store = OptionSnapshotStore(str(tmp_path), keyframe_every=5)
+    for chain in chains:
+        store.append('NIFTY', chain)
+    assert store.stats['keyframes'] == 3
+    reopened = OptionSnapshotStore(str(tmp_path), keyframe_every=5)
+    assert reopened.snapshots('NIFTY')['seq'].tolist() == list(range(12))
+    for seq, chain in enumerate(chains):
+        assert_snapshot_equal(reopened.snapshot('NIFTY', seq), chain)
+    history = reopened.history('NIFTY', columns=['Option Close Price'])
+    assert len(history) == sum(len(chain) for chain in chains)
+
+
+def test_a_partial_index_line_is_truncated_on_open(tmp_path):
+    chains = reshape(record_chains(10))
+    store = OptionSnapshotStore(str(tmp_path), keyframe_every=4)
+    for chain in chains[:6]:
+        store.append('NIFTY', chain)
+    # A crash after the block of snapshot 6 was written and half of its index line
+    directory = store.symbol_dir('NIFTY')
+    with open(os.path.join(directory, 'log.bin'), 'ab') as f:
+        f.write(b'\x00' * 100)
+    with open(os.path.join(directory, 'index.jsonl'), 'a') as f:
+        f.write('{"seq": 6, "time": "02-Aug')
+
+    resumed = OptionSnapshotStore(str(tmp_path), keyframe_every=4)
+    for chain in chains[6:]:
+        resumed.append('NIFTY', chain)
+    reopened = OptionSnapshotStore(str(tmp_path), keyframe_every=4)
+    assert reopened.snapshots('NIFTY')['seq'].tolist() == list(range(10))
+    for seq, chain in enumerate(chains):
+        assert_snapshot_equal(reopened.snapshot('NIFTY', seq), chain)
+
+
+@pytest.mark.parametrize('first, second', [(5, 3), (3, 7)])
+def test_reopening_with_another_keyframe_interval(tmp_path, first, second):
+    chains = reshape(record_chains(16))
+    store = OptionSnapshotStore(str(tmp_path), keyframe_every=first)
+    for chain in chains[:7]:
+        store.append('NIFTY', chain)
+    store = OptionSnapshotStore(str(tmp_path), keyframe_every=second)
+    for chain in chains[7:]:
+        store.append('NIFTY', chain)
+    reopened = OptionSnapshotStore(str(tmp_path), keyframe_every=first)
+    for seq, chain in enumerate(chains):
+        assert_snapshot_equal(reopened.snapshot('NIFTY', seq), chain)
+
+
+def test_replay_feed_repeats_the_last_chain(tmp_path):
+    chains = record_chains(3)
+    for i, chain in enumerate(chains):
+        os.makedirs(tmp_path / 'NIFTY', exist_ok=True)
+        chain.to_csv(tmp_path / 'NIFTY' / f'{i:03d}.csv', index=False)
+    feed = ReplayFeed.from_directory(str(tmp_path))
+    times = [feed('NIFTY')['Fetch_Time'].iloc[0] for _ in range(5)]
+    assert times == [chain['Fetch_Time'].iloc[0] for chain in chains] + [chains[-1]['Fetch_Time'].iloc[0]] * 2
+
+
+def test_poller_logs_every_symbol_and_counts_errors(tmp_path, metrics):
+    recorded = {symbol: record_chains(4, symbol=symbol, seed=i) for i, symbol in enumerate(['NIFTY', 'BANKNIFTY', 'TCS'])}
+    replay = ReplayFeed(recorded)
+
+    def feed(symbol):
+        if symbol == 'TCS':
+            raise ConnectionError('Read timed out')
+        return replay(symbol)
+
+    store = OptionSnapshotStore(str(tmp_path), keyframe_every=2)
+    poller = OptionChainPoller(list(recorded), store, interval=0, max_workers=3, feed=feed)
+    poller.run(n_polls=4)
+    assert poller.poll_stats['polls'] == 4 and poller.poll_stats['errors'] == 4
+    assert store.stats['snapshots'] == 8
+    for symbol in ('NIFTY', 'BANKNIFTY'):
+        assert_snapshot_equal(store.snapshot(symbol), reshape(recorded[symbol][-1:])[0])
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+from Imports.parallel_preproc import ParallelPreprocessData, read_frame, write_frame
+from Imports.preproc_data import PreprocessData
+from Imports.scaler_state import IncrementalScaler
+
+
+def indian(values):
+    """Numbers as NSE prints them, '1,23,456.75'"""
+    def group(value):
+        whole, fraction = f'{value:.2f}'.split('.')
+        head, tail = whole[:-3], whole[-3:]
+        while len(head) > 2:
+            head, tail = head[:-2], head[-2:] + ',' + tail
+        return (head + ',' + tail if head else tail) + '.' + fraction
+    return [group(value) for value in values]
+
+
+def make_market(close_col, volume_col, type_col, types, tickers, days=40, seed=0):
+    """Scaled bars of several tickers one after another, volumes as Indian-format strings, with gaps everywhere.
+    Every ticker and every third of the frame starts on gaps, which is where shards are cut, so the serial ffill
+    carries values across the shard boundaries"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i, ticker in enumerate(tickers):
+        frames.append(pd.DataFrame({'Ticker': ticker, 'Date': pd.bdate_range('2024-01-01', periods=days).strftime('%d-%b-%Y'),
+                                    close_col: rng.normal(1000 * (i + 1), 50, days).round(2),
+                                    volume_col: indian(rng.lognormal(13, 1, days)), type_col: rng.choice(types, days)}))
+    df = pd.concat(frames, ignore_index=True)
+    for col in (close_col, volume_col, type_col):
+        missing = rng.random(len(df)) < 0.05
+        starts = np.r_[np.arange(0, len(df), days), len(df) // 3, 2 * len(df) // 3]
+        missing[np.r_[starts, starts + 1]] = True
+        df.loc[missing, col] = np.nan
+    return df
+
+
+@pytest.fixture(scope='module')
+def frames():
+    news = pd.DataFrame({'title': ['Results', 'Results', None, 'Order win'], 'content': ['TCS beats', 'TCS beats', 'INFY', None],
+                         'date': ['2024-01-02T09:00:00.000Z', '2024-01-02T09:00:00.000Z', None, 'Last Updated: Jan 03, 2024, 10:00:00 AM IST'],
+                         'ticker': ['TCS', 'TCS', 'INFY', 'SBIN']})
+    return [make_market('ClosePrice', 'TotalTradedQuantity', 'Option Type', ['call', 'put'], ['TCS', 'INFY', 'SBIN', 'ITC'], seed=1),
+            make_market('CLOSING_PRICE', 'TOT_TRADED_QTY', 'OPTION_TYPE', ['CE', 'PE', 'XX'], ['NIFTY'], days=150, seed=2),
+            make_market('ClosePrice', 'TotalTradedQuantity', 'Option Type', ['call', 'put'], ['NIFTYBEES', 'GOLDBEES'], seed=3),
+            news]
+
+
+def run(cls, frames, **kwargs):
+    preproc = cls(*[df.copy() for df in frames], **kwargs)
+    preproc.preprocess()
+    preprocessed = [df.copy() for df in (preproc.stock_data, preproc.index_data, preproc.etf_data, preproc.news_data)]
+    preproc.standardize_data(fit=True, per_ticker=True)
+    return preproc, preprocessed
+
+
+def test_parallel_preprocessing_matches_the_serial_path(frames, tmp_path):
+    serial, serial_preprocessed = run(PreprocessData, frames)
+    parallel, parallel_preprocessed = run(ParallelPreprocessData, frames, max_workers=3, shard_dir=str(tmp_path), min_shard_rows=30)
+    assert parallel.sharded()
+    for expected, actual in zip(serial_preprocessed, parallel_preprocessed):
+        pd.testing.assert_frame_equal(actual, expected)
+    for name in ('stock_data', 'index_data', 'etf_data'):
+        pd.testing.assert_frame_equal(getattr(parallel, name), getattr(serial, name))
+    for name, scaler in serial.scalers.items():
+        other = parallel.scalers[name]
+        assert set(other.scalers) == set(scaler.scalers)
+        for key, fitted in scaler.scalers.items():
+            assert other.scalers[key].mean_.tobytes() == fitted.mean_.tobytes()
+            assert other.scalers[key].var_.tobytes() == fitted.var_.tobytes()
+    assert set(parallel.scalers['stock'].scalers) > {IncrementalScaler.GLOBAL_KEY}
+
+
+def test_shard_files_round_trip_every_column_kind(tmp_path):
+    df = pd.DataFrame({'price': [1.5, np.nan, 3.0], 'ticker': pd.array(['TCS', None, 'INFY'], dtype='str'),
+                       'volume': pd.array([1, None, 3], dtype='Int64'), 'flag': [True, False, True],
+                       'kind': pd.Categorical(['call', 'put', 'call']), 'mixed': [1, 'a', None]})
+    pd.testing.assert_frame_equal(read_frame(write_frame(df, str(tmp_path / 'shard'))), df)
@@ -0,0 +1,98 @@
+import types
+import numpy as np
+import pytest
+import torch
+from Imports.label_scoring import LabelScorer
+from Imports.prediction_cache import PredictionCache
+
+
+class CharTokenizer:
+    """One token per character of a fixed alphabet, enough for LabelScorer to tokenize prompts and labels"""
+    def __init__(self, alphabet, name_or_path='char-tokenizer'):
+        self.vocab = {char: i + 1 for i, char in enumerate(alphabet)}
+        self.name_or_path = name_or_path
+        self.pad_token_id, self.eos_token_id = 0, None
+
+    def get_vocab(self):
+        return dict(self.vocab)
+
+    def encode(self, text):
+        return [self.vocab.get(char, 0) for char in text]
+
+    def __call__(self, text, add_special_tokens=True):
+        if isinstance(text, str):
+            return {'input_ids': self.encode(text)}
+        return {'input_ids': [self.encode(t) for t in text]}
+
+
+class CountingModel(torch.nn.Module):
+    """Tiny causal LM whose forward passes are counted"""
+    def __init__(self, vocab_size):
+        super().__init__()
+        torch.manual_seed(0)
+        self.embed = torch.nn.Embedding(vocab_size, 8)
+        self.head = torch.nn.Linear(8, vocab_size)
+        self.calls = 0
+
+    @property
+    def device(self):
+        return torch.device('cpu')
+
+    def forward(self, input_ids, attention_mask=None, position_ids=None):
+        self.calls += 1
+        return types.SimpleNamespace(logits=self.head(self.embed(input_ids).cumsum(1)))
+
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789 .,:-_#\n'
+
+
+def make_scorer(cache, alphabet=ALPHABET, **kwargs):
+    tokenizer = CharTokenizer(alphabet)
+    kwargs.setdefault('model_id', 'org/tiny-lm')
+    kwargs.setdefault('revision', 'abc123')
+    return LabelScorer(CountingModel(len(alphabet) + 1), tokenizer, template='{}\n{}\n', instruction='label', cache=cache, **kwargs)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PredictionCache(str(tmp_path / 'predictions.sqlite'))
+    yield cache
+    cache.close()
+
+
+def test_cache_requires_model_name_and_revision(cache):
+    with pytest.raises(ValueError):
+        make_scorer(cache, model_id=None)
+    with pytest.raises(ValueError):
+        make_scorer(cache, revision=None)
+    with pytest.raises(ValueError):
+        cache.key('org/tiny-lm', None, None, {}, 'template', 'text')
+    # Without a cache nothing is keyed and no identity is needed
+    make_scorer(None, model_id=None, revision=None)
+
+
+def test_key_changes_with_model_tokenizer_and_truncation(cache):
+    base = make_scorer(cache)
+    key = base.cache.key(base.model_id, base.revision, None, base.cache_settings, 'template', 'close: 1.0')
+    others = [make_scorer(cache, revision='def456'), make_scorer(cache, model_id='org/other-lm'),
+              make_scorer(cache, max_length=512), make_scorer(cache, alphabet=ALPHABET[::-1])]
+    keys = {other.cache.key(other.model_id, other.revision, None, other.cache_settings, 'template', 'close: 1.0') for other in others}
+    assert len(keys) == len(others) and key not in keys
+    assert make_scorer(cache).cache_settings == base.cache_settings
+
+
+def test_scores_are_reused_only_for_the_same_settings(cache):
+    inputs = ['close: 1.5, rsi: 40', 'close: 2.5, rsi: 60', 'close: 1.5, rsi: 40']
+    first = make_scorer(cache)
+    expected = first.label_log_likelihoods(inputs)
+    np.testing.assert_array_equal(expected, make_scorer(None).score_prompts(inputs))
+
+    again = make_scorer(cache)
+    np.testing.assert_array_equal(again.label_log_likelihoods(inputs), expected)
+    assert again.model.calls == 0
+
+    # A shorter max_length truncates the prompts differently, so nothing cached may be served
+    truncated = make_scorer(cache, max_length=12)
+    scores = truncated.label_log_likelihoods(inputs)
+    assert truncated.model.calls > 0
+    np.testing.assert_array_equal(scores, make_scorer(None, max_length=12).score_prompts(inputs))
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from Imports.prompt_builder import PromptDatasetBuilder, ShardWriter
+
+
+def make_bars(tickers=('TCS', 'INFY', 'SBIN', 'ITC'), n_days=120, seed=0):
+    """Daily bars of several tickers, one ticker after the other"""
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range('2023-01-02', periods=n_days).strftime('%d-%b-%Y')
+    return pd.concat([pd.DataFrame({'Ticker': ticker, 'Date': days, 'ClosePrice': 100 + np.cumsum(rng.normal(0, 1, n_days)),
+                                    'Sentiment': rng.normal(0, 0.5, n_days)}) for ticker in tickers], ignore_index=True)
+
+
+def read_shard(path):
+    if path.endswith('.csv'):
+        return pd.read_csv(path).rename(columns={'Prompt': 'input', 'Target': 'response'}).to_dict('records')
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_hash_split_is_deterministic():
+    builder = PromptDatasetBuilder(test_fraction=0.2)
+    dates = pd.bdate_range('2023-01-02', periods=500)
+    splits = [builder.split_of(ticker, date) for ticker in ('TCS', 'INFY') for date in dates]
+    assert splits == [PromptDatasetBuilder(test_fraction=0.2).split_of(ticker, date) for ticker in ('TCS', 'INFY') for date in dates]
+    assert 0.15 < splits.count('test') / len(splits) < 0.25
+    # A bar keeps its split whatever else is in the dataset
+    assert PromptDatasetBuilder(test_fraction=0.2, test_tickers=['SBIN']).split_of('TCS', dates[7]) == splits[7]
+
+
+def test_builds_are_reproducible(tmp_path):
+    bars = make_bars()
+    first = PromptDatasetBuilder(test_fraction=0.2).build([bars], tmp_path / 'a', max_shard_bytes=8192)
+    second = PromptDatasetBuilder(test_fraction=0.2).build([bars], tmp_path / 'b', max_shard_bytes=8192)
+    assert first == second
+    # The same records land in the same splits when the tickers come in another order
+    reordered = pd.concat([bars[bars['Ticker'] == ticker] for ticker in ('ITC', 'SBIN', 'INFY', 'TCS')])
+    third = PromptDatasetBuilder(test_fraction=0.2).build([reordered], tmp_path / 'c', max_shard_bytes=8192)
+    assert third['labels'] == first['labels']
+
+    def split_records(directory, manifest):
+        return {split: sorted(json.dumps(record, sort_keys=True) for shard in manifest['shards'] if shard['split'] == split
+                              for record in read_shard(os.path.join(directory, shard['file'])))
+                for split in ('train', 'test')}
+    assert split_records(tmp_path / 'c', third) == split_records(tmp_path / 'a', first)
+
+
+def test_shards_roll_over_at_the_size_limit(tmp_path):
+    records = [{'instruction': 'i', 'input': 'x' * (40 + i % 7), 'response': 'bullish'} for i in range(50)]
+    writer = ShardWriter(tmp_path, 'train', max_bytes=300)
+    for record in records:
+        writer.write(record)
+    # Bigger than max_bytes, goes alone into a shard of its own
+    writer.write({'instruction': 'i', 'input': 'y' * 400, 'response': 'bearish'})
+    writer.write(records[0])
+    writer.close()
+    manifest = writer.manifest()
+    assert len(manifest) > 5
+    assert [shard['file'] for shard in manifest] == [f'train-{i:05d}.jsonl' for i in range(len(manifest))]
+    assert all(shard['bytes'] <= 300 for shard in manifest[:-2])
+    assert manifest[-2]['records'] == 1 and manifest[-2]['bytes'] > 300
+    assert sum(shard['records'] for shard in manifest) == len(records) + 2
+    # Each shard is full: the first record of the next one did not fit
+    sizes = [len((json.dumps(record) + '\n').encode('utf-8')) for record in records]
+    used = 0
+    for shard in manifest[:-3]:
+        used += shard['records']
+        assert shard['bytes'] + sizes[used] > 300
+
+
+def test_csv_shards_count_the_header(tmp_path):
+    writer = ShardWriter(tmp_path, 'test', file_format='csv', max_bytes=200)
+    for i in range(20):
+        writer.write({'instruction': 'i', 'input': f'Lag1_ClosePrice: {i}, RSI: 50.', 'response': 'bearish'})
+    writer.close()
+    for shard in writer.manifest():
+        assert shard['bytes'] == os.path.getsize(tmp_path / shard['file']) <= 200
+        assert list(pd.read_csv(tmp_path / shard['file']).columns) == ['Prompt', 'Target']
+
+
+def test_manifest_matches_the_shards(tmp_path):
+    manifest = PromptDatasetBuilder(test_fraction=0.2).build([make_bars()], tmp_path, max_shard_bytes=8192)
+    assert manifest == json.loads((tmp_path / 'manifest.json').read_text())
+    assert set(os.listdir(tmp_path)) == {shard['file'] for shard in manifest['shards']} | {'manifest.json'}
+    totals = {'train': {'bullish': 0, 'bearish': 0}, 'test': {'bullish': 0, 'bearish': 0}}
+    for shard in manifest['shards']:
+        path = os.path.join(tmp_path, shard['file'])
+        with open(path, 'rb') as f:
+            data = f.read()
+        assert shard['bytes'] == len(data) and shard['sha256'] == hashlib.sha256(data).hexdigest()
+        rows = read_shard(path)
+        assert shard['records'] == len(rows) > 0
+        for row in rows:
+            totals[shard['split']][row['response']] += 1
+    assert totals == manifest['labels']
+    assert len([shard for shard in manifest['shards'] if shard['split'] == 'train']) > 1
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from Imports.preproc_data import PreprocessData
+from Imports.scaler_state import IncrementalScaler
+
+COLUMNS = ['ClosePrice', 'TotalTradedQuantity']
+
+
+def make_prices(n=300, tickers=('TCS', 'INFY', 'SBIN'), seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Ticker': rng.choice(tickers, n),
+        'ClosePrice': rng.normal(1500, 300, n),
+        'TotalTradedQuantity': rng.lognormal(12, 1, n),
+    })
+
+
+def test_saved_state_reproduces_the_transform_bit_for_bit(tmp_path):
+    prices = make_prices()
+    scaler = IncrementalScaler(COLUMNS, 'Ticker')
+    for chunk in [prices.iloc[start:start + 75] for start in range(0, len(prices), 75)]:
+        scaler.partial_fit(chunk)
+    scaler.save(str(tmp_path / 'stock_scaler.json'))
+    loaded = IncrementalScaler.load(str(tmp_path / 'stock_scaler.json'))
+
+    assert set(loaded.scalers) == set(scaler.scalers)
+    for key, fitted in scaler.scalers.items():
+        for attribute in ['mean_', 'var_', 'scale_']:
+            assert getattr(loaded.scalers[key], attribute).tobytes() == getattr(fitted, attribute).tobytes()
+    new_rows = make_prices(n=50, tickers=('TCS', 'INFY', 'HDFCBANK'), seed=1)
+    assert loaded.transform(new_rows).tobytes() == scaler.transform(new_rows).tobytes()
+
+    # Fitting further from the loaded state matches fitting further from the original
+    more = make_prices(n=80, seed=2)
+    assert loaded.partial_fit(more).transform(new_rows).tobytes() == scaler.partial_fit(more).transform(new_rows).tobytes()
+
+
+def test_rows_without_a_ticker_use_the_global_scaler():
+    prices = make_prices()
+    scaler = IncrementalScaler(COLUMNS, 'Ticker').partial_fit(prices)
+    prices.loc[[3, 7], 'Ticker'] = np.nan
+    scaled = scaler.transform(prices)
+    overall = scaler.scalers[IncrementalScaler.GLOBAL_KEY]
+    expected = (prices.loc[[3, 7], COLUMNS].to_numpy() - overall.mean_) / overall.scale_
+    np.testing.assert_array_equal(scaled[[3, 7]], expected)
+    assert np.abs(scaled).max() < 10
+
+
+def test_standardizing_twice_does_not_refit_or_rescale():
+    preproc = PreprocessData(make_prices(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame())
+    preproc.standardize_data(fit=True, per_ticker=True)
+    scaled = preproc.stock_data.copy()
+    seen = preproc.scalers['stock'].scalers[IncrementalScaler.GLOBAL_KEY].n_samples_seen_.copy()
+
+    preproc.standardize_data(fit=True, per_ticker=True)
+    pd.testing.assert_frame_equal(preproc.stock_data, scaled)
+    np.testing.assert_array_equal(preproc.scalers['stock'].scalers[IncrementalScaler.GLOBAL_KEY].n_samples_seen_, seen)
+
+    # New rows assigned to the frame are folded in
+    preproc.stock_data = make_prices(n=40, seed=3)
+    preproc.standardize_data(fit=True, per_ticker=True)
+    np.testing.assert_array_equal(preproc.scalers['stock'].scalers[IncrementalScaler.GLOBAL_KEY].n_samples_seen_, seen + 40)
+
+
+def test_loaded_scalers_standardize_new_rows_like_the_fitted_ones(tmp_path):
+    training = PreprocessData(make_prices(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame())
+    training.standardize_data(fit=True, per_ticker=True)
+    training.save_scalers(str(tmp_path))
+    new_rows = make_prices(n=60, seed=4)
+    expected = training.scalers['stock'].transform(new_rows)
+
+    inference = PreprocessData(new_rows.copy(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame())
+    inference.load_scalers(str(tmp_path))
+    inference.standardize_data(fit=False, per_ticker=True)
+    assert inference.stock_data[COLUMNS].to_numpy().tobytes() == expected.tobytes()
+
+
+def test_frames_rebuilt_by_preprocess_are_not_scaled_twice(tmp_path):
+    prices = make_prices().assign(**{'Option Type': 'call', 'Date': '02-Aug-2024'})
+    prices.loc[5, 'ClosePrice'] = np.nan
+    news = pd.DataFrame({'title': ['Results'], 'content': ['TCS beats'], 'date': ['2024-08-01T09:00:00.000Z'], 'ticker': ['TCS'], 'sentiment': [0.5]})
+    preproc = PreprocessData(prices, pd.DataFrame(), pd.DataFrame(), news)
+    preproc.standardize_data(fit=True, per_ticker=True)
+    scaled = preproc.stock_data[COLUMNS].copy()
+    seen = preproc.scalers['stock'].scalers[IncrementalScaler.GLOBAL_KEY].n_samples_seen_.copy()
+
+    # ffill, get_dummies and the sentiment merge all hand back new frames
+    preproc.preprocess()
+    preproc.attach_news_sentiment()
+    assert 'Option Type_call' in preproc.stock_data.columns
+    preproc.standardize_data(fit=True, per_ticker=True)
+    pd.testing.assert_frame_equal(preproc.stock_data[COLUMNS], scaled.ffill())
+    np.testing.assert_array_equal(preproc.scalers['stock'].scalers[IncrementalScaler.GLOBAL_KEY].n_samples_seen_, seen)
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+from Imports.news_dates import normalize_news_dates
+from Imports.preproc_data import PreprocessData
+from Imports.sentiment_join import SentimentIndex
+
+
+def make_bars(tickers=('TCS', 'INFY')):
+    dates = pd.bdate_range('2024-07-29', '2024-08-09').strftime('%d-%b-%Y')
+    return pd.DataFrame({'Ticker': np.repeat(tickers, len(dates)), 'Date': np.tile(dates, len(tickers)), 'ClosePrice': 100.0})
+
+
+def test_news_after_the_close_does_not_reach_the_bar():
+    news = pd.DataFrame({
+        'ticker': ['TCS', 'TCS', 'TCS', 'TCS', 'INFY'],
+        'date': ['Last Updated: Aug 02, 2024, 03:30:00 PM IST',   # at the close, counts for Friday
+                 'Last Updated: Aug 02, 2024, 03:31:00 PM IST',   # after the close, first seen on Monday
+                 '2024-08-02T10:30:00.000Z',                      # 16:00 IST, also Monday
+                 'Last Updated: Aug 05, 2024, 09:15:00 AM IST',   # Monday morning
+                 'Last Updated: Aug 02, 2024, 11:00:00 AM IST'],
+        'sentiment': [1.0, -1.0, -1.0, 0.5, 0.25],
+    })
+    news['date'], _ = normalize_news_dates(news['date'])
+    bars = SentimentIndex(news).join(make_bars(), lookback='3D').set_index(['Ticker', 'Date'])
+
+    assert bars.loc[('TCS', '01-Aug-2024'), 'News_Count'] == 0
+    assert bars.loc[('TCS', '02-Aug-2024'), ['Sentiment', 'News_Count']].tolist() == [1.0, 1]
+    # Monday's window (Friday 15:30, Monday 15:30] holds the late Friday articles and Monday's, not the one at the close
+    assert bars.loc[('TCS', '05-Aug-2024'), ['Sentiment', 'News_Count']].tolist() == [pytest.approx(-0.5), 3]
+    assert bars.loc[('TCS', '06-Aug-2024'), ['Sentiment', 'News_Count']].tolist() == [0.5, 1]
+    assert bars.loc[('INFY', '02-Aug-2024'), ['Sentiment', 'News_Count']].tolist() == [0.25, 1]
+
+
+def test_no_bar_sees_a_later_article():
+    rng = np.random.default_rng(0)
+    stamps = pd.Timestamp('2024-07-25', tz='Asia/Kolkata') + pd.to_timedelta(rng.integers(0, 16 * 86400, 500), unit='s')
+    news = pd.DataFrame({'ticker': rng.choice(['TCS', 'INFY'], 500), 'date': stamps, 'sentiment': rng.normal(size=500)})
+    bars = SentimentIndex(news).join(make_bars(), lookback='5D')
+    for row in bars.itertuples():
+        close = pd.Timestamp(row.Date, tz='Asia/Kolkata') + pd.Timedelta('15:30:00')
+        visible = news[(news['ticker'] == row.Ticker) & (news['date'] > close - pd.Timedelta('5D')) & (news['date'] <= close)]
+        assert row.News_Count == len(visible)
+        assert row.Sentiment == pytest.approx(visible['sentiment'].mean(), nan_ok=True)
+
+
+def make_preproc():
+    news = pd.DataFrame({'ticker': ['TCS', 'TCS'], 'title': ['Profit beats estimates', 'Shares slump'], 'content': ['', None],
+                         'date': pd.to_datetime(['2024-08-02 10:00', '2024-08-05 10:00']).tz_localize('Asia/Kolkata')})
+    return PreprocessData(make_bars(('TCS',)), pd.DataFrame(), pd.DataFrame(), news)
+
+
+def test_missing_sentiment_column_is_reported():
+    preproc = make_preproc()
+    with pytest.raises(ValueError, match="'sentiment'"):
+        preproc.attach_news_sentiment()
+
+
+def test_scorer_fills_the_sentiment_column():
+    preproc = make_preproc()
+    texts = []
+
+    def scorer(batch):
+        texts.extend(batch)
+        return [1.0 if 'beats' in text else -1.0 for text in batch]
+
+    preproc.attach_news_sentiment(lookback='1D', scorer=scorer)
+    assert texts == ['Profit beats estimates ', 'Shares slump ']
+    stock = preproc.stock_data.set_index('Date')
+    assert stock.loc['02-Aug-2024', 'Sentiment'] == 1.0 and stock.loc['05-Aug-2024', 'Sentiment'] == -1.0
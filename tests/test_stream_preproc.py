@@ -0,0 +1,71 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from Imports.preproc_data import PreprocessData
+from Imports.stream_preproc import StreamPreprocessData
+
+DATASETS = os.path.join(os.path.dirname(__file__), '..', 'Datasets')
+CHUNK_SIZE = 37
+
+
+def make_market(date_col, close_col, type_col, types, tickers=('TCS', 'INFY', 'SBIN'), days=50, seed=0):
+    """Bars of several tickers one after another, with gaps to forward fill, some at the start of a chunk"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2024-01-01', periods=days).strftime('%d-%b-%Y')
+    df = pd.concat([pd.DataFrame({'Ticker': ticker, date_col: dates, close_col: rng.normal(1000, 50, days).round(2),
+                                  type_col: rng.choice(types, days)}) for ticker in tickers], ignore_index=True)
+    df.loc[rng.choice(len(df), 15, replace=False), close_col] = np.nan
+    df.loc[[CHUNK_SIZE, 2 * CHUNK_SIZE, 2 * CHUNK_SIZE + 1], close_col] = np.nan
+    df.loc[[CHUNK_SIZE + 1, 3 * CHUNK_SIZE], type_col] = np.nan
+    return df
+
+
+def make_news():
+    news = pd.read_csv(os.path.join(DATASETS, 'et_news_data.csv'))
+    # Reposted stories, missing fields and a date no layout matches, spread over several chunks
+    news = pd.concat([news, news.iloc[[5, 40, 41, 300]]], ignore_index=True)
+    # Rows that survive the duplicate removal, so every injected value reaches the output
+    kept = news.index[~news.duplicated(['title', 'content'])]
+    news.loc[kept[[CHUNK_SIZE, 120]], 'title'] = np.nan
+    news.loc[kept[[3 * CHUNK_SIZE, 500]], 'content'] = np.nan
+    news.loc[kept[[4 * CHUNK_SIZE, 4 * CHUNK_SIZE + 1, 700]], 'date'] = np.nan
+    news.loc[kept[800], 'date'] = 'sometime last week'
+    return news
+
+
+def chunked(df):
+    return (df.iloc[start:start + CHUNK_SIZE] for start in range(0, len(df), CHUNK_SIZE))
+
+
+@pytest.fixture(scope='module')
+def frames():
+    return {
+        'stock': make_market('Date', 'ClosePrice', 'Option Type', ['call', 'put']),
+        'index': make_market('TIMESTAMP', 'CLOSING_PRICE', 'OPTION_TYPE', ['CE', 'PE', 'XX'], seed=1),
+        'etf': make_market('Date', 'ClosePrice', 'Option Type', ['call', 'put'], tickers=('NIFTYBEES', 'GOLDBEES', 'BANKBEES'), seed=2),
+        'news': make_news(),
+    }
+
+
+@pytest.fixture(scope='module')
+def batch(frames):
+    preproc = PreprocessData(*[frames[kind].copy() for kind in ['stock', 'index', 'etf', 'news']])
+    return dict(zip(['stock', 'index', 'etf', 'news'], preproc.preprocess())), preproc.date_report
+
+
+@pytest.mark.parametrize('kind', ['stock', 'index', 'etf', 'news'])
+def test_stream_matches_preprocess(frames, batch, kind):
+    expected, _ = batch
+    stream = StreamPreprocessData()
+    result = pd.concat(list(stream.preprocess_stream(chunked(frames[kind]), kind)))
+    pd.testing.assert_frame_equal(result, expected[kind])
+
+
+def test_stream_counts_the_same_bad_dates(frames, batch):
+    _, date_report = batch
+    stream = StreamPreprocessData()
+    for _ in stream.preprocess_stream(chunked(frames['news']), 'news'):
+        pass
+    assert stream.date_report == date_report
+    assert date_report['missing'] == 3 and date_report['unrecognized'] == 1